@@ -1,5 +1,65 @@
-from src.pipeline.run import run_pipeline
+"""
+Aramalyze command line.
+
+  python3 main.py                        # champion pipeline, same as `main.py pipeline`
+  python3 main.py <command> [args ...]   # e.g. main.py predict --champs ... --tag_counts ...
+  python3 main.py <command> --help
+
+A command runs its module exactly as `python3 -m <module>` would. Only that module is
+imported, so `predict` or `queue-status` never load pandas, lupa or the crawler, and
+nothing reads .env or opens a database connection until the command needs it. Startup
+per command is measured by scripts/bench_cli_startup.py.
+"""
+import runpy
+import sys
+
+COMMANDS = {
+    "pipeline": ("src.pipeline.run", "Build champion canonical data for the latest patch and load it"),
+    "store": ("src.merging.store", "Import snapshots into / diff patches of the canonical store"),
+    "migrate": ("src.db.migrate", "Apply, list or benchmark schema migrations"),
+    "seeds": ("scripts.insert_seeds", "Insert seed accounts from data/aram_seeds.json"),
+    "discover": ("scripts.discover_matches", "Enqueue ARAM match ids of active accounts"),
+    "ingest": ("scripts.ingest_matches", "Ingest due matches from match_queue"),
+    "crawl": ("scripts.run_crawl_cycle", "Run discovery and ingestion on a shared API budget"),
+    "queue-status": ("src.crawling.match_queue", "match_queue row counts per region and status"),
+    "aggregates": ("src.datasets.aggregates", "Rebuild the ingest-maintained aggregates"),
+    "build-dataset": ("src.datasets.build_team_dataset", "Write the team-level training CSV"),
+    "synergy": ("src.analytics.synergy", "Champion synergy / counter matrices for a patch"),
+    "item-builds": ("src.analytics.item_builds", "Refresh or query the champion item-build index"),
+    "train": ("src.ml.train", "Train and save the win-probability model"),
+    "predict": ("src.ml.predict", "Win probability of a 5-champion team"),
+    "backtest": ("src.ml.backtest", "Walk-forward backtest of the model by patch or time"),
+}
+DEFAULT_COMMAND = "pipeline"
+
+
+def usage() -> str:
+    lines = ["usage: main.py [command] [args ...]", "", "commands:"]
+    width = max(map(len, COMMANDS))
+    lines += [f"  {name:<{width}}  {help}" for name, (_, help) in COMMANDS.items()]
+    lines += ["", f"Without a command (or with only options) runs `{DEFAULT_COMMAND}`."]
+    return "\n".join(lines)
+
+
+def main(argv: list[str] | None = None) -> None:
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] in ("-h", "--help", "help"):
+        print(usage())
+        return
+    if not argv or argv[0].startswith("-"):
+        command, args = DEFAULT_COMMAND, argv
+    else:
+        command, args = argv[0], argv[1:]
+
+    if command not in COMMANDS:
+        print(usage(), file=sys.stderr)
+        raise SystemExit(f"\nunknown command: {command}")
+
+    module, _ = COMMANDS[command]
+    # run_module sets argv[0] to the module's file, as `python3 -m` does.
+    sys.argv = [sys.argv[0], *args]
+    runpy.run_module(module, run_name="__main__", alter_sys=True)
+
 
 if __name__ == "__main__":
-    patch = run_pipeline()
-    print(f"Built champion dataset for patch {patch}")
+    main()
@@ -0,0 +1,57 @@
+"""
+Parse-time benchmark for src/parsing/aram_modifiers.py on the real Fandom wikitext.
+
+  python -m scripts.bench_aram_modifiers [--path data/fandom_api/raw/aram_modifiers.wikitext] [--repeat 20]
+
+Compares the single-pass flatten_templates against the previous fixed-point
+TEMPLATE_RE.sub loop, checks both produce identical output, and times the full parse.
+"""
+import argparse
+import time
+from pathlib import Path
+
+from src.parsing.aram_modifiers import (
+    ARAM_MODIFIERS_PATH,
+    _flatten_templates_fixed_point,
+    extract_champions,
+    flatten_templates,
+    parse_aram_modifiers_text,
+)
+
+
+def best_of(fn, arg, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(arg)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--path", type=Path, default=ARAM_MODIFIERS_PATH)
+    ap.add_argument("--repeat", type=int, default=20)
+    args = ap.parse_args()
+
+    raw = args.path.read_text(encoding="utf-8")
+    champions_text = extract_champions(raw)
+
+    if flatten_templates(champions_text) != _flatten_templates_fixed_point(champions_text):
+        raise SystemExit("flatten_templates output differs from the fixed-point implementation")
+
+    fixed_point = best_of(_flatten_templates_fixed_point, champions_text, args.repeat)
+    single_pass = best_of(flatten_templates, champions_text, args.repeat)
+    full_parse = best_of(parse_aram_modifiers_text, raw, args.repeat)
+
+    print("file:", args.path)
+    print("bytes:", len(raw.encode("utf-8")))
+    print("templates:", champions_text.count("{{"))
+    print(f"flatten fixed-point: {fixed_point * 1000:.2f} ms")
+    print(f"flatten single-pass: {single_pass * 1000:.2f} ms")
+    print(f"speedup: {fixed_point / single_pass:.1f}x")
+    print(f"full parse_aram_modifiers: {full_parse * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Startup-time benchmark for the main.py commands.
+
+  python -m scripts.bench_cli_startup [--repeat 5] [--commands predict,queue-status] [--imports 8]
+  python -m scripts.bench_cli_startup --model models/aram_lr.joblib   # also time a real predict
+
+Runs `python3 main.py <command> --help` in a fresh interpreter per repeat. Every module a
+command imports at the top is loaded before argparse handles --help, so the time is the
+command's startup cost: interpreter, imports and module-level setup, without the work
+itself. Reports the median and best wall time per command next to a bare `python3 -c pass`.
+It also lists the slowest imports (`-X importtime`, cumulative) of each command.
+
+Exits non-zero if a command fails to start, e.g. because an optional dependency of that
+command (lupa for `pipeline`) is not installed.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from main import COMMANDS
+from src.config.paths import PROJECT_ROOT
+
+PREDICT_ARGS = ["--champs", "[57,63,233,245,555]", "--tag_counts", "{'Mage':2,'Tank':1,'Fighter':1,'Assassin':1}"]
+
+
+def run(args: list[str]) -> tuple[float, subprocess.CompletedProcess]:
+    t0 = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, *args], cwd=PROJECT_ROOT, capture_output=True, text=True, env=os.environ.copy()
+    )
+    return time.perf_counter() - t0, proc
+
+
+def time_command(args: list[str], repeat: int) -> tuple[list[float], subprocess.CompletedProcess]:
+    times = []
+    proc = None
+    for _ in range(repeat):
+        seconds, proc = run(args)
+        if proc.returncode != 0:
+            break
+        times.append(seconds)
+    return times, proc
+
+
+def slowest_imports(args: list[str], top: int) -> list[tuple[float, str]]:
+    """(cumulative seconds, module) of the slowest top-level imports, from -X importtime."""
+    _, proc = run(["-X", "importtime", *args])
+    imports = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        cumulative = cumulative.strip()
+        if not cumulative.isdigit():
+            continue
+        # Nested imports are indented; only first-level ones add up to the total.
+        name = name[1:].rstrip()
+        if not name.startswith(" "):
+            imports.append((int(cumulative) / 1e6, name))
+    return sorted(imports, reverse=True)[:top]
+
+
+def report(label: str, times: list[float]) -> str:
+    return f"{label:<16} median {1000 * statistics.median(times):8.1f} ms   best {1000 * min(times):8.1f} ms"
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--commands", default=",".join(COMMANDS), help="Comma-separated main.py commands")
+    ap.add_argument("--imports", type=int, default=5, help="Slowest imports listed per command (0 = none)")
+    ap.add_argument("--model", default=None, help="Also time a full `main.py predict` with this artifact")
+    args = ap.parse_args()
+
+    commands = [c.strip() for c in args.commands.split(",") if c.strip()]
+    unknown = sorted(set(commands) - set(COMMANDS))
+    if unknown:
+        raise SystemExit(f"unknown commands: {unknown}")
+
+    baseline, _ = time_command(["-c", "pass"], args.repeat)
+    print(report("python -c pass", baseline))
+
+    failed = []
+    for command in commands:
+        times, proc = time_command(["main.py", command, "--help"], args.repeat)
+        if proc.returncode != 0:
+            error = (proc.stderr.strip().splitlines() or ["no output"])[-1]
+            print(f"{command:<16} FAILED: {error}")
+            failed.append(command)
+            continue
+        print(report(command, times))
+        if args.imports:
+            for seconds, name in slowest_imports(["main.py", command, "--help"], args.imports):
+                print(f"{'':<16}   {1000 * seconds:7.1f} ms  {name}")
+
+    if args.model:
+        times, proc = time_command(["main.py", "predict", "--model", args.model, *PREDICT_ARGS], args.repeat)
+        if proc.returncode != 0:
+            print(f"predict (full)   FAILED: {proc.stderr.strip()}")
+            failed.append("predict (full)")
+        else:
+            print(report("predict (full)", times), " ", proc.stdout.strip())
+
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
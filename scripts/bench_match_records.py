@@ -0,0 +1,101 @@
+"""
+Throughput / memory benchmark for src/parsing/match_v5.py on synthetic Match-V5 payloads.
+
+  python -m scripts.bench_match_records [--matches 2000] [--repeat 3]
+
+Payloads come from the mock Riot server's generator (src/crawling/mock_riot.py), so they
+carry realistic challenges / perks / missions blocks. Measures json.loads alone and
+json.loads + parse_match in matches per second. Then, with tracemalloc, it measures
+the memory held when every match is buffered as raw dicts versus as MatchRecords.
+Also checks the record rows against the fields read straight from the payload.
+"""
+import argparse
+import json
+import time
+import tracemalloc
+
+from src.crawling.mock_riot import MockRiotConfig, SyntheticWorld, load_champion_ids
+from src.parsing.match_v5 import ITEM_SLOTS, STAT_FIELDS, parse_match
+
+
+def payload_rows(payload: dict, match_key: int, account_ids: dict[str, int]) -> tuple[list[tuple], list[tuple]]:
+    """participants / participant_items rows built directly from the raw payload."""
+    patch = parse_match("", payload).patch
+    participants, items = [], []
+    for p in payload["info"]["participants"]:
+        account_id = account_ids[p["puuid"]]
+        participants.append(
+            (match_key, patch, account_id, p["championId"], p["teamId"], p["win"],
+             *(p.get(key) for key, _ in STAT_FIELDS))
+        )
+        for slot in range(ITEM_SLOTS):
+            if p.get(f"item{slot}"):
+                items.append((match_key, patch, account_id, p[f"item{slot}"], slot))
+    return participants, items
+
+
+def best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def buffered_bytes(build) -> tuple[int, int]:
+    """(retained, peak) bytes allocated by build() while its result is kept alive."""
+    tracemalloc.start()
+    try:
+        buffered = build()
+        retained, peak = tracemalloc.get_traced_memory()
+        del buffered
+    finally:
+        tracemalloc.stop()
+    return retained, peak
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--matches", type=int, default=2000)
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    world = SyntheticWorld(
+        MockRiotConfig(n_matches=args.matches, n_accounts=max(args.matches, 500)),
+        load_champion_ids(),
+    )
+    bodies = [(match_id, json.dumps(world.match(match_id)).encode()) for match_id in world.match_ids]
+
+    account_ids = {puuid: i for i, puuid in enumerate(world.puuids)}
+    for match_key, (match_id, body) in enumerate(bodies[:50]):
+        payload = json.loads(body)
+        record = parse_match(match_id, payload)
+        ids = [account_ids[p.puuid] for p in record.participants]
+        rows = (record.participant_rows(match_key, ids), record.item_rows(match_key, ids))
+        if rows != payload_rows(payload, match_key, account_ids):
+            raise SystemExit(f"record rows differ from the payload for {match_id}")
+
+    def load_raw():
+        return [json.loads(body) for _, body in bodies]
+
+    def load_records():
+        return [parse_match(match_id, json.loads(body)) for match_id, body in bodies]
+
+    n = len(bodies)
+    raw_seconds = best_of(load_raw, args.repeat)
+    record_seconds = best_of(load_records, args.repeat)
+    raw_retained, raw_peak = buffered_bytes(load_raw)
+    rec_retained, rec_peak = buffered_bytes(load_records)
+
+    print("matches:", n)
+    print(f"response body: {sum(len(b) for _, b in bodies) / n / 1024:.1f} KB/match")
+    print(f"json.loads:               {n / raw_seconds:,.0f} matches/s")
+    print(f"json.loads + parse_match: {n / record_seconds:,.0f} matches/s")
+    print(f"buffered raw dicts: {raw_retained / n / 1024:8.1f} KB/match retained, peak {raw_peak / 2**20:.1f} MB")
+    print(f"buffered records:   {rec_retained / n / 1024:8.1f} KB/match retained, peak {rec_peak / 2**20:.1f} MB")
+    print(f"retained memory: {raw_retained / max(rec_retained, 1):.0f}x smaller")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,24 +1,29 @@
-import os
-import psycopg2
+import argparse
 from dotenv import load_dotenv
 
-from src.crawling.discovery import discover_for_active_accounts
+from src.crawling.discovery import api_key, discover_for_active_accounts
+from src.crawling.regions import DEFAULT_REGION, parse_regions
+from src.db.connection import connection
+from src.utils import profiler
 
 load_dotenv()
 
-API_KEY = os.getenv("API_KEY")
-DATABASE_URL = os.getenv("DATABASE_URL")
-
-def main():
-    with psycopg2.connect(DATABASE_URL) as conn:
-        discover_for_active_accounts(
-            conn,
-            region="americas",
-            api_key=API_KEY,
-            per_account_count=50,
-            limit_accounts=25,   
-            sleep_seconds=0.10,
-        )
+def main(regions: list[str] | None = None):
+    with connection() as conn:
+        for region in regions or [DEFAULT_REGION]:
+            discover_for_active_accounts(
+                conn,
+                region=region,
+                api_key=api_key(),
+                per_account_count=50,
+                limit_accounts=25,   
+                sleep_seconds=0.10,
+            )
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--regions", default=DEFAULT_REGION, help="Comma-separated routing regions, or 'all'")
+    profiler.add_argument(ap)
+    args = ap.parse_args()
+    profiler.start("discover_matches", args.profile)
+    main(parse_regions(args.regions))
@@ -1,177 +1,216 @@
-import os
+import argparse
 import time
-import datetime
 import requests
-import psycopg2
 from dotenv import load_dotenv
 
-from src.utils.versioning import patch_mm
+from src.crawling import metrics, rate_limit
+from src.crawling.discovery import api_base, api_key
+from src.crawling.regions import region_for_match_id
+from src.crawling.match_queue import (
+    FATAL,
+    Lease,
+    archive_match,
+    claim_batch,
+    classify_error,
+    record_failure,
+    release_match,
+)
+from src.analytics.item_builds import enqueue_match as enqueue_item_builds
+from src.datasets.aggregates import record_match_aggregates
+from src.db.connection import connection
+from src.db.keys import account_ids, match_key
+from src.parsing.match_v5 import MatchRecord, parse_match
+from src.utils import profiler
+from src.utils.metrics import start_from_env as metrics_start_from_env, timer
 
 load_dotenv()
 
-API_KEY = os.environ["API_KEY"]
-DATABASE_URL = os.environ["DATABASE_URL"]
-
-HEADERS = {"X-Riot-Token": API_KEY}
 ARAM_QUEUE_ID = 450
 
+# Hot statements: executed with prepare=True (or via executemany, which pipelines and
+# auto-prepares) so each connection parses/plans them once.
+# Fact tables are keyed by match_key / account_id (sql/migrations/0007, src/db/keys.py).
+INSERT_MATCH = """
+INSERT INTO matches(match_key, patch, queue_id, game_datetime)
+VALUES (%s, %s, %s, %s)
+ON CONFLICT (match_key, patch) DO NOTHING;
+"""
+
+# matches/participants/participant_items are partitioned by patch (sql/migrations/0003).
+ENSURE_PARTITION = "SELECT ensure_patch_partition(%s);"
+
+INSERT_PARTICIPANT = """
+INSERT INTO participants(
+  match_key, patch, account_id, champion_id, team_id, win,
+  total_damage_dealt, physical_damage_dealt, magic_damage_dealt, true_damage_dealt,
+  damage_taken, gold_earned, heals, shields,
+  kills, deaths, assists
+)
+VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
+ON CONFLICT (match_key, account_id, patch) DO NOTHING;
+"""
+
+INSERT_ITEM = """
+INSERT INTO participant_items(match_key, patch, account_id, item_id, slot)
+VALUES (%s,%s,%s,%s,%s)
+ON CONFLICT (match_key, account_id, slot, patch) DO NOTHING;
+"""
 
 def fetch_match(match_id):
-    url = f"https://americas.api.riotgames.com/lol/match/v5/matches/{match_id}"
+    url = f"{api_base(region_for_match_id(match_id))}/lol/match/v5/matches/{match_id}"
+    headers = {"X-Riot-Token": api_key()}
     while True:
-        r = requests.get(url, headers=HEADERS, timeout=20)
+        rate_limit.before_request()
+        t0 = time.perf_counter()
+        r = requests.get(url, headers=headers, timeout=20)
+        metrics.observe_response("match", r.status_code, time.perf_counter() - t0)
         if r.status_code == 429:
             ra = int(r.headers.get("Retry-After", "2"))
             print(f"429 rate limited; sleeping {ra}s", flush=True)
-            time.sleep(ra)
+            metrics.observe_rate_limit_sleep("match", ra)
+            rate_limit.on_rate_limited(ra)
+            rate_limit.sleep(ra)
             continue
         else:
             r.raise_for_status()
             return r.json()
 
 
-def main(batch_size: int = 10):
-    with psycopg2.connect(DATABASE_URL) as conn:
-        while True:
-            with conn.cursor() as cur:
-                cur.execute(
-                    """
-                    SELECT match_id
-                    FROM match_queue
-                    WHERE status='pending'
-                    ORDER BY discovered_at
-                    LIMIT %s;
-                    """,
-                    (batch_size,),
-                )
-                rows = cur.fetchall()
-
-            if not rows:
-                print("No pending matches left.")
-                return
-
-            for (match_id,) in rows:
-                try:
-                    with conn.cursor() as cur:
-                        cur.execute(
-                            "UPDATE match_queue SET status='processing' WHERE match_id=%s;",
-                            (match_id,),
-                        )
-                    conn.commit()
-
-                    data = fetch_match(match_id)
-                    info = data["info"]
-
-                    if info.get("queueId") != ARAM_QUEUE_ID:
-                        with conn.cursor() as cur:
-                            cur.execute(
-                                "UPDATE match_queue SET status='done', fetched_at=CURRENT_TIMESTAMP WHERE match_id=%s;",
-                                (match_id,),
-                            )
-                        conn.commit()
-                        continue
-
-                    patch = patch_mm(info.get("gameVersion", ""))
-                    game_dt = datetime.datetime.fromtimestamp(
-                        info["gameStartTimestamp"] / 1000.0, tz=datetime.timezone.utc
-                    )
-
-                    participants = info["participants"]
-
-                    with conn.cursor() as cur:
-                        cur.execute(
-                            """
-                            INSERT INTO matches(match_id, patch, queue_id, game_datetime)
-                            VALUES (%s, %s, %s, %s)
-                            ON CONFLICT (match_id) DO NOTHING;
-                            """,
-                            (match_id, patch, info["queueId"], game_dt),
-                        )
-
-                        for p in participants:
-                            cur.execute(
-                                """
-                                INSERT INTO accounts(puuid, status, depth)
-                                VALUES (%s, 'inactive', 1)
-                                ON CONFLICT (puuid) DO NOTHING;
-                                """,
-                                (p["puuid"],),
-                            )
-
-                        for p in participants:
-                            cur.execute(
-                                """
-                                INSERT INTO participants(
-                                  match_id, puuid, champion_id, team_id, win,
-                                  total_damage_dealt, physical_damage_dealt, magic_damage_dealt, true_damage_dealt,
-                                  damage_taken, gold_earned, heals, shields,
-                                  kills, deaths, assists
-                                )
-                                VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
-                                ON CONFLICT (match_id, puuid) DO NOTHING;
-                                """,
-                                (
-                                    match_id,
-                                    p["puuid"],
-                                    p["championId"],
-                                    p["teamId"],
-                                    p["win"],
-                                    p.get("totalDamageDealtToChampions"),
-                                    p.get("physicalDamageDealtToChampions"),
-                                    p.get("magicDamageDealtToChampions"),
-                                    p.get("trueDamageDealtToChampions"),
-                                    p.get("totalDamageTaken"),
-                                    p.get("goldEarned"),
-                                    p.get("totalHeal"),
-                                    p.get("totalDamageShieldedOnTeammates"),
-                                    p.get("kills"),
-                                    p.get("deaths"),
-                                    p.get("assists"),
-                                ),
-                            )
-
-                            # 4) items (slots 0..6)
-                            for slot in range(7):
-                                item_id = p.get(f"item{slot}")
-                                if not item_id:
-                                    continue
-                                cur.execute(
-                                    """
-                                    INSERT INTO participant_items(match_id, puuid, item_id, slot)
-                                    VALUES (%s,%s,%s,%s)
-                                    ON CONFLICT (match_id, puuid, slot) DO NOTHING;
-                                    """,
-                                    (match_id, p["puuid"], item_id, slot),
-                                )
-
-                        cur.execute(
-                            """
-                            UPDATE match_queue
-                            SET status='done', fetched_at=CURRENT_TIMESTAMP, last_error=NULL
-                            WHERE match_id=%s;
-                            """,
-                            (match_id,),
-                        )
-
-                    conn.commit()
-                    #print(f"done {match_id}")
-
-                except Exception as e:
-                    conn.rollback()
-                    with conn.cursor() as cur:
-                        cur.execute(
-                            """
-                            UPDATE match_queue
-                            SET status='error',
-                                retry_count=retry_count+1,
-                                last_error=%s
-                            WHERE match_id=%s;
-                            """,
-                            (str(e), match_id),
-                        )
-                    conn.commit()
-                    print(f"error {match_id}: {e}")
+_partitioned_patches: set[str] = set()
+
+
+def ensure_patch_partition(conn, patch: str) -> None:
+    """
+    Creates the patch's partitions the first time this process sees it. Runs in its
+    own short transaction so the DDL lock is not held across the match writes.
+    """
+    if patch in _partitioned_patches:
+        return
+    with conn.cursor() as cur:
+        cur.execute(ENSURE_PARTITION, (patch,))
+    conn.commit()
+    _partitioned_patches.add(patch)
+
+
+def ingest_match(conn, lease: Lease) -> str:
+    """
+    Fetches and stores one leased match (see src/crawling/match_queue.py).
+    Returns "done" or "non_aram"; either way the queue row is archived in the same
+    transaction. Exceptions propagate; the caller records the failure on match_queue.
+    """
+    with profiler.stage("fetch"):
+        data = fetch_match(lease.match_id)
+
+    if data["info"].get("queueId") != ARAM_QUEUE_ID:
+        with conn.cursor() as cur:
+            archive_match(cur, lease, "non_aram")
+        conn.commit()
+        return "non_aram"
+
+    # Keep only the stored fields; the raw payload is released before any DB work.
+    with profiler.stage("parse"):
+        match = parse_match(lease.match_id, data)
+    del data
+    with profiler.stage("write"):
+        return write_match(conn, match, lease)
+
+
+def write_match(conn, match: MatchRecord, lease: Lease) -> str:
+    """Writes a parsed ARAM match, its aggregates and its queue archive row in one transaction."""
+    region = region_for_match_id(match.match_id)
+    ensure_patch_partition(conn, match.patch)
+
+    with conn.cursor() as cur:
+        with timer(metrics.DB_WRITE_SECONDS, table="matches"):
+            key = match_key(cur, match.match_id)
+            cur.execute(
+                INSERT_MATCH,
+                (key, match.patch, match.queue_id, match.game_datetime),
+                prepare=True,
+            )
+            is_new_match = cur.rowcount == 1
+
+        with timer(metrics.DB_WRITE_SECONDS, table="accounts"):
+            ids = account_ids(cur, [p.puuid for p in match.participants], region)
+        with timer(metrics.DB_WRITE_SECONDS, table="participants"):
+            cur.executemany(INSERT_PARTICIPANT, match.participant_rows(key, ids))
+        with timer(metrics.DB_WRITE_SECONDS, table="participant_items"):
+            cur.executemany(INSERT_ITEM, match.item_rows(key, ids))
+
+        # Same transaction as the match insert, and only once per match.
+        if is_new_match:
+            with timer(metrics.DB_WRITE_SECONDS, table="aggregates"):
+                record_match_aggregates(cur, key, match.patch, match.queue_id, match.participants)
+                enqueue_item_builds(cur, key, match.patch)
+
+        with timer(metrics.DB_WRITE_SECONDS, table="match_queue"):
+            archive_match(cur, lease, "done")
+
+    with timer(metrics.DB_WRITE_SECONDS, table="commit"):
+        conn.commit()
+    return "done"
+
+
+def ingest_batch(conn, batch_size: int, region: str | None = None) -> int:
+    """
+    Leases up to `batch_size` due matches (of `region`, or of any region) and ingests
+    them. Returns how many were leased (0 when nothing is due). A stop request or a
+    rejected API key hands the unprocessed rows back to the queue and re-raises.
+    """
+    api_key()  # a missing key fails here, not once per leased match
+    metrics.refresh_queue_depth(conn)
+    with profiler.stage("claim"):
+        leases = claim_batch(conn, batch_size, region=region)
+    if not leases:
+        return 0
+
+    batch_start = time.perf_counter()
+    batch_done = 0
+    for i, lease in enumerate(leases):
+        match_start = time.perf_counter()
+        try:
+            result = ingest_match(conn, lease)
+            metrics.MATCHES_INGESTED.inc(result=result)
+            if result == "done":
+                metrics.INGEST_MATCH_SECONDS.observe(time.perf_counter() - match_start)
+                batch_done += 1
+            #print(f"done {match_id}")
+
+        except rate_limit.CrawlStopped:
+            conn.rollback()
+            for unprocessed in leases[i:]:
+                release_match(conn, unprocessed)
+            raise
+
+        except Exception as e:
+            conn.rollback()
+            kind = classify_error(e)
+            if kind == FATAL:
+                # Hand back this and the rest of the batch without burning retries.
+                for unprocessed in leases[i:]:
+                    release_match(conn, unprocessed)
+                raise
+            status = record_failure(conn, lease, e, kind)
+            metrics.QUEUE_FAILURES.inc(kind=kind)
+            metrics.MATCHES_INGESTED.inc(result={"dead": "dead", "pending": "retry"}.get(status, status))
+            print(f"{kind} error {lease.match_id} -> {status}: {e}")
+
+    batch_seconds = time.perf_counter() - batch_start
+    if batch_seconds > 0:
+        metrics.INGEST_MATCHES_PER_SECOND.set(batch_done / batch_seconds)
+    return len(leases)
+
+
+def main(batch_size: int = 10, region: str | None = None):
+    metrics_start_from_env()
+    with connection() as conn:
+        while ingest_batch(conn, batch_size, region):
+            pass
+    print("No due matches left.")
 
 
 if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    profiler.add_argument(ap)
+    profiler.start("ingest_matches", ap.parse_args().profile)
     main(batch_size=5)
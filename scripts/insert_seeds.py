@@ -1,31 +1,51 @@
+import argparse
 import json
-import psycopg2
-import os
-from dotenv import load_dotenv
 from src.config.paths import DATA_DIR
+from src.crawling.regions import DEFAULT_REGION, REGIONS
+from src.db.connection import transaction
+from src.utils import profiler
 
-load_dotenv()
-DATABASE_URL = os.environ["DATABASE_URL"]
-
-with open(DATA_DIR / "aram_seeds.json") as f:
-    seeds = json.load(f)
-
-puuids = seeds["puuids"]
-
-conn = psycopg2.connect(DATABASE_URL)
-cur = conn.cursor()
-
-for puuid in puuids:
-    cur.execute(
-        """
-        INSERT INTO accounts (puuid, status, depth)
-        VALUES (%s, 'active', 0)
-        ON CONFLICT (puuid) DO UPDATE
-        SET status = 'active',
-            depth = 0;
-        """,
-        (puuid,),
-    )
-conn.commit()
-cur.close()
-conn.close()
\ No newline at end of file
+UPSERT_SEED = """
+INSERT INTO accounts (puuid, status, depth, region)
+VALUES (%s, 'active', 0, %s)
+ON CONFLICT (puuid) DO UPDATE
+SET status = 'active',
+    depth = 0,
+    region = EXCLUDED.region;
+"""
+
+
+def seed_rows(seeds: dict, default_region: str) -> list[tuple[str, str]]:
+    """
+    aram_seeds.json is either {"puuids": [...]} (all in `default_region`, or in
+    seeds["region"]) or {"regions": {"europe": [...], ...}}.
+    """
+    rows = [(puuid, seeds.get("region", default_region)) for puuid in seeds.get("puuids", [])]
+    for region, puuids in seeds.get("regions", {}).items():
+        rows.extend((puuid, region) for puuid in puuids)
+
+    unknown = sorted({region for _, region in rows} - set(REGIONS))
+    if unknown:
+        raise ValueError(f"Unknown region(s) in seeds: {unknown}")
+    return rows
+
+
+def main(region: str = DEFAULT_REGION):
+    with open(DATA_DIR / "aram_seeds.json") as f:
+        seeds = json.load(f)
+
+    rows = seed_rows(seeds, region)
+
+    with transaction() as conn, conn.cursor() as cur:
+        cur.executemany(UPSERT_SEED, rows)
+
+    print(f"Seeded {len(rows)} accounts")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--region", default=DEFAULT_REGION, choices=REGIONS, help="Region for a plain puuids list")
+    profiler.add_argument(ap)
+    args = ap.parse_args()
+    profiler.start("insert_seeds", args.profile)
+    main(args.region)
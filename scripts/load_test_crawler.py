@@ -0,0 +1,183 @@
+"""
+End-to-end crawler load test against the local mock Riot API.
+
+Starts src.crawling.mock_riot in-process, points RIOT_API_BASE at it, seeds accounts
+from the synthetic world into a local Postgres, then runs discover_for_active_accounts
+and scripts.ingest_matches.main and reports throughput.
+
+  DATABASE_URL=postgresql://localhost/aramalyze_test python -m scripts.load_test_crawler --reset
+
+--reset TRUNCATEs the crawl tables; only use it against a scratch database.
+"""
+import argparse
+import os
+import time
+
+from src.crawling.mock_riot import MockRiotConfig, latest_champions, start_mock_server
+from src.utils import profiler
+
+CRAWL_TABLES = [
+    "champion_patch_stats", "champion_pair_patch_stats", "team_rosters",
+    "champion_item_patch_stats", "champion_build_patch_stats", "item_build_pending",
+    "participant_items", "participants", "matches", "match_keys", "match_queue", "match_queue_archive",
+    "accounts",
+]
+
+
+def count_rows(conn, table: str) -> int:
+    with conn.cursor() as cur:
+        cur.execute(f"SELECT count(*) FROM {table};")
+        return cur.fetchone()[0]
+
+
+def prepare_db(conn, seed_puuids: list[str], *, reset: bool) -> None:
+    with conn.cursor() as cur:
+        if reset:
+            cur.execute(f"TRUNCATE {', '.join(CRAWL_TABLES)};")
+
+        # participants.champion_id references champions; make sure the synthetic ids exist.
+        for cid, champ in latest_champions().items():
+            cur.execute(
+                """
+                INSERT INTO champions (id, key, name)
+                VALUES (%s, %s, %s)
+                ON CONFLICT (id) DO NOTHING;
+                """,
+                (int(cid), champ["key"], champ["name"]),
+            )
+
+        for puuid in seed_puuids:
+            cur.execute(
+                """
+                INSERT INTO accounts (puuid, status, depth)
+                VALUES (%s, 'active', 0)
+                ON CONFLICT (puuid) DO UPDATE
+                SET status = 'active',
+                    depth = 0,
+                    last_crawled = NULL;
+                """,
+                (puuid,),
+            )
+    conn.commit()
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--database_url", default=os.getenv("DATABASE_URL"))
+    ap.add_argument("--reset", action="store_true", help="TRUNCATE crawl tables before running")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--accounts", type=int, default=500)
+    ap.add_argument("--matches", type=int, default=5000)
+    ap.add_argument("--seed_accounts", type=int, default=25)
+    ap.add_argument("--per_account_count", type=int, default=100)
+    ap.add_argument("--batch_size", type=int, default=10)
+    ap.add_argument("--app_limits", default="20:1,100:120")
+    ap.add_argument("--latency_ms", type=float, default=30.0)
+    ap.add_argument("--jitter_ms", type=float, default=20.0)
+    ap.add_argument("--error_rate", type=float, default=0.0)
+    profiler.add_argument(ap)
+    args = ap.parse_args()
+    profiler.start("load_test_crawler", args.profile)
+
+    if not args.database_url:
+        raise SystemExit("DATABASE_URL (or --database_url) is required")
+
+    config = MockRiotConfig(
+        seed=args.seed,
+        n_accounts=args.accounts,
+        n_matches=args.matches,
+        app_limits=args.app_limits,
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+    )
+    server = start_mock_server(config)
+    print(f"Mock Riot API on {server.base_url}", flush=True)
+
+    # The crawler modules read these at import time, the pool on first use.
+    os.environ["RIOT_API_BASE"] = server.base_url
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ.setdefault("API_KEY", "mock-api-key")
+
+    from src.crawling.discovery import discover_for_active_accounts
+    from src.db.connection import connection
+    import scripts.ingest_matches as ingest
+
+    fetch_seconds = 0.0
+    fetch_calls = 0
+    real_fetch_match = ingest.fetch_match
+
+    def timed_fetch_match(match_id):
+        nonlocal fetch_seconds, fetch_calls
+        t0 = time.perf_counter()
+        try:
+            return real_fetch_match(match_id)
+        finally:
+            fetch_seconds += time.perf_counter() - t0
+            fetch_calls += 1
+
+    ingest.fetch_match = timed_fetch_match
+
+    seed_puuids = server.world.puuids[:args.seed_accounts]
+    with connection() as conn:
+        prepare_db(conn, seed_puuids, reset=args.reset)
+        queue_before = count_rows(conn, "match_queue")
+        matches_before = count_rows(conn, "matches")
+
+        print("=== DISCOVERY START ===", flush=True)
+        t0 = time.perf_counter()
+        discover_for_active_accounts(
+            conn,
+            region="americas",
+            api_key=os.environ["API_KEY"],
+            per_account_count=args.per_account_count,
+            limit_accounts=args.seed_accounts,
+            sleep_seconds=0.0,
+        )
+        discovery_seconds = time.perf_counter() - t0
+        queue_after = count_rows(conn, "match_queue")
+        stats_after_discovery = server.snapshot_stats()
+
+    print("=== INGESTION START ===", flush=True)
+    t0 = time.perf_counter()
+    ingest.main(batch_size=args.batch_size)
+    ingest_seconds = time.perf_counter() - t0
+
+    with connection() as conn:
+        matches_after = count_rows(conn, "matches")
+
+    stats = server.snapshot_stats()
+    server.shutdown()
+    server.server_close()
+
+    new_matches = matches_after - matches_before
+    api_calls = stats.get("requests_ids", 0) + stats.get("requests_match", 0)
+    db_seconds = max(ingest_seconds - fetch_seconds, 0.0)
+    total_seconds = discovery_seconds + ingest_seconds
+
+    report = {
+        "seed_accounts": len(seed_puuids),
+        "enqueued": queue_after - queue_before,
+        "new_matches": new_matches,
+        "discovery_seconds": round(discovery_seconds, 3),
+        "ingest_seconds": round(ingest_seconds, 3),
+        "ingest_fetch_seconds": round(fetch_seconds, 3),
+        "ingest_db_seconds": round(db_seconds, 3),
+        "api_calls": api_calls,
+        "api_calls_discovery": stats_after_discovery.get("requests_ids", 0),
+        "api_calls_ingest": stats.get("requests_match", 0),
+        "http_429": stats.get("status_429", 0),
+        "http_5xx": sum(v for k, v in stats.items() if k.startswith("status_5")),
+        "matches_per_second": round(new_matches / total_seconds, 3) if total_seconds else None,
+        "ingest_matches_per_second": round(new_matches / ingest_seconds, 3) if ingest_seconds else None,
+        "api_calls_per_new_match": round(api_calls / new_matches, 3) if new_matches else None,
+        "db_ms_per_match": round(1000 * db_seconds / new_matches, 3) if new_matches else None,
+    }
+
+    print("=== LOAD TEST REPORT ===")
+    for k, v in report.items():
+        print(f"{k}: {v}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,46 +1,306 @@
+"""
+Long-running crawler: discovery and ingestion run concurrently on one shared API budget.
+
+  python3 -m scripts.run_crawl_cycle                    # run until SIGINT / SIGTERM
+  python3 -m scripts.run_crawl_cycle --regions all      # americas, europe, asia and sea
+  python3 -m scripts.run_crawl_cycle --ingest_workers 6 --app_limits 500:10,30000:600
+  python3 -m scripts.run_crawl_cycle --once             # one discovery pass + drain, then exit
+
+Riot counts rate limits per routing region, so each region gets its own orchestrator:
+its own budget, discovery worker, ingestion workers and balancer, all working on that
+region's accounts and queue rows. Regions can share one process (--regions a,b) or be
+split across processes (one --regions each) without coordinating.
+
+Every Riot request from either role draws a token from a RateBudget sized to the app
+rate limit (src/crawling/rate_limit.py). A balancer re-splits it from the number of due
+rows in match_queue: a large backlog shifts the budget to ingestion, an empty one to
+discovery. The split only matters when both roles are busy, so an idle role never
+strands budget.
+
+On SIGINT / SIGTERM workers stop at their next request, hand unprocessed leased rows
+back to the queue and exit. A second signal kills the process.
+"""
+import argparse
 import os
+import signal
+import threading
 import time
-import psycopg2
+from dataclasses import dataclass
+
 from dotenv import load_dotenv
 
-from src.crawling.discovery import discover_for_active_accounts
-from scripts.ingest_matches import main as ingest_main
+from src.crawling import metrics
+from src.crawling.discovery import api_key, discover_for_active_accounts
+from src.crawling.match_queue import FATAL, classify_error
+from src.crawling.rate_limit import CrawlStopped, RateBudget, using
+from src.crawling.regions import DEFAULT_REGION, parse_regions
+from src.db.connection import connection
+from src.utils import profiler
+from src.utils.metrics import histogram, start_from_env, timer
+from scripts.ingest_matches import ingest_batch, main as ingest_main
 
 load_dotenv()
 
-DATABASE_URL = os.environ["DATABASE_URL"]
-API_KEY = os.environ["API_KEY"]
+PHASE_SECONDS = histogram("crawl_phase_seconds", "Wall time of each crawl cycle phase", ("phase",))
 
+DUE_ROWS = """
+SELECT count(*)
+FROM match_queue
+WHERE region = %s AND status = 'pending' AND next_attempt_at <= CURRENT_TIMESTAMP;
+"""
 
-def run_cycle(*, limit_accounts: int = 25, per_account_count: int = 100, ingest_batch_size: int = 10) -> None:
-    print("=== DISCOVERY START ===", flush=True)
 
-    with psycopg2.connect(DATABASE_URL) as conn:
+def run_cycle(
+    *,
+    region: str = DEFAULT_REGION,
+    limit_accounts: int = 25,
+    per_account_count: int = 100,
+    ingest_batch_size: int = 10,
+) -> None:
+    print(f"=== DISCOVERY START ({region}) ===", flush=True)
+
+    with timer(PHASE_SECONDS, phase="discovery"), connection() as conn:
         discover_for_active_accounts(
             conn,
-            region="americas",
-            api_key=API_KEY,
+            region=region,
+            api_key=api_key(),
             per_account_count=per_account_count,
             limit_accounts=limit_accounts,
             sleep_seconds=0.10,
         )
+        metrics.refresh_queue_depth(conn, min_interval=0)
 
     print("=== DISCOVERY DONE ===", flush=True)
     print("=== INGESTION START ===", flush=True)
 
-    ingest_main(batch_size=ingest_batch_size)
+    with timer(PHASE_SECONDS, phase="ingestion"):
+        ingest_main(batch_size=ingest_batch_size, region=region)
 
     print("=== INGESTION DONE ===", flush=True)
 
 
+@dataclass
+class CrawlConfig:
+    region: str = DEFAULT_REGION
+    app_limits: str = "20:1,100:120"
+    safety: float = 0.9
+    ingest_workers: int = 4
+    ingest_batch_size: int = 10
+    accounts_per_round: int = 5
+    per_account_count: int = 100
+    # Due rows at which the budget is split evenly; more favors ingestion, fewer discovery.
+    target_backlog: int = 500
+    min_share: float = 0.1
+    rebalance_seconds: float = 10.0
+    # Longest a worker waits for new work before checking again.
+    idle_seconds: float = 30.0
+
+
+def ingestion_share(due_rows: int, config: CrawlConfig) -> float:
+    share = due_rows / (due_rows + config.target_backlog) if due_rows > 0 else 0.0
+    return min(max(share, config.min_share), 1.0 - config.min_share)
+
+
+class CrawlOrchestrator:
+    def __init__(self, config: CrawlConfig, api_key: str):
+        self.config = config
+        self.api_key = api_key
+        self.budget = RateBudget.from_spec(config.app_limits, safety=config.safety)
+        self.stop_event = threading.Event()
+        # Set when discovery enqueued something, so idle ingestion workers wake at once.
+        self.work_available = threading.Event()
+        self.threads: list[threading.Thread] = []
+        self.error: BaseException | None = None
+
+    def stop(self) -> None:
+        self.stop_event.set()
+        self.work_available.set()
+        self.budget.wake()
+
+    def _idle(self, seconds: float, event: threading.Event | None = None) -> None:
+        """Waits for `event` (or stop) for at most `seconds`."""
+        (event or self.stop_event).wait(seconds)
+
+    def _fail(self, role: str, exc: BaseException) -> None:
+        print(f"{self.config.region}/{role} stopped the crawl: {exc}", flush=True)
+        self.error = self.error or exc
+        self.stop()
+
+    def _discovery_loop(self) -> None:
+        idle = 1.0
+        with using(self.budget, "discovery", self.stop_event), connection() as conn:
+            while not self.stop_event.is_set():
+                try:
+                    with timer(PHASE_SECONDS, phase="discovery"):
+                        crawled = discover_for_active_accounts(
+                            conn,
+                            region=self.config.region,
+                            api_key=self.api_key,
+                            per_account_count=self.config.per_account_count,
+                            limit_accounts=self.config.accounts_per_round,
+                            sleep_seconds=0.0,
+                        )
+                except CrawlStopped:
+                    conn.rollback()
+                    return
+                except Exception as e:
+                    conn.rollback()
+                    if classify_error(e) == FATAL:
+                        self._fail("discovery", e)
+                        return
+                    print(f"{self.config.region} discovery error: {e}", flush=True)
+                    crawled = 0
+
+                if crawled:
+                    idle = 1.0
+                    self.work_available.set()
+                else:
+                    # No active accounts (or a failed round): back off until the next check.
+                    self._idle(idle)
+                    idle = min(idle * 2, self.config.idle_seconds)
+
+    def _ingestion_loop(self) -> None:
+        with using(self.budget, "ingestion", self.stop_event), connection() as conn:
+            while not self.stop_event.is_set():
+                # Cleared before claiming so an enqueue that lands mid-claim still wakes us.
+                self.work_available.clear()
+                try:
+                    with timer(PHASE_SECONDS, phase="ingestion"):
+                        claimed = ingest_batch(conn, self.config.ingest_batch_size, self.config.region)
+                except CrawlStopped:
+                    return
+                except Exception as e:
+                    conn.rollback()
+                    if classify_error(e) == FATAL:
+                        self._fail("ingestion", e)
+                        return
+                    print(f"{self.config.region} ingestion error: {e}", flush=True)
+                    claimed = 0
+
+                if not claimed:
+                    self._idle(self.config.idle_seconds, self.work_available)
+
+    def _balance_loop(self) -> None:
+        with connection() as conn:
+            while not self.stop_event.is_set():
+                try:
+                    with conn.cursor() as cur:
+                        cur.execute(DUE_ROWS, (self.config.region,), prepare=True)
+                        due_rows = cur.fetchone()[0]
+                    conn.commit()
+                    metrics.refresh_queue_depth(conn)
+                except Exception as e:
+                    conn.rollback()
+                    print(f"{self.config.region} balancer error: {e}", flush=True)
+                else:
+                    ingest = ingestion_share(due_rows, self.config)
+                    shares = {"ingestion": ingest, "discovery": 1.0 - ingest}
+                    self.budget.set_shares(shares)
+                    for role, share in shares.items():
+                        metrics.CRAWL_BUDGET_SHARE.set(share, region=self.config.region, role=role)
+                self._idle(self.config.rebalance_seconds)
+
+    def start(self) -> None:
+        targets = [("balancer", self._balance_loop), ("discovery", self._discovery_loop)]
+        targets += [(f"ingestion-{i}", self._ingestion_loop) for i in range(self.config.ingest_workers)]
+        for name, target in targets:
+            thread = threading.Thread(
+                target=self._guard(name, target), name=f"{self.config.region}-{name}", daemon=True,
+            )
+            thread.start()
+            self.threads.append(thread)
+
+    def _guard(self, name: str, target):
+        def run():
+            try:
+                target()
+            except BaseException as e:
+                self._fail(name, e)
+        return run
+
+    def join(self) -> None:
+        for thread in self.threads:
+            # Short waits keep the main thread responsive to signals.
+            while thread.is_alive():
+                thread.join(0.5)
+
+
+def install_signal_handlers(orchestrators: list[CrawlOrchestrator]) -> None:
+    def handle(signum, frame):
+        print(f"Received {signal.Signals(signum).name}; finishing in-flight work...", flush=True)
+        for orchestrator in orchestrators:
+            orchestrator.stop()
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+    signal.signal(signal.SIGINT, handle)
+    signal.signal(signal.SIGTERM, handle)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--once", action="store_true", help="One discovery pass, drain the queue, exit")
+    ap.add_argument(
+        "--regions",
+        default=os.getenv("CRAWL_REGIONS", DEFAULT_REGION),
+        help="Comma-separated routing regions, or 'all'",
+    )
+    ap.add_argument("--app_limits", default=os.getenv("RIOT_APP_LIMITS", CrawlConfig.app_limits))
+    ap.add_argument("--ingest_workers", type=int, default=CrawlConfig.ingest_workers, help="Per region")
+    ap.add_argument("--ingest_batch_size", type=int, default=CrawlConfig.ingest_batch_size)
+    ap.add_argument("--accounts_per_round", type=int, default=CrawlConfig.accounts_per_round)
+    ap.add_argument("--per_account_count", type=int, default=CrawlConfig.per_account_count)
+    ap.add_argument("--target_backlog", type=int, default=CrawlConfig.target_backlog)
+    profiler.add_argument(ap)
+    args = ap.parse_args()
+    profiler.start("run_crawl_cycle", args.profile)
+
+    regions = parse_regions(args.regions)
+    start_from_env()
+
+    if args.once:
+        for region in regions:
+            run_cycle(
+                region=region,
+                limit_accounts=args.accounts_per_round,
+                per_account_count=args.per_account_count,
+                ingest_batch_size=args.ingest_batch_size,
+            )
+        return
+
+    orchestrators = [
+        CrawlOrchestrator(
+            CrawlConfig(
+                region=region,
+                app_limits=args.app_limits,
+                ingest_workers=args.ingest_workers,
+                ingest_batch_size=args.ingest_batch_size,
+                accounts_per_round=args.accounts_per_round,
+                per_account_count=args.per_account_count,
+                target_backlog=args.target_backlog,
+            ),
+            api_key(),
+        )
+        for region in regions
+    ]
+    install_signal_handlers(orchestrators)
+
+    for orchestrator in orchestrators:
+        config = orchestrator.config
+        print(
+            f"=== CRAWL START {config.region}: {config.ingest_workers} ingest workers, budget "
+            f"{config.app_limits} (~{orchestrator.budget.sustained_rate:.2f} req/s sustained) ===",
+            flush=True,
+        )
+    t0 = time.monotonic()
+    for orchestrator in orchestrators:
+        orchestrator.start()
+    for orchestrator in orchestrators:
+        orchestrator.join()
+    print(f"=== CRAWL STOPPED after {time.monotonic() - t0:.0f}s ===", flush=True)
+    if any(o.error is not None and not isinstance(o.error, CrawlStopped) for o in orchestrators):
+        raise SystemExit(1)
+
+
 if __name__ == "__main__":
-    while True:
-        try:
-            print("=== CRAWL CYCLE START ===", flush=True)
-            run_cycle(limit_accounts=5, per_account_count=100, ingest_batch_size=10)
-            print("=== CRAWL CYCLE COMPLETE ===", flush=True)
-        except Exception as e:
-            print(f"Fatal error in crawl loop: {e}", flush=True)
-
-        print("Sleeping 60 seconds before next cycle...", flush=True)
-        time.sleep(60)
\ No newline at end of file
+    main()
@@ -0,0 +1,140 @@
+-- Baseline schema (formerly sql/schema/schema.sql, match_queue.sql and aggregates.sql).
+-- Every statement is idempotent so databases created from those files can adopt migrations.
+
+CREATE TABLE IF NOT EXISTS champions (
+  id           INT PRIMARY KEY,          
+  key          TEXT NOT NULL UNIQUE,    
+  name         TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS champion_tag (
+  champion_id  INT NOT NULL REFERENCES champions(id),
+  tag          TEXT NOT NULL,
+  PRIMARY KEY (champion_id, tag)
+);
+
+CREATE TABLE IF NOT EXISTS accounts (
+  puuid        TEXT PRIMARY KEY,
+  status       TEXT NOT NULL DEFAULT 'active', 
+  depth        INT  NOT NULL DEFAULT 0,        
+  last_crawled TIMESTAMPTZ
+
+);
+
+CREATE TABLE IF NOT EXISTS matches (
+  match_id      TEXT PRIMARY KEY,
+  patch         TEXT NOT NULL,          
+  queue_id      INT  NOT NULL,
+  game_datetime TIMESTAMPTZ NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS participants (
+  match_id                TEXT NOT NULL REFERENCES matches(match_id) ON DELETE CASCADE,
+  puuid                   TEXT NOT NULL REFERENCES accounts(puuid),
+  champion_id             INT  NOT NULL REFERENCES champions(id),
+  team_id                 INT  NOT NULL,            
+  win                     BOOLEAN NOT NULL,
+
+  total_damage_dealt      BIGINT,
+  physical_damage_dealt   BIGINT,
+  magic_damage_dealt      BIGINT,
+  true_damage_dealt       BIGINT,
+  damage_taken            BIGINT,
+  gold_earned             BIGINT,
+  heals                   BIGINT,
+  shields                 BIGINT,
+  kills                   INT,
+  deaths                  INT,
+  assists                 INT,
+
+  PRIMARY KEY (match_id, puuid)
+);
+
+CREATE TABLE IF NOT EXISTS participant_items (
+  match_id  TEXT NOT NULL REFERENCES matches(match_id) ON DELETE CASCADE,
+  puuid     TEXT NOT NULL REFERENCES accounts(puuid),
+  item_id   INT  NOT NULL,
+  slot      INT  NOT NULL,               -- 0..6
+  PRIMARY KEY (match_id, puuid, slot),
+  FOREIGN KEY (match_id, puuid) REFERENCES participants(match_id, puuid) ON DELETE CASCADE
+);
+
+
+CREATE TABLE IF NOT EXISTS champion_aram_mods (
+    champion_id    INT NOT NULL REFERENCES champions(id) ON DELETE CASCADE,
+    patch          TEXT NOT NULL,
+    ability_haste  REAL,
+    dmg_dealt      REAL,
+    dmg_taken      REAL,
+    healing        REAL,
+    shielding      REAL,
+    tenacity       REAL, 
+    attack_speed   REAL,
+    energy_regen   REAL,
+    PRIMARY KEY (champion_id, patch)
+);
+
+CREATE TABLE IF NOT EXISTS champion_spell_changes (
+    champion_id   INT  NOT NULL REFERENCES champions(id) ON DELETE CASCADE,
+    patch         TEXT NOT NULL,
+    spell_key     TEXT NOT NULL,          
+    idx           INT  NOT NULL,         
+    change_text   TEXT NOT NULL,
+    PRIMARY KEY (champion_id, patch, spell_key, idx)
+);
+
+CREATE TABLE IF NOT EXISTS match_queue (
+    match_id TEXT PRIMARY KEY,
+    discovered_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    fetched_at TIMESTAMP,
+
+    status TEXT NOT NULL DEFAULT 'pending'
+        CHECK (status IN ('pending', 'processing', 'done', 'error')),
+
+    discovered_from_puuid TEXT,
+    retry_count INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+
+    FOREIGN KEY (discovered_from_puuid)
+        REFERENCES accounts(puuid)
+        ON DELETE SET NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_match_queue_status
+    ON match_queue(status);
+
+-- Aggregates maintained by scripts/ingest_matches.py in the same transaction as the match insert.
+-- Rebuild from participants with: python3 -m src.datasets.aggregates --rebuild
+
+CREATE TABLE IF NOT EXISTS champion_patch_stats (
+  patch        TEXT NOT NULL,
+  champion_id  INT  NOT NULL REFERENCES champions(id),
+  games        INT  NOT NULL DEFAULT 0,
+  wins         INT  NOT NULL DEFAULT 0,
+  PRIMARY KEY (patch, champion_id)
+);
+
+-- Ally pairs on the same team; champion_a < champion_b.
+CREATE TABLE IF NOT EXISTS champion_pair_patch_stats (
+  patch        TEXT NOT NULL,
+  champion_a   INT  NOT NULL REFERENCES champions(id),
+  champion_b   INT  NOT NULL REFERENCES champions(id),
+  games        INT  NOT NULL DEFAULT 0,
+  wins         INT  NOT NULL DEFAULT 0,
+  PRIMARY KEY (patch, champion_a, champion_b),
+  CHECK (champion_a < champion_b)
+);
+
+-- One row per (match, team); champs sorted ascending.
+CREATE TABLE IF NOT EXISTS team_rosters (
+  match_id   TEXT  NOT NULL REFERENCES matches(match_id) ON DELETE CASCADE,
+  team_id    INT   NOT NULL,
+  patch      TEXT  NOT NULL,
+  queue_id   INT   NOT NULL,
+  win        BOOLEAN NOT NULL,
+  champs     INT[] NOT NULL,
+  PRIMARY KEY (match_id, team_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_team_rosters_patch
+    ON team_rosters(patch);
@@ -0,0 +1,29 @@
+-- Indexes matched to the crawler and dataset queries.
+--
+-- ingest (scripts/ingest_matches.py): WHERE status='pending' ORDER BY discovered_at LIMIT n
+-- discovery (src/crawling/discovery.py): WHERE status='active' ORDER BY last_crawled NULLS FIRST
+--
+-- bench: SELECT match_id FROM match_queue WHERE status = 'pending' ORDER BY discovered_at LIMIT 10
+-- bench: SELECT puuid FROM accounts WHERE status = 'active' ORDER BY last_crawled NULLS FIRST, random() LIMIT 25
+-- bench: SELECT count(*) FROM participants WHERE champion_id = 42
+-- bench: SELECT count(*) FROM matches WHERE patch = '16.3'
+-- bench: SELECT count(*) FROM matches WHERE game_datetime >= timestamptz '2026-01-20' AND game_datetime < timestamptz '2026-01-21'
+
+-- Only pending rows are ever polled; the partial index stays small as done rows pile up.
+DROP INDEX IF EXISTS idx_match_queue_status;
+CREATE INDEX IF NOT EXISTS idx_match_queue_pending
+    ON match_queue(discovered_at)
+    WHERE status = 'pending';
+
+CREATE INDEX IF NOT EXISTS idx_accounts_active_last_crawled
+    ON accounts(last_crawled NULLS FIRST)
+    WHERE status = 'active';
+
+CREATE INDEX IF NOT EXISTS idx_participants_champion
+    ON participants(champion_id);
+
+CREATE INDEX IF NOT EXISTS idx_matches_patch
+    ON matches(patch);
+
+CREATE INDEX IF NOT EXISTS idx_matches_game_datetime
+    ON matches(game_datetime);
@@ -0,0 +1,136 @@
+-- LIST-partition matches, participants and participant_items by patch.
+--
+-- Every analysis query is per patch, and old patches can be dropped as whole partitions
+-- (DROP TABLE matches_p14_1, participants_p14_1, participant_items_p14_1) instead of DELETEd.
+-- participants and participant_items carry patch themselves so they can be partitioned
+-- and so the keys below can include it, as Postgres requires for partitioned tables.
+--
+-- New patches get their partitions from ensure_patch_partition(), which ingestion calls
+-- once per patch before writing the first match of that patch.
+--
+-- bench: SELECT count(*) FROM matches WHERE patch = '16.3'
+-- bench: SELECT m.patch, p.champion_id, count(*) FROM participants p JOIN matches m ON m.match_id = p.match_id WHERE m.patch = '16.3' GROUP BY 1, 2
+-- bench: SELECT champion_id, count(*), count(*) FILTER (WHERE win) FROM participants WHERE patch = '16.3' GROUP BY champion_id
+-- bench: SELECT item_id, count(*) FROM participant_items WHERE patch = '16.3' GROUP BY item_id ORDER BY 2 DESC LIMIT 10
+
+ALTER TABLE team_rosters DROP CONSTRAINT IF EXISTS team_rosters_match_id_fkey;
+
+ALTER TABLE participant_items RENAME TO participant_items_unpartitioned;
+ALTER TABLE participants RENAME TO participants_unpartitioned;
+ALTER TABLE matches RENAME TO matches_unpartitioned;
+
+-- Index names are schema-wide; move the old ones out of the way.
+ALTER INDEX participant_items_pkey RENAME TO participant_items_unpartitioned_pkey;
+ALTER INDEX participants_pkey RENAME TO participants_unpartitioned_pkey;
+ALTER INDEX matches_pkey RENAME TO matches_unpartitioned_pkey;
+ALTER INDEX IF EXISTS idx_participants_champion RENAME TO idx_participants_unpartitioned_champion;
+ALTER INDEX IF EXISTS idx_matches_patch RENAME TO idx_matches_unpartitioned_patch;
+ALTER INDEX IF EXISTS idx_matches_game_datetime RENAME TO idx_matches_unpartitioned_game_datetime;
+
+CREATE TABLE matches (
+  match_id      TEXT NOT NULL,
+  patch         TEXT NOT NULL,
+  queue_id      INT  NOT NULL,
+  game_datetime TIMESTAMPTZ NOT NULL,
+  PRIMARY KEY (match_id, patch)
+) PARTITION BY LIST (patch);
+
+CREATE TABLE participants (
+  match_id                TEXT NOT NULL,
+  patch                   TEXT NOT NULL,
+  puuid                   TEXT NOT NULL REFERENCES accounts(puuid),
+  champion_id             INT  NOT NULL REFERENCES champions(id),
+  team_id                 INT  NOT NULL,
+  win                     BOOLEAN NOT NULL,
+
+  total_damage_dealt      BIGINT,
+  physical_damage_dealt   BIGINT,
+  magic_damage_dealt      BIGINT,
+  true_damage_dealt       BIGINT,
+  damage_taken            BIGINT,
+  gold_earned             BIGINT,
+  heals                   BIGINT,
+  shields                 BIGINT,
+  kills                   INT,
+  deaths                  INT,
+  assists                 INT,
+
+  PRIMARY KEY (match_id, puuid, patch),
+  FOREIGN KEY (match_id, patch) REFERENCES matches(match_id, patch) ON DELETE CASCADE
+) PARTITION BY LIST (patch);
+
+CREATE TABLE participant_items (
+  match_id  TEXT NOT NULL,
+  patch     TEXT NOT NULL,
+  puuid     TEXT NOT NULL REFERENCES accounts(puuid),
+  item_id   INT  NOT NULL,
+  slot      INT  NOT NULL,               -- 0..6
+  PRIMARY KEY (match_id, puuid, slot, patch),
+  FOREIGN KEY (match_id, puuid, patch) REFERENCES participants(match_id, puuid, patch) ON DELETE CASCADE
+) PARTITION BY LIST (patch);
+
+CREATE INDEX idx_participants_champion ON participants(champion_id);
+CREATE INDEX idx_matches_game_datetime ON matches(game_datetime);
+
+-- Creates the three partitions for one patch (e.g. '16.3' -> matches_p16_3, ...).
+-- Safe to call concurrently and repeatedly.
+CREATE OR REPLACE FUNCTION ensure_patch_partition(p_patch TEXT) RETURNS void AS $$
+DECLARE
+  suffix TEXT := 'p' || regexp_replace(p_patch, '[^0-9A-Za-z]+', '_', 'g');
+  parent TEXT;
+BEGIN
+  IF to_regclass('participant_items_' || suffix) IS NOT NULL THEN
+    RETURN;
+  END IF;
+  PERFORM pg_advisory_xact_lock(hashtext('ensure_patch_partition'));
+  FOREACH parent IN ARRAY ARRAY['matches', 'participants', 'participant_items'] LOOP
+    IF to_regclass(parent || '_' || suffix) IS NULL THEN
+      EXECUTE format(
+        'CREATE TABLE %I PARTITION OF %I FOR VALUES IN (%L)',
+        parent || '_' || suffix, parent, p_patch
+      );
+    END IF;
+  END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+DO $$
+DECLARE
+  p TEXT;
+BEGIN
+  FOR p IN SELECT DISTINCT patch FROM matches_unpartitioned LOOP
+    PERFORM ensure_patch_partition(p);
+  END LOOP;
+END;
+$$;
+
+INSERT INTO matches (match_id, patch, queue_id, game_datetime)
+SELECT match_id, patch, queue_id, game_datetime
+FROM matches_unpartitioned;
+
+INSERT INTO participants (
+  match_id, patch, puuid, champion_id, team_id, win,
+  total_damage_dealt, physical_damage_dealt, magic_damage_dealt, true_damage_dealt,
+  damage_taken, gold_earned, heals, shields,
+  kills, deaths, assists
+)
+SELECT
+  p.match_id, m.patch, p.puuid, p.champion_id, p.team_id, p.win,
+  p.total_damage_dealt, p.physical_damage_dealt, p.magic_damage_dealt, p.true_damage_dealt,
+  p.damage_taken, p.gold_earned, p.heals, p.shields,
+  p.kills, p.deaths, p.assists
+FROM participants_unpartitioned p
+JOIN matches_unpartitioned m ON m.match_id = p.match_id;
+
+INSERT INTO participant_items (match_id, patch, puuid, item_id, slot)
+SELECT i.match_id, m.patch, i.puuid, i.item_id, i.slot
+FROM participant_items_unpartitioned i
+JOIN matches_unpartitioned m ON m.match_id = i.match_id;
+
+DROP TABLE participant_items_unpartitioned;
+DROP TABLE participants_unpartitioned;
+DROP TABLE matches_unpartitioned;
+
+ALTER TABLE team_rosters
+  ADD CONSTRAINT team_rosters_match_fkey
+  FOREIGN KEY (match_id, patch) REFERENCES matches(match_id, patch) ON DELETE CASCADE;
@@ -0,0 +1,62 @@
+-- Retry scheduling, leases and an archive for finished queue rows.
+--
+-- match_queue now only holds work: 'pending' (due at next_attempt_at), 'processing'
+-- (leased until leased_until) and 'dead' (permanent failure or out of retries).
+-- Finished matches move to match_queue_archive in the same transaction as their
+-- insert, so the hot partial indexes cover a small, bounded set of rows.
+--
+-- bench: SELECT match_id FROM match_queue WHERE status = 'pending' ORDER BY discovered_at LIMIT 10
+-- bench: SELECT match_id FROM match_queue WHERE status = 'pending' AND next_attempt_at <= CURRENT_TIMESTAMP ORDER BY next_attempt_at LIMIT 10
+-- bench: SELECT match_id FROM match_queue WHERE status = 'processing' AND leased_until < CURRENT_TIMESTAMP
+-- bench: SELECT count(*) FROM match_queue GROUP BY status
+
+CREATE TABLE match_queue_archive (
+  match_id       TEXT PRIMARY KEY,
+  result         TEXT NOT NULL CHECK (result IN ('done', 'non_aram')),
+  discovered_at  TIMESTAMP NOT NULL,
+  fetched_at     TIMESTAMP NOT NULL,
+  retry_count    INTEGER NOT NULL DEFAULT 0
+);
+
+ALTER TABLE match_queue
+  ADD COLUMN next_attempt_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  ADD COLUMN leased_until    TIMESTAMP,
+  ADD COLUMN error_kind      TEXT;
+
+UPDATE match_queue SET next_attempt_at = discovered_at;
+
+INSERT INTO match_queue_archive (match_id, result, discovered_at, fetched_at, retry_count)
+SELECT q.match_id,
+       CASE WHEN EXISTS (SELECT 1 FROM matches m WHERE m.match_id = q.match_id) THEN 'done' ELSE 'non_aram' END,
+       q.discovered_at,
+       coalesce(q.fetched_at, q.discovered_at),
+       q.retry_count
+FROM match_queue q
+WHERE q.status = 'done';
+
+DELETE FROM match_queue WHERE status = 'done';
+
+-- Old 'error' rows were never retried. Bad requests / unknown ids are dead; everything
+-- else gets one more attempt under the new schedule.
+UPDATE match_queue
+SET status = CASE WHEN last_error ~ '^(400|404|422) ' THEN 'dead' ELSE 'pending' END,
+    error_kind = CASE WHEN last_error ~ '^(400|404|422) ' THEN 'permanent' ELSE 'transient' END,
+    next_attempt_at = CURRENT_TIMESTAMP
+WHERE status = 'error';
+
+-- Rows stranded in 'processing' by a crashed worker become due immediately.
+UPDATE match_queue
+SET status = 'pending', next_attempt_at = CURRENT_TIMESTAMP
+WHERE status = 'processing';
+
+ALTER TABLE match_queue DROP CONSTRAINT IF EXISTS match_queue_status_check;
+ALTER TABLE match_queue
+  ADD CONSTRAINT match_queue_status_check CHECK (status IN ('pending', 'processing', 'dead'));
+
+DROP INDEX IF EXISTS idx_match_queue_pending;
+CREATE INDEX idx_match_queue_due
+    ON match_queue(next_attempt_at)
+    WHERE status = 'pending';
+CREATE INDEX idx_match_queue_lease
+    ON match_queue(leased_until)
+    WHERE status = 'processing';
@@ -0,0 +1,53 @@
+-- Shard the crawl by Riot routing region (see src/crawling/regions.py).
+--
+-- accounts.region is the region whose match history discovery crawls for the account;
+-- match_queue.region routes the fetch and picks which regional budget pays for it.
+-- Existing rows are all from the americas crawl; queued ids are re-derived from their
+-- platform prefix anyway.
+--
+-- bench: SELECT match_id FROM match_queue WHERE status = 'pending' AND next_attempt_at <= CURRENT_TIMESTAMP ORDER BY next_attempt_at LIMIT 10
+-- bench: SELECT match_id FROM match_queue WHERE region = 'americas' AND status = 'pending' AND next_attempt_at <= CURRENT_TIMESTAMP ORDER BY next_attempt_at LIMIT 10
+-- bench: SELECT puuid FROM accounts WHERE region = 'americas' AND status = 'active' ORDER BY last_crawled NULLS FIRST, random() LIMIT 25
+
+CREATE OR REPLACE FUNCTION riot_region(p_match_id TEXT) RETURNS TEXT AS $$
+  SELECT CASE split_part(upper(p_match_id), '_', 1)
+    WHEN 'NA1' THEN 'americas'
+    WHEN 'BR1' THEN 'americas'
+    WHEN 'LA1' THEN 'americas'
+    WHEN 'LA2' THEN 'americas'
+    WHEN 'EUW1' THEN 'europe'
+    WHEN 'EUN1' THEN 'europe'
+    WHEN 'TR1' THEN 'europe'
+    WHEN 'RU' THEN 'europe'
+    WHEN 'ME1' THEN 'europe'
+    WHEN 'KR' THEN 'asia'
+    WHEN 'JP1' THEN 'asia'
+    WHEN 'OC1' THEN 'sea'
+    WHEN 'PH2' THEN 'sea'
+    WHEN 'SG2' THEN 'sea'
+    WHEN 'TH2' THEN 'sea'
+    WHEN 'TW2' THEN 'sea'
+    WHEN 'VN2' THEN 'sea'
+    ELSE 'americas'
+  END;
+$$ LANGUAGE sql IMMUTABLE;
+
+ALTER TABLE accounts
+  ADD COLUMN region TEXT NOT NULL DEFAULT 'americas'
+    CHECK (region IN ('americas', 'europe', 'asia', 'sea'));
+
+ALTER TABLE match_queue
+  ADD COLUMN region TEXT NOT NULL DEFAULT 'americas'
+    CHECK (region IN ('americas', 'europe', 'asia', 'sea'));
+
+UPDATE match_queue SET region = riot_region(match_id) WHERE riot_region(match_id) <> 'americas';
+
+DROP INDEX IF EXISTS idx_accounts_active_last_crawled;
+CREATE INDEX idx_accounts_active_region_last_crawled
+    ON accounts(region, last_crawled NULLS FIRST)
+    WHERE status = 'active';
+
+DROP INDEX IF EXISTS idx_match_queue_due;
+CREATE INDEX idx_match_queue_due
+    ON match_queue(region, next_attempt_at)
+    WHERE status = 'pending';
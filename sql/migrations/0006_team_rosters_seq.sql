@@ -0,0 +1,11 @@
+-- Monotonic sequence on team_rosters so in-process caches (src/analytics/synergy.py)
+-- can fetch only the rosters added since their last refresh.
+--
+-- bench: SELECT count(*) FROM team_rosters WHERE patch = '16.3'
+-- bench: SELECT a.match_id FROM team_rosters a JOIN team_rosters b ON b.match_id = a.match_id AND b.team_id > a.team_id WHERE a.patch = '16.3' AND a.seq > (SELECT max(seq) - 1000 FROM team_rosters)
+
+ALTER TABLE team_rosters ADD COLUMN seq BIGINT GENERATED ALWAYS AS IDENTITY;
+
+-- (patch, seq) also serves every patch-only lookup the old index did.
+CREATE INDEX idx_team_rosters_patch_seq ON team_rosters(patch, seq);
+DROP INDEX IF EXISTS idx_team_rosters_patch;
@@ -0,0 +1,187 @@
+-- Integer surrogate keys for the fact tables.
+--
+-- participants and participant_items repeated the 78-character puuid and the match_id
+-- text in every row and in every primary / foreign key index. Matches now get a BIGINT
+-- match_key from match_keys, accounts a BIGINT account_id, and matches, participants,
+-- participant_items and team_rosters store only those. Join match_keys / accounts to
+-- get the Riot ids back. match_queue and match_queue_archive keep the text ids, since
+-- they are what the API takes.
+--
+-- Ingestion resolves the keys with src/db/keys.py, which caches known mappings.
+--
+-- bench: SELECT count(*) FROM (SELECT 1 FROM participants WHERE patch = '16.3' GROUP BY match_id, team_id) t
+-- bench-after: SELECT count(*) FROM (SELECT 1 FROM participants WHERE patch = '16.3' GROUP BY match_key, team_id) t
+-- bench: SELECT p.champion_id, count(*) FROM participants p JOIN participant_items i ON i.match_id = p.match_id AND i.puuid = p.puuid AND i.patch = p.patch WHERE p.patch = '16.3' AND i.slot = 0 GROUP BY 1
+-- bench-after: SELECT p.champion_id, count(*) FROM participants p JOIN participant_items i ON i.match_key = p.match_key AND i.account_id = p.account_id AND i.patch = p.patch WHERE p.patch = '16.3' AND i.slot = 0 GROUP BY 1
+-- bench: SELECT count(*) FROM participants p JOIN matches m ON m.match_id = p.match_id AND m.patch = p.patch WHERE p.patch = '16.3'
+-- bench-after: SELECT count(*) FROM participants p JOIN matches m ON m.match_key = p.match_key AND m.patch = p.patch WHERE p.patch = '16.3'
+-- bench: SELECT a.champs, b.champs FROM team_rosters a JOIN team_rosters b ON b.match_id = a.match_id AND b.team_id > a.team_id WHERE a.patch = '16.3'
+-- bench-after: SELECT a.champs, b.champs FROM team_rosters a JOIN team_rosters b ON b.match_key = a.match_key AND b.team_id > a.team_id WHERE a.patch = '16.3'
+
+CREATE TABLE match_keys (
+  match_key  BIGINT GENERATED ALWAYS AS IDENTITY PRIMARY KEY,
+  match_id   TEXT NOT NULL UNIQUE
+);
+
+INSERT INTO match_keys (match_id)
+SELECT match_id FROM matches ORDER BY game_datetime, match_id;
+
+ALTER TABLE accounts ADD COLUMN account_id BIGINT GENERATED ALWAYS AS IDENTITY;
+ALTER TABLE accounts ADD CONSTRAINT accounts_account_id_key UNIQUE (account_id);
+
+-- Move the text-keyed tables and their partitions out of the way. Partition names are
+-- reused by ensure_patch_partition(); index names are schema-wide.
+ALTER TABLE team_rosters DROP CONSTRAINT IF EXISTS team_rosters_match_fkey;
+
+DO $$
+DECLARE
+  parent TEXT;
+  rel    TEXT;
+  idx    TEXT;
+BEGIN
+  FOREACH parent IN ARRAY ARRAY['participant_items', 'participants', 'matches', 'team_rosters'] LOOP
+    FOR rel IN
+      SELECT parent
+      UNION ALL
+      SELECT c.relname
+      FROM pg_inherits i
+      JOIN pg_class c ON c.oid = i.inhrelid
+      WHERE i.inhparent = to_regclass(parent)
+    LOOP
+      FOR idx IN
+        SELECT ic.relname
+        FROM pg_index x
+        JOIN pg_class ic ON ic.oid = x.indexrelid
+        WHERE x.indrelid = to_regclass(rel)
+      LOOP
+        EXECUTE format('ALTER INDEX %I RENAME TO %I', idx, idx || '_textkey');
+      END LOOP;
+    END LOOP;
+    FOR rel IN
+      SELECT c.relname
+      FROM pg_inherits i
+      JOIN pg_class c ON c.oid = i.inhrelid
+      WHERE i.inhparent = to_regclass(parent)
+    LOOP
+      EXECUTE format('ALTER TABLE %I RENAME TO %I', rel, rel || '_textkey');
+    END LOOP;
+    EXECUTE format('ALTER TABLE %I RENAME TO %I', parent, parent || '_textkey');
+  END LOOP;
+END;
+$$;
+ALTER SEQUENCE IF EXISTS team_rosters_seq_seq RENAME TO team_rosters_textkey_seq_seq;
+
+CREATE TABLE matches (
+  match_key     BIGINT NOT NULL REFERENCES match_keys(match_key),
+  patch         TEXT NOT NULL,
+  queue_id      INT  NOT NULL,
+  game_datetime TIMESTAMPTZ NOT NULL,
+  PRIMARY KEY (match_key, patch)
+) PARTITION BY LIST (patch);
+
+CREATE TABLE participants (
+  match_key               BIGINT NOT NULL,
+  patch                   TEXT NOT NULL,
+  account_id              BIGINT NOT NULL REFERENCES accounts(account_id),
+  champion_id             INT  NOT NULL REFERENCES champions(id),
+  team_id                 INT  NOT NULL,
+  win                     BOOLEAN NOT NULL,
+
+  total_damage_dealt      BIGINT,
+  physical_damage_dealt   BIGINT,
+  magic_damage_dealt      BIGINT,
+  true_damage_dealt       BIGINT,
+  damage_taken            BIGINT,
+  gold_earned             BIGINT,
+  heals                   BIGINT,
+  shields                 BIGINT,
+  kills                   INT,
+  deaths                  INT,
+  assists                 INT,
+
+  PRIMARY KEY (match_key, account_id, patch),
+  FOREIGN KEY (match_key, patch) REFERENCES matches(match_key, patch) ON DELETE CASCADE
+) PARTITION BY LIST (patch);
+
+CREATE TABLE participant_items (
+  match_key   BIGINT NOT NULL,
+  patch       TEXT NOT NULL,
+  account_id  BIGINT NOT NULL REFERENCES accounts(account_id),
+  item_id     INT  NOT NULL,
+  slot        INT  NOT NULL,               -- 0..6
+  PRIMARY KEY (match_key, account_id, slot, patch),
+  FOREIGN KEY (match_key, account_id, patch)
+    REFERENCES participants(match_key, account_id, patch) ON DELETE CASCADE
+) PARTITION BY LIST (patch);
+
+CREATE INDEX idx_participants_champion ON participants(champion_id);
+CREATE INDEX idx_matches_game_datetime ON matches(game_datetime);
+
+-- One row per (match, team); champs sorted ascending. seq values are carried over so
+-- cache watermarks (src/analytics/synergy.py) stay comparable.
+CREATE TABLE team_rosters (
+  match_key  BIGINT NOT NULL,
+  team_id    INT   NOT NULL,
+  patch      TEXT  NOT NULL,
+  queue_id   INT   NOT NULL,
+  win        BOOLEAN NOT NULL,
+  champs     INT[] NOT NULL,
+  seq        BIGINT GENERATED ALWAYS AS IDENTITY,
+  PRIMARY KEY (match_key, team_id),
+  FOREIGN KEY (match_key, patch) REFERENCES matches(match_key, patch) ON DELETE CASCADE
+);
+
+CREATE INDEX idx_team_rosters_patch_seq ON team_rosters(patch, seq);
+
+DO $$
+DECLARE
+  p TEXT;
+BEGIN
+  FOR p IN SELECT DISTINCT patch FROM matches_textkey LOOP
+    PERFORM ensure_patch_partition(p);
+  END LOOP;
+END;
+$$;
+
+INSERT INTO matches (match_key, patch, queue_id, game_datetime)
+SELECT k.match_key, m.patch, m.queue_id, m.game_datetime
+FROM matches_textkey m
+JOIN match_keys k ON k.match_id = m.match_id;
+
+INSERT INTO participants (
+  match_key, patch, account_id, champion_id, team_id, win,
+  total_damage_dealt, physical_damage_dealt, magic_damage_dealt, true_damage_dealt,
+  damage_taken, gold_earned, heals, shields,
+  kills, deaths, assists
+)
+SELECT
+  k.match_key, p.patch, a.account_id, p.champion_id, p.team_id, p.win,
+  p.total_damage_dealt, p.physical_damage_dealt, p.magic_damage_dealt, p.true_damage_dealt,
+  p.damage_taken, p.gold_earned, p.heals, p.shields,
+  p.kills, p.deaths, p.assists
+FROM participants_textkey p
+JOIN match_keys k ON k.match_id = p.match_id
+JOIN accounts a ON a.puuid = p.puuid;
+
+INSERT INTO participant_items (match_key, patch, account_id, item_id, slot)
+SELECT k.match_key, i.patch, a.account_id, i.item_id, i.slot
+FROM participant_items_textkey i
+JOIN match_keys k ON k.match_id = i.match_id
+JOIN accounts a ON a.puuid = i.puuid;
+
+INSERT INTO team_rosters (match_key, team_id, patch, queue_id, win, champs, seq)
+OVERRIDING SYSTEM VALUE
+SELECT k.match_key, tr.team_id, tr.patch, tr.queue_id, tr.win, tr.champs, tr.seq
+FROM team_rosters_textkey tr
+JOIN match_keys k ON k.match_id = tr.match_id;
+
+SELECT setval(
+  pg_get_serial_sequence('team_rosters', 'seq'),
+  coalesce((SELECT max(seq) FROM team_rosters), 0) + 1,
+  false
+);
+
+DROP TABLE team_rosters_textkey;
+DROP TABLE participant_items_textkey;
+DROP TABLE participants_textkey;
+DROP TABLE matches_textkey;
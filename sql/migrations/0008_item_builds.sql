@@ -0,0 +1,70 @@
+-- Champion item-build index over participant_items.
+--
+-- champion_item_patch_stats counts, per (patch, champion), the games in which the
+-- champion finished with an item and how many of them it won. champion_build_patch_stats
+-- does the same for whole builds: the sorted, distinct item ids of inventory slots 0-5.
+-- The trinket slot (6) is left out of both.
+--
+-- Ingestion queues each new match in item_build_pending, in the same transaction as its
+-- insert. src/analytics/item_builds.py refresh folds the queued matches into the stats
+-- and deletes them from the queue in one transaction, so each match is counted once
+-- and a refresh only reads the matches added since the last one. Top-k lookups read the
+-- (patch, champion_id, games DESC) indexes, so their cost does not grow with the number
+-- of matches.
+--
+-- bench: SELECT i.item_id, count(*), count(*) FILTER (WHERE p.win) FROM participants p JOIN participant_items i ON i.match_key = p.match_key AND i.account_id = p.account_id AND i.patch = p.patch WHERE p.patch = '16.3' AND p.champion_id = 42 AND i.slot < 6 GROUP BY 1 ORDER BY 2 DESC LIMIT 10
+-- bench-after: SELECT item_id, games, wins FROM champion_item_patch_stats WHERE patch = '16.3' AND champion_id = 42 ORDER BY games DESC LIMIT 10
+-- bench: SELECT b.build, count(*), count(*) FILTER (WHERE p.win) FROM participants p CROSS JOIN LATERAL (SELECT array_agg(DISTINCT i.item_id ORDER BY i.item_id) AS build FROM participant_items i WHERE i.match_key = p.match_key AND i.account_id = p.account_id AND i.patch = p.patch AND i.slot < 6) b WHERE p.patch = '16.3' AND p.champion_id = 42 AND b.build IS NOT NULL GROUP BY 1 ORDER BY 2 DESC LIMIT 10
+-- bench-after: SELECT build, games, wins FROM champion_build_patch_stats WHERE patch = '16.3' AND champion_id = 42 ORDER BY games DESC LIMIT 10
+
+CREATE TABLE champion_item_patch_stats (
+  patch        TEXT NOT NULL,
+  champion_id  INT  NOT NULL REFERENCES champions(id),
+  item_id      INT  NOT NULL,
+  games        INT  NOT NULL DEFAULT 0,
+  wins         INT  NOT NULL DEFAULT 0,
+  PRIMARY KEY (patch, champion_id, item_id)
+);
+
+CREATE TABLE champion_build_patch_stats (
+  patch        TEXT  NOT NULL,
+  champion_id  INT   NOT NULL REFERENCES champions(id),
+  build        INT[] NOT NULL,             -- sorted, distinct item ids of slots 0-5
+  games        INT   NOT NULL DEFAULT 0,
+  wins         INT   NOT NULL DEFAULT 0,
+  PRIMARY KEY (patch, champion_id, build)
+);
+
+CREATE INDEX idx_champion_item_patch_stats_games
+  ON champion_item_patch_stats(patch, champion_id, games DESC);
+CREATE INDEX idx_champion_build_patch_stats_games
+  ON champion_build_patch_stats(patch, champion_id, games DESC);
+
+-- Matches ingested but not yet in the stats. No foreign key, so dropping a patch's
+-- partitions does not have to clear it first.
+CREATE TABLE item_build_pending (
+  match_key  BIGINT PRIMARY KEY,
+  patch      TEXT NOT NULL
+);
+
+-- Existing matches are indexed here rather than queued.
+INSERT INTO champion_item_patch_stats (patch, champion_id, item_id, games, wins)
+SELECT p.patch, p.champion_id, i.item_id, count(*), count(*) FILTER (WHERE p.win)
+FROM participants p
+JOIN (
+  SELECT DISTINCT match_key, account_id, patch, item_id
+  FROM participant_items
+  WHERE slot < 6
+) i ON i.match_key = p.match_key AND i.account_id = p.account_id AND i.patch = p.patch
+GROUP BY p.patch, p.champion_id, i.item_id;
+
+INSERT INTO champion_build_patch_stats (patch, champion_id, build, games, wins)
+SELECT p.patch, p.champion_id, b.build, count(*), count(*) FILTER (WHERE p.win)
+FROM participants p
+JOIN (
+  SELECT match_key, account_id, patch, array_agg(DISTINCT item_id ORDER BY item_id) AS build
+  FROM participant_items
+  WHERE slot < 6
+  GROUP BY match_key, account_id, patch
+) b ON b.match_key = p.match_key AND b.account_id = p.account_id AND b.patch = p.patch
+GROUP BY p.patch, p.champion_id, b.build;
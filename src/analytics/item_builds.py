@@ -0,0 +1,254 @@
+"""
+Champion item-build index (sql/migrations/0008_item_builds.sql).
+
+Per (patch, champion): how often each item, and each whole build (the sorted distinct
+items of slots 0-5), was finished with, and how many of those games were won.
+
+  enqueue_match()   ingestion queues a newly inserted match, in the caller's transaction
+  refresh()         folds queued matches into the stats; reads only those matches
+  top_items()       top-k items of a champion on a patch
+  top_builds()      top-k builds of a champion on a patch
+  rebuild()         recomputes everything from participant_items
+
+Refreshing deletes a batch from item_build_pending and upserts its counts in the same
+transaction, so a match is counted exactly once even if a refresh dies half-way.
+Concurrent refreshes take turns on an advisory lock. Top-k by games is read off the
+(patch, champion_id, games DESC) index. By win rate it reads that champion's rows for
+the patch. Neither cost grows with the number of matches.
+
+  python3 -m src.analytics.item_builds refresh
+  python3 -m src.analytics.item_builds top --patch 16.3 --champion 42 --k 10
+  python3 -m src.analytics.item_builds top --patch 16.3 --champion 42 --builds --order win_rate --min_games 50
+"""
+from __future__ import annotations
+
+import argparse
+import time
+
+from src.db.connection import connection, transaction
+from src.utils import profiler
+from src.utils.versioning import patch_mm
+
+REFRESH_BATCH = 2000
+
+ENQUEUE_MATCH = """
+INSERT INTO item_build_pending (match_key, patch)
+VALUES (%s, %s)
+ON CONFLICT (match_key) DO NOTHING;
+"""
+
+REFRESH_LOCK = "SELECT pg_try_advisory_xact_lock(hashtext('item_builds_refresh'));"
+
+CLAIM_PENDING = """
+DELETE FROM item_build_pending
+WHERE match_key IN (
+  SELECT match_key FROM item_build_pending
+  ORDER BY match_key
+  LIMIT %s
+  FOR UPDATE SKIP LOCKED
+)
+RETURNING match_key, patch;
+"""
+
+# `patch = ANY(...)` lets the planner prune to the batch's partitions.
+UPSERT_ITEM_STATS = """
+INSERT INTO champion_item_patch_stats (patch, champion_id, item_id, games, wins)
+SELECT p.patch, p.champion_id, i.item_id, count(*), count(*) FILTER (WHERE p.win)
+FROM participants p
+JOIN (
+  SELECT DISTINCT match_key, account_id, patch, item_id
+  FROM participant_items
+  WHERE match_key = ANY(%s) AND patch = ANY(%s) AND slot < 6
+) i ON i.match_key = p.match_key AND i.account_id = p.account_id AND i.patch = p.patch
+WHERE p.match_key = ANY(%s) AND p.patch = ANY(%s)
+GROUP BY p.patch, p.champion_id, i.item_id
+ON CONFLICT (patch, champion_id, item_id) DO UPDATE
+SET games = champion_item_patch_stats.games + EXCLUDED.games,
+    wins  = champion_item_patch_stats.wins + EXCLUDED.wins;
+"""
+
+UPSERT_BUILD_STATS = """
+INSERT INTO champion_build_patch_stats (patch, champion_id, build, games, wins)
+SELECT p.patch, p.champion_id, b.build, count(*), count(*) FILTER (WHERE p.win)
+FROM participants p
+JOIN (
+  SELECT match_key, account_id, patch, array_agg(DISTINCT item_id ORDER BY item_id) AS build
+  FROM participant_items
+  WHERE match_key = ANY(%s) AND patch = ANY(%s) AND slot < 6
+  GROUP BY match_key, account_id, patch
+) b ON b.match_key = p.match_key AND b.account_id = p.account_id AND b.patch = p.patch
+WHERE p.match_key = ANY(%s) AND p.patch = ANY(%s)
+GROUP BY p.patch, p.champion_id, b.build
+ON CONFLICT (patch, champion_id, build) DO UPDATE
+SET games = champion_build_patch_stats.games + EXCLUDED.games,
+    wins  = champion_build_patch_stats.wins + EXCLUDED.wins;
+"""
+
+# Truncating the queue first blocks ingests until the rebuild commits; a match that
+# committed earlier is read by the recompute, one that commits later is queued.
+REBUILD_STATEMENTS = [
+    "TRUNCATE item_build_pending, champion_item_patch_stats, champion_build_patch_stats;",
+    """
+    INSERT INTO champion_item_patch_stats (patch, champion_id, item_id, games, wins)
+    SELECT p.patch, p.champion_id, i.item_id, count(*), count(*) FILTER (WHERE p.win)
+    FROM participants p
+    JOIN (
+      SELECT DISTINCT match_key, account_id, patch, item_id
+      FROM participant_items
+      WHERE slot < 6
+    ) i ON i.match_key = p.match_key AND i.account_id = p.account_id AND i.patch = p.patch
+    GROUP BY p.patch, p.champion_id, i.item_id;
+    """,
+    """
+    INSERT INTO champion_build_patch_stats (patch, champion_id, build, games, wins)
+    SELECT p.patch, p.champion_id, b.build, count(*), count(*) FILTER (WHERE p.win)
+    FROM participants p
+    JOIN (
+      SELECT match_key, account_id, patch, array_agg(DISTINCT item_id ORDER BY item_id) AS build
+      FROM participant_items
+      WHERE slot < 6
+      GROUP BY match_key, account_id, patch
+    ) b ON b.match_key = p.match_key AND b.account_id = p.account_id AND b.patch = p.patch
+    GROUP BY p.patch, p.champion_id, b.build;
+    """,
+]
+
+# pick_rate is games over the champion's games on the patch (champion_patch_stats).
+TOP_TEMPLATE = """
+SELECT s.{key}, s.games, s.wins, s.games::float8 / nullif(c.games, 0)
+FROM {table} s
+LEFT JOIN champion_patch_stats c ON c.patch = s.patch AND c.champion_id = s.champion_id
+WHERE s.patch = %s AND s.champion_id = %s AND s.games >= %s
+ORDER BY {order}
+LIMIT %s;
+"""
+ORDERS = {
+    "games": "s.games DESC",
+    "win_rate": "s.wins::float8 / s.games DESC, s.games DESC",
+}
+TOP_QUERIES = {
+    (kind, order): TOP_TEMPLATE.format(key=key, table=table, order=sql_order)
+    for kind, key, table in (
+        ("items", "item_id", "champion_item_patch_stats"),
+        ("builds", "build", "champion_build_patch_stats"),
+    )
+    for order, sql_order in ORDERS.items()
+}
+
+
+def enqueue_match(cur, match_key: int, patch: str) -> None:
+    """Queues a newly inserted match for the next refresh. Runs in the caller's transaction."""
+    cur.execute(ENQUEUE_MATCH, (match_key, patch), prepare=True)
+
+
+def refresh_batch(conn, batch_size: int = REFRESH_BATCH) -> int | None:
+    """
+    Folds up to `batch_size` queued matches into the stats in one transaction. Returns
+    how many were folded, or None if another refresh holds the lock. Commits.
+    """
+    with conn.transaction(), conn.cursor() as cur:
+        cur.execute(REFRESH_LOCK)
+        if not cur.fetchone()[0]:
+            return None
+        cur.execute(CLAIM_PENDING, (batch_size,), prepare=True)
+        rows = cur.fetchall()
+        if not rows:
+            return 0
+        keys = [key for key, _ in rows]
+        patches = sorted({patch for _, patch in rows})
+        params = (keys, patches, keys, patches)
+        with profiler.stage("items"):
+            cur.execute(UPSERT_ITEM_STATS, params, prepare=True)
+        with profiler.stage("builds"):
+            cur.execute(UPSERT_BUILD_STATS, params, prepare=True)
+    return len(rows)
+
+
+def refresh(conn, batch_size: int = REFRESH_BATCH) -> int:
+    """Folds every queued match into the stats, one committed batch at a time."""
+    total = 0
+    while True:
+        done = refresh_batch(conn, batch_size)
+        if not done:
+            return total
+        total += done
+
+
+def rebuild(conn) -> None:
+    with conn.cursor() as cur:
+        for statement in REBUILD_STATEMENTS:
+            cur.execute(statement)
+
+
+def _top(conn, kind: str, patch: str, champion_id: int, k: int, min_games: int, order: str) -> list[dict]:
+    if order not in ORDERS:
+        raise ValueError(f"order must be one of {sorted(ORDERS)}, got {order!r}")
+    key = "item_id" if kind == "items" else "build"
+    with conn.cursor() as cur:
+        cur.execute(
+            TOP_QUERIES[(kind, order)],
+            (patch_mm(patch), champion_id, max(min_games, 1), k),
+            prepare=True,
+        )
+        rows = cur.fetchall()
+    return [
+        {
+            key: value if kind == "items" else tuple(value),
+            "games": games,
+            "wins": wins,
+            "win_rate": round(wins / games, 4),
+            "pick_rate": round(pick_rate, 4) if pick_rate is not None else None,
+        }
+        for value, games, wins, pick_rate in rows
+    ]
+
+
+def top_items(conn, patch: str, champion_id: int, k: int = 10, *, min_games: int = 1, order: str = "games") -> list[dict]:
+    return _top(conn, "items", patch, champion_id, k, min_games, order)
+
+
+def top_builds(conn, patch: str, champion_id: int, k: int = 10, *, min_games: int = 1, order: str = "games") -> list[dict]:
+    return _top(conn, "builds", patch, champion_id, k, min_games, order)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Champion item-build index")
+    sub = ap.add_subparsers(dest="command", required=True)
+
+    p_refresh = sub.add_parser("refresh", help="Fold newly ingested matches into the index")
+    p_refresh.add_argument("--batch_size", type=int, default=REFRESH_BATCH)
+
+    sub.add_parser("rebuild", help="Recompute the index from participant_items")
+
+    p_top = sub.add_parser("top", help="Top-k items (or builds) of a champion on a patch")
+    p_top.add_argument("--patch", required=True)
+    p_top.add_argument("--champion", type=int, required=True, help="Champion id")
+    p_top.add_argument("--k", type=int, default=10)
+    p_top.add_argument("--builds", action="store_true", help="Whole builds instead of single items")
+    p_top.add_argument("--order", choices=sorted(ORDERS), default="games")
+    p_top.add_argument("--min_games", type=int, default=1)
+
+    # After the subcommand, where its own options go: `<module> <command> --profile`.
+    for parser in sub.choices.values():
+        profiler.add_argument(parser)
+    args = ap.parse_args()
+    profiler.start("item_builds", args.profile)
+
+    if args.command == "refresh":
+        t0 = time.perf_counter()
+        with connection() as conn:
+            n = refresh(conn, args.batch_size)
+        print(f"Indexed {n} matches in {time.perf_counter() - t0:.2f}s")
+    elif args.command == "rebuild":
+        with transaction() as conn:
+            rebuild(conn)
+        print("Item-build index rebuilt.")
+    else:
+        top = top_builds if args.builds else top_items
+        with connection() as conn:
+            for entry in top(conn, args.patch, args.champion, args.k, min_games=args.min_games, order=args.order):
+                print(entry)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,370 @@
+"""
+In-process champion analytics for one patch: win rates, ally synergy and enemy counters.
+
+A patch is loaded from team_rosters as dense arrays, one row per match:
+
+  blue, red   (M, 5) int16 champion ids   (blue = lower team_id)
+  blue_win    (M,)   bool
+
+compute_matrices() turns them into C x C count matrices with np.bincount over flattened
+(row_champ * C + col_champ) keys -- 10 ally pairs per team and 25 enemy pairs per match --
+so a full patch takes milliseconds to a few seconds instead of per-pair GROUP BYs.
+
+  ally_games[a, b]   games with a and b on the same team (symmetric)
+  ally_wins[a, b]    ... that the team won
+  enemy_games[a, b]  games with a facing b
+  enemy_wins[a, b]   ... that a's team won
+
+bootstrap_intervals() attaches percentile confidence intervals using a Poisson bootstrap
+(each match reweighted by Poisson(1)), with the replicates spread over a process pool.
+
+Loaded arrays are cached per patch under data/cache/analytics/ and refreshed incrementally
+from team_rosters.seq (sql/migrations/0006_team_rosters_seq.sql).
+
+  python3 -m src.analytics.synergy --patch 16.3 --kind ally --min_games 100 --bootstrap 200
+"""
+from __future__ import annotations
+
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from itertools import combinations
+
+import numpy as np
+
+from src.db.connection import connection
+from src.utils import profiler
+from src.utils.cache import CACHE_DIR, read_pickle, write_pickle
+
+ANALYTICS_CACHE_DIR = CACHE_DIR / "analytics"
+CACHE_VERSION = 2
+
+# Rosters commit in ingest-transaction order, not seq order; re-reading a trailing window
+# (and dropping matches already cached) catches rows that committed late.
+SEQ_OVERLAP = 5000
+
+ALLY_PAIRS = np.array(list(combinations(range(5), 2)))
+
+FETCH_MATCHES = """
+SELECT a.match_key, a.champs, b.champs, a.win, greatest(a.seq, b.seq)
+FROM team_rosters a
+JOIN team_rosters b ON b.match_key = a.match_key AND b.team_id > a.team_id
+WHERE a.patch = %s
+  AND a.seq > %s
+  AND cardinality(a.champs) = 5
+  AND cardinality(b.champs) = 5;
+"""
+
+
+@dataclass
+class PatchTeams:
+    patch: str
+    match_keys: np.ndarray
+    blue: np.ndarray
+    red: np.ndarray
+    blue_win: np.ndarray
+    watermark: int = 0
+
+    @classmethod
+    def empty(cls, patch: str) -> "PatchTeams":
+        return cls(
+            patch=patch,
+            match_keys=np.empty(0, dtype=np.int64),
+            blue=np.empty((0, 5), dtype=np.int16),
+            red=np.empty((0, 5), dtype=np.int16),
+            blue_win=np.empty(0, dtype=bool),
+        )
+
+    def __len__(self) -> int:
+        return len(self.match_keys)
+
+    def extend(self, other: "PatchTeams") -> "PatchTeams":
+        keep = ~np.isin(other.match_keys, self.match_keys)
+        return PatchTeams(
+            patch=self.patch,
+            match_keys=np.concatenate([self.match_keys, other.match_keys[keep]]),
+            blue=np.concatenate([self.blue, other.blue[keep]]),
+            red=np.concatenate([self.red, other.red[keep]]),
+            blue_win=np.concatenate([self.blue_win, other.blue_win[keep]]),
+            watermark=max(self.watermark, other.watermark),
+        )
+
+
+def _cache_path(patch: str):
+    return ANALYTICS_CACHE_DIR / f"teams-{patch}-v{CACHE_VERSION}.pkl"
+
+
+def fetch_patch_teams(conn, patch: str, after_seq: int = 0) -> PatchTeams:
+    with conn.cursor() as cur:
+        cur.execute(FETCH_MATCHES, (patch, after_seq))
+        rows = cur.fetchall()
+    if not rows:
+        return PatchTeams.empty(patch)
+
+    return PatchTeams(
+        patch=patch,
+        match_keys=np.array([r[0] for r in rows], dtype=np.int64),
+        blue=np.array([r[1] for r in rows], dtype=np.int16),
+        red=np.array([r[2] for r in rows], dtype=np.int16),
+        blue_win=np.array([r[3] for r in rows], dtype=bool),
+        watermark=max(r[4] for r in rows),
+    )
+
+
+def load_patch_teams(conn, patch: str, *, full: bool = False) -> PatchTeams:
+    """
+    Cached arrays for `patch`, topped up with rosters added since the last call.
+    full=True reloads from scratch (needed after src.datasets.aggregates --rebuild).
+    """
+    path = _cache_path(patch)
+    cached = None if full or not path.exists() else read_pickle(path)
+
+    if cached is None:
+        teams = fetch_patch_teams(conn, patch)
+    else:
+        since = max(cached.watermark - SEQ_OVERLAP, 0)
+        teams = cached.extend(fetch_patch_teams(conn, patch, since))
+        if len(teams) == len(cached):
+            return cached
+
+    write_pickle(path, teams)
+    return teams
+
+
+@dataclass
+class SynergyMatrices:
+    champions: np.ndarray
+    champ_games: np.ndarray
+    champ_wins: np.ndarray
+    ally_games: np.ndarray
+    ally_wins: np.ndarray
+    enemy_games: np.ndarray
+    enemy_wins: np.ndarray
+
+    @staticmethod
+    def _rate(wins: np.ndarray, games: np.ndarray) -> np.ndarray:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(games > 0, wins / games, np.nan)
+
+    def win_rate(self) -> np.ndarray:
+        return self._rate(self.champ_wins, self.champ_games)
+
+    def ally_win_rate(self) -> np.ndarray:
+        return self._rate(self.ally_wins, self.ally_games)
+
+    def enemy_win_rate(self) -> np.ndarray:
+        return self._rate(self.enemy_wins, self.enemy_games)
+
+    def synergy(self) -> np.ndarray:
+        """Pair win rate minus the mean of the two champions' own win rates."""
+        wr = self.win_rate()
+        return self.ally_win_rate() - (wr[:, None] + wr[None, :]) / 2
+
+    def counter(self) -> np.ndarray:
+        """Win rate of a against b minus a's overall win rate."""
+        return self.enemy_win_rate() - self.win_rate()[:, None]
+
+
+def _champion_index(teams: PatchTeams) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    champions = np.unique(np.concatenate([teams.blue.ravel(), teams.red.ravel()]))
+    bi = np.searchsorted(champions, teams.blue).astype(np.int64)
+    ri = np.searchsorted(champions, teams.red).astype(np.int64)
+    return champions, bi, ri
+
+
+def _counts(bi: np.ndarray, ri: np.ndarray, blue_win: np.ndarray, c: int, weights: np.ndarray | None = None):
+    """
+    (champ_games, champ_wins, ally_games, ally_wins, enemy_games, enemy_wins) as flat
+    arrays; ally/enemy are length c*c. `weights` reweights matches (bootstrap).
+    """
+    m = len(blue_win)
+    w = np.ones(m) if weights is None else weights.astype(np.float64)
+    bw = w * blue_win
+    rw = w - bw
+
+    slots = np.concatenate([bi.ravel(), ri.ravel()])
+    champ_games = np.bincount(slots, weights=np.concatenate([np.repeat(w, 5), np.repeat(w, 5)]), minlength=c)
+    champ_wins = np.bincount(slots, weights=np.concatenate([np.repeat(bw, 5), np.repeat(rw, 5)]), minlength=c)
+
+    # Ally pairs: 10 per team, keyed (min, max) and mirrored afterwards.
+    a = np.concatenate([bi[:, ALLY_PAIRS[:, 0]], ri[:, ALLY_PAIRS[:, 0]]])
+    b = np.concatenate([bi[:, ALLY_PAIRS[:, 1]], ri[:, ALLY_PAIRS[:, 1]]])
+    keys = (np.minimum(a, b) * c + np.maximum(a, b)).ravel()
+    team_w = np.repeat(np.concatenate([w, w]), len(ALLY_PAIRS))
+    team_win_w = np.repeat(np.concatenate([bw, rw]), len(ALLY_PAIRS))
+    ally_games = np.bincount(keys, weights=team_w, minlength=c * c).reshape(c, c)
+    ally_wins = np.bincount(keys, weights=team_win_w, minlength=c * c).reshape(c, c)
+    ally_games = ally_games + ally_games.T
+    ally_wins = ally_wins + ally_wins.T
+
+    # Enemy pairs: 25 per match, once from each side.
+    blue_keys = (bi[:, :, None] * c + ri[:, None, :]).ravel()
+    red_keys = (ri[:, :, None] * c + bi[:, None, :]).ravel()
+    enemy_keys = np.concatenate([blue_keys, red_keys])
+    enemy_games = np.bincount(enemy_keys, weights=np.concatenate([np.repeat(w, 25), np.repeat(w, 25)]), minlength=c * c)
+    enemy_wins = np.bincount(enemy_keys, weights=np.concatenate([np.repeat(bw, 25), np.repeat(rw, 25)]), minlength=c * c)
+
+    return champ_games, champ_wins, ally_games.ravel(), ally_wins.ravel(), enemy_games, enemy_wins
+
+
+def compute_matrices(teams: PatchTeams) -> SynergyMatrices:
+    champions, bi, ri = _champion_index(teams)
+    c = len(champions)
+    champ_games, champ_wins, ally_games, ally_wins, enemy_games, enemy_wins = _counts(bi, ri, teams.blue_win, c)
+    return SynergyMatrices(
+        champions=champions,
+        champ_games=champ_games,
+        champ_wins=champ_wins,
+        ally_games=ally_games.reshape(c, c),
+        ally_wins=ally_wins.reshape(c, c),
+        enemy_games=enemy_games.reshape(c, c),
+        enemy_wins=enemy_wins.reshape(c, c),
+    )
+
+
+# ---- bootstrap ----------------------------------------------------------------
+
+_worker_state: dict = {}
+
+
+def _init_worker(bi, ri, blue_win, c, ally_cells, enemy_cells) -> None:
+    _worker_state.update(bi=bi, ri=ri, blue_win=blue_win, c=c, ally_cells=ally_cells, enemy_cells=enemy_cells)
+
+
+def _bootstrap_chunk(seed: np.random.SeedSequence, n: int) -> tuple[np.ndarray, np.ndarray]:
+    s = _worker_state
+    rng = np.random.default_rng(seed)
+    m = len(s["blue_win"])
+    ally = np.empty((n, len(s["ally_cells"])), dtype=np.float32)
+    enemy = np.empty((n, len(s["enemy_cells"])), dtype=np.float32)
+    for i in range(n):
+        weights = rng.poisson(1.0, m)
+        _, _, ag, aw, eg, ew = _counts(s["bi"], s["ri"], s["blue_win"], s["c"], weights)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ally[i] = aw[s["ally_cells"]] / ag[s["ally_cells"]]
+            enemy[i] = ew[s["enemy_cells"]] / eg[s["enemy_cells"]]
+    return ally, enemy
+
+
+@dataclass
+class Intervals:
+    """Percentile CIs for ally/enemy win rates; NaN where a cell had < min_games."""
+    ally_low: np.ndarray
+    ally_high: np.ndarray
+    enemy_low: np.ndarray
+    enemy_high: np.ndarray
+
+
+def bootstrap_intervals(
+    teams: PatchTeams,
+    matrices: SynergyMatrices,
+    *,
+    n_boot: int = 200,
+    min_games: int = 30,
+    alpha: float = 0.05,
+    workers: int | None = None,
+    seed: int = 0,
+) -> Intervals:
+    champions, bi, ri = _champion_index(teams)
+    c = len(champions)
+    # Only cells with enough games are resampled; the rest stay NaN.
+    ally_cells = np.flatnonzero(matrices.ally_games.ravel() >= min_games)
+    enemy_cells = np.flatnonzero(matrices.enemy_games.ravel() >= min_games)
+
+    workers = workers or os.cpu_count() or 1
+    n_chunks = min(workers * 4, n_boot)
+    sizes = [n_boot // n_chunks + (i < n_boot % n_chunks) for i in range(n_chunks)]
+    seeds = np.random.SeedSequence(seed).spawn(n_chunks)
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(bi, ri, teams.blue_win, c, ally_cells, enemy_cells),
+    ) as pool:
+        results = list(pool.map(_bootstrap_chunk, seeds, sizes))
+
+    ally = np.concatenate([r[0] for r in results])
+    enemy = np.concatenate([r[1] for r in results])
+    q = [100 * alpha / 2, 100 * (1 - alpha / 2)]
+
+    def intervals(samples, cells):
+        low = np.full(c * c, np.nan)
+        high = np.full(c * c, np.nan)
+        if len(cells):
+            low[cells], high[cells] = np.nanpercentile(samples, q, axis=0)
+        return low.reshape(c, c), high.reshape(c, c)
+
+    ally_low, ally_high = intervals(ally, ally_cells)
+    enemy_low, enemy_high = intervals(enemy, enemy_cells)
+    return Intervals(ally_low, ally_high, enemy_low, enemy_high)
+
+
+def top_pairs(
+    matrices: SynergyMatrices,
+    *,
+    kind: str = "ally",
+    min_games: int = 30,
+    top: int = 20,
+    intervals: Intervals | None = None,
+) -> list[dict]:
+    """Strongest ally pairs (kind="ally") or matchups (kind="enemy") by delta win rate."""
+    if kind == "ally":
+        games, rate, delta = matrices.ally_games, matrices.ally_win_rate(), matrices.synergy()
+        mask = np.triu(games >= min_games, k=1)
+        low, high = (intervals.ally_low, intervals.ally_high) if intervals else (None, None)
+    else:
+        games, rate, delta = matrices.enemy_games, matrices.enemy_win_rate(), matrices.counter()
+        mask = games >= min_games
+        low, high = (intervals.enemy_low, intervals.enemy_high) if intervals else (None, None)
+
+    rows, cols = np.nonzero(mask)
+    order = np.argsort(-delta[rows, cols])[:top]
+    out = []
+    for i, j in zip(rows[order], cols[order]):
+        entry = {
+            "a": int(matrices.champions[i]),
+            "b": int(matrices.champions[j]),
+            "games": int(games[i, j]),
+            "win_rate": round(float(rate[i, j]), 4),
+            "delta": round(float(delta[i, j]), 4),
+        }
+        if low is not None:
+            entry["ci"] = (round(float(low[i, j]), 4), round(float(high[i, j]), 4))
+        out.append(entry)
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--patch", required=True)
+    ap.add_argument("--kind", choices=("ally", "enemy"), default="ally")
+    ap.add_argument("--min_games", type=int, default=50)
+    ap.add_argument("--top", type=int, default=20)
+    ap.add_argument("--bootstrap", type=int, default=0, help="Bootstrap replicates for CIs (0 = none)")
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--full", action="store_true", help="Ignore the cache and reload the patch")
+    profiler.add_argument(ap)
+    args = ap.parse_args()
+    profiler.start("synergy", args.profile)
+
+    with connection() as conn, profiler.stage("load"):
+        teams = load_patch_teams(conn, args.patch, full=args.full)
+    print(f"patch {args.patch}: {len(teams)} matches")
+    if not len(teams):
+        return
+
+    with profiler.stage("compute"):
+        matrices = compute_matrices(teams)
+    intervals = None
+    if args.bootstrap:
+        intervals = bootstrap_intervals(
+            teams, matrices, n_boot=args.bootstrap, min_games=args.min_games, workers=args.workers,
+        )
+
+    for entry in top_pairs(matrices, kind=args.kind, min_games=args.min_games, top=args.top, intervals=intervals):
+        print(entry)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,53 @@
+import os
 import time
 from typing import Iterable
 import requests
 
+from src.crawling import metrics, rate_limit
+from src.crawling.regions import DEFAULT_REGION
+from src.utils.metrics import timer
+
 ARAM_QUEUE_ID = 450
 
+# Overridable so the crawler can be pointed at a local stand-in (see src/crawling/mock_riot.py).
+RIOT_API_BASE = os.getenv("RIOT_API_BASE", "https://{region}.api.riotgames.com")
+
+
+def api_base(region: str) -> str:
+    return RIOT_API_BASE.format(region=region).rstrip("/")
+
+
+def api_key() -> str:
+    """Riot API_KEY, read on use so the crawler modules import without one."""
+    key = os.getenv("API_KEY")
+    if not key:
+        raise RuntimeError("API_KEY is not set")
+    return key
+
 
 class RiotRateLimit(Exception):
     pass
 
 
-def _get_with_backoff(url, headers, params: dict | None = None, timeout: int = 20) -> requests.Response:
+def _get_with_backoff(
+    url,
+    headers,
+    params: dict | None = None,
+    timeout: int = 20,
+    *,
+    endpoint: str = "other",
+) -> requests.Response:
+    rate_limit.before_request()
+    t0 = time.perf_counter()
     r = requests.get(url, headers=headers, params=params, timeout=timeout)
+    metrics.observe_response(endpoint, r.status_code, time.perf_counter() - t0)
 
     if r.status_code == 429:
         retry_after = int(r.headers.get("Retry-After", "2"))
-        time.sleep(max(retry_after + 1, 1))
+        sleep_for = max(retry_after + 1, 1)
+        metrics.observe_rate_limit_sleep(endpoint, sleep_for)
+        rate_limit.on_rate_limited(sleep_for)
+        rate_limit.sleep(sleep_for)
         raise RiotRateLimit("429 Rate limited")
 
     r.raise_for_status()
@@ -29,35 +62,48 @@ def fetch_aram_matches_for_puuid(
     count: int = 100,
 ) -> list[str]:
     headers = {"X-Riot-Token": api_key}
-    url = f"https://{region}.api.riotgames.com/lol/match/v5/matches/by-puuid/{puuid}/ids"
+    url = f"{api_base(region)}/lol/match/v5/matches/by-puuid/{puuid}/ids"
     params = {"queue": ARAM_QUEUE_ID, "count": count}
 
     for _ in range(5):
         try:
-            r = _get_with_backoff(url, headers, params)
+            r = _get_with_backoff(url, headers, params, endpoint="ids")
             return r.json()
         except RiotRateLimit:
             continue
 
-    r = _get_with_backoff(url, headers, params)
+    r = _get_with_backoff(url, headers, params, endpoint="ids")
     return r.json()
 
 
-def enqueue_match_ids(conn, match_ids: Iterable[str], discovered_from_puuid_str: str) -> int:
-    inserted = 0
-    with conn.cursor() as cur:
-        for match_id in match_ids:
-            cur.execute(
-                """
-                INSERT INTO match_queue (match_id, discovered_from_puuid)
-                VALUES (%s, %s)
-                ON CONFLICT (match_id) DO NOTHING
-                """,
-                (match_id, discovered_from_puuid_str),
-            )
-            if cur.rowcount > 0:
-                inserted += 1
+# Hot statements, executed with prepare=True (see src/db/connection.py).
+# Ids already in match_queue_archive were ingested (or skipped) before; don't requeue them.
+ENQUEUE_MATCH_IDS = """
+INSERT INTO match_queue (match_id, discovered_from_puuid, region)
+SELECT t.match_id, %s, %s
+FROM unnest(%s::text[]) AS t(match_id)
+WHERE NOT EXISTS (SELECT 1 FROM match_queue_archive a WHERE a.match_id = t.match_id)
+ON CONFLICT (match_id) DO NOTHING
+"""
+
+MARK_ACCOUNT_CRAWLED = "UPDATE accounts SET last_crawled = NOW() WHERE puuid = %s;"
+
+
+def enqueue_match_ids(
+    conn,
+    match_ids: Iterable[str],
+    discovered_from_puuid_str: str,
+    region: str = DEFAULT_REGION,
+) -> int:
+    match_ids = list(dict.fromkeys(match_ids))
+    if not match_ids:
+        return 0
+
+    with timer(metrics.DB_WRITE_SECONDS, table="match_queue"), conn.cursor() as cur:
+        cur.execute(ENQUEUE_MATCH_IDS, (discovered_from_puuid_str, region, match_ids), prepare=True)
+        inserted = max(cur.rowcount, 0)
         conn.commit()
+    metrics.MATCH_IDS_ENQUEUED.inc(inserted)
     return inserted
 
 
@@ -69,7 +115,11 @@ def discover_for_active_accounts(
     per_account_count: int = 50,
     limit_accounts: int | None = 5,
     sleep_seconds: float = 0.10,
-) -> None:
+) -> int:
+    """
+    Crawls the match history of up to `limit_accounts` active accounts of `region`.
+    Returns how many.
+    """
 
     with conn.cursor() as cur:
         if limit_accounts is None:
@@ -77,22 +127,24 @@ def discover_for_active_accounts(
                 """
                 SELECT puuid
                 FROM accounts
-                WHERE status = 'active'
+                WHERE status = 'active' AND region = %s
                 ORDER BY last_crawled NULLS FIRST, random();
-                """
+                """,
+                (region,),
             )
         else:
             cur.execute(
                 """
                 SELECT puuid
                 FROM accounts
-                WHERE status = 'active'
+                WHERE status = 'active' AND region = %s
                 ORDER BY last_crawled NULLS FIRST, random()
                 LIMIT %s;
                 """,
-                (limit_accounts,),
+                (region, limit_accounts),
             )
         puuids = [row[0] for row in cur.fetchall()]
+    conn.commit()
 
     for puuid in puuids:
         match_ids = fetch_aram_matches_for_puuid(
@@ -101,21 +153,18 @@ def discover_for_active_accounts(
             puuid,
             count=per_account_count,
         )
+        metrics.ACCOUNTS_CRAWLED.inc()
 
         if not match_ids:
-            with conn.cursor() as cur:
-                cur.execute(
-                    "UPDATE accounts SET last_crawled = NOW() WHERE puuid = %s;",
-                    (puuid,),
-                )
+            with timer(metrics.DB_WRITE_SECONDS, table="accounts"), conn.cursor() as cur:
+                cur.execute(MARK_ACCOUNT_CRAWLED, (puuid,), prepare=True)
             conn.commit()
             continue
 
-        enqueue_match_ids(conn, match_ids, discovered_from_puuid_str=puuid)
+        enqueue_match_ids(conn, match_ids, discovered_from_puuid_str=puuid, region=region)
 
-        with conn.cursor() as cur:
-            cur.execute(
-                "UPDATE accounts SET last_crawled = NOW() WHERE puuid = %s;",
-                (puuid,),
-            )
-        conn.commit()
\ No newline at end of file
+        with timer(metrics.DB_WRITE_SECONDS, table="accounts"), conn.cursor() as cur:
+            cur.execute(MARK_ACCOUNT_CRAWLED, (puuid,), prepare=True)
+        conn.commit()
+
+    return len(puuids)
\ No newline at end of file
@@ -0,0 +1,237 @@
+"""
+match_queue scheduling (sql/migrations/0004_retry_schedule.sql).
+
+  claim_batch()        leases due 'pending' rows to this worker ('processing' until leased_until)
+  archive_match()      moves a finished row to match_queue_archive, in the ingest transaction
+  record_failure()     classifies the error: permanent -> 'dead', transient -> 'pending' again
+                       at next_attempt_at (exponential backoff with jitter, capped)
+  release_match()      hands a row back untouched (e.g. the API key was rejected)
+  queue_status()       row counts per region and status; `python3 main.py queue-status`
+
+archive_match(), record_failure() and release_match() take the Lease that claim_batch()
+returned and only touch the row while that lease is still the current one. A worker that
+overran its lease could otherwise archive, reschedule or release a row another worker
+has reclaimed and leased since.
+
+Rows whose lease expires (worker crashed or was killed mid-match) are reclaimed by the
+next claim_batch() and count as a failed attempt, so a match that keeps killing workers
+ends up dead instead of looping forever.
+
+Environment:
+  QUEUE_LEASE_SECONDS   default 300
+  QUEUE_MAX_RETRIES     default 8
+  QUEUE_RETRY_BASE      first backoff in seconds, default 60
+  QUEUE_RETRY_MAX       backoff cap in seconds, default 21600 (6h)
+"""
+import argparse
+import datetime
+import os
+from typing import NamedTuple
+
+from src.crawling.regions import UnknownPlatformError
+from src.db.connection import connection
+from src.utils import profiler
+
+LEASE_SECONDS = float(os.getenv("QUEUE_LEASE_SECONDS", "300"))
+MAX_RETRIES = int(os.getenv("QUEUE_MAX_RETRIES", "8"))
+RETRY_BASE_SECONDS = float(os.getenv("QUEUE_RETRY_BASE", "60"))
+RETRY_MAX_SECONDS = float(os.getenv("QUEUE_RETRY_MAX", "21600"))
+
+PERMANENT = "permanent"
+TRANSIENT = "transient"
+FATAL = "fatal"
+
+# The request itself is wrong (bad id, unknown match): retrying cannot help.
+PERMANENT_HTTP_STATUSES = {400, 404, 422}
+# The API key is wrong or expired: not the match's fault, and every other row would fail too.
+FATAL_HTTP_STATUSES = {401, 403}
+
+# Hot statements, executed with prepare=True (see src/db/connection.py).
+RECLAIM_EXPIRED = """
+UPDATE match_queue
+SET status = CASE WHEN retry_count + 1 >= %s THEN 'dead' ELSE 'pending' END,
+    retry_count = retry_count + 1,
+    error_kind = 'lease_expired',
+    last_error = 'lease expired while processing',
+    leased_until = NULL,
+    next_attempt_at = CURRENT_TIMESTAMP
+WHERE status = 'processing' AND leased_until < CURRENT_TIMESTAMP;
+"""
+
+CLAIM_DUE_TEMPLATE = """
+WITH due AS (
+  SELECT match_id
+  FROM match_queue
+  WHERE {region_filter}status = 'pending' AND next_attempt_at <= CURRENT_TIMESTAMP
+  ORDER BY next_attempt_at
+  LIMIT %s
+  FOR UPDATE SKIP LOCKED
+)
+UPDATE match_queue q
+SET status = 'processing',
+    leased_until = CURRENT_TIMESTAMP + %s * interval '1 second'
+FROM due
+WHERE q.match_id = due.match_id
+RETURNING q.match_id, q.leased_until, q.next_attempt_at;
+"""
+# Separate statements rather than "region = %s OR %s IS NULL", so each keeps its own plan.
+CLAIM_DUE = CLAIM_DUE_TEMPLATE.format(region_filter="")
+CLAIM_DUE_REGION = CLAIM_DUE_TEMPLATE.format(region_filter="region = %s AND ")
+
+ARCHIVE = """
+WITH finished AS (
+  DELETE FROM match_queue
+  WHERE match_id = %s AND status = 'processing' AND leased_until = %s
+  RETURNING match_id, discovered_at, retry_count
+)
+INSERT INTO match_queue_archive (match_id, result, discovered_at, fetched_at, retry_count)
+SELECT match_id, %s, discovered_at, CURRENT_TIMESTAMP, retry_count
+FROM finished
+ON CONFLICT (match_id) DO NOTHING;
+"""
+
+RECORD_FAILURE = """
+UPDATE match_queue
+SET status = CASE WHEN %s OR retry_count + 1 >= %s THEN 'dead' ELSE 'pending' END,
+    next_attempt_at = CURRENT_TIMESTAMP
+        + LEAST(%s * power(2, retry_count), %s) * (0.75 + random() * 0.5) * interval '1 second',
+    retry_count = retry_count + 1,
+    error_kind = %s,
+    last_error = %s,
+    leased_until = NULL
+WHERE match_id = %s AND status = 'processing' AND leased_until = %s
+RETURNING status;
+"""
+
+QUEUE_STATUS = """
+SELECT region,
+       status,
+       count(*) AS rows,
+       count(*) FILTER (WHERE status = 'pending' AND next_attempt_at <= CURRENT_TIMESTAMP) AS due,
+       min(next_attempt_at) FILTER (WHERE status = 'pending') AS next_attempt_at
+FROM match_queue
+GROUP BY region, status
+ORDER BY region, status;
+"""
+
+RELEASE = """
+UPDATE match_queue
+SET status = 'pending', leased_until = NULL
+WHERE match_id = %s AND status = 'processing' AND leased_until = %s;
+"""
+
+
+class Lease(NamedTuple):
+    match_id: str
+    leased_until: datetime.datetime   # identifies this lease; a reclaim and re-claim changes it
+
+
+def classify_error(exc: BaseException) -> str:
+    """PERMANENT, TRANSIENT or FATAL for an exception raised while ingesting one match."""
+    # Imported here so queue-status does not pay for requests at startup.
+    import requests
+
+    if isinstance(exc, UnknownPlatformError):
+        # The id cannot be routed to any region, so no retry can fetch it.
+        return PERMANENT
+    if isinstance(exc, requests.HTTPError) and exc.response is not None:
+        status = exc.response.status_code
+        if status in PERMANENT_HTTP_STATUSES:
+            return PERMANENT
+        if status in FATAL_HTTP_STATUSES:
+            return FATAL
+        return TRANSIENT
+    # Timeouts, connection resets, 5xx, DB hiccups and anything unexpected get retried
+    # on the backoff schedule; MAX_RETRIES bounds how long a real bug can keep a row alive.
+    return TRANSIENT
+
+
+def claim_batch(
+    conn,
+    batch_size: int,
+    *,
+    region: str | None = None,
+    lease_seconds: float = LEASE_SECONDS,
+) -> list[Lease]:
+    """
+    Reclaims expired leases, then leases up to `batch_size` due rows (of `region`, or
+    of any region). Commits.
+    """
+    with conn.cursor() as cur:
+        cur.execute(RECLAIM_EXPIRED, (MAX_RETRIES,), prepare=True)
+        if region is None:
+            cur.execute(CLAIM_DUE, (batch_size, lease_seconds), prepare=True)
+        else:
+            cur.execute(CLAIM_DUE_REGION, (region, batch_size, lease_seconds), prepare=True)
+        rows = cur.fetchall()
+    conn.commit()
+    # UPDATE ... RETURNING does not keep the CTE's order.
+    return [Lease(match_id, leased_until) for match_id, leased_until, _ in sorted(rows, key=lambda row: row[2])]
+
+
+def archive_match(cur, lease: Lease, result: str) -> None:
+    """
+    Moves a finished row out of the hot queue. Runs in the caller's transaction. A no-op
+    if the lease was lost; the worker now holding the row archives it.
+    """
+    cur.execute(ARCHIVE, (lease.match_id, lease.leased_until, result), prepare=True)
+
+
+def record_failure(conn, lease: Lease, exc: BaseException, kind: str | None = None) -> str:
+    """
+    Schedules the next attempt (or dead-letters the row). Returns the new status, or
+    "lease_lost" if the row is no longer this lease's. Commits.
+    """
+    kind = kind or classify_error(exc)
+    with conn.cursor() as cur:
+        cur.execute(
+            RECORD_FAILURE,
+            (
+                kind == PERMANENT,
+                MAX_RETRIES,
+                RETRY_BASE_SECONDS,
+                RETRY_MAX_SECONDS,
+                kind,
+                str(exc)[:1000],
+                lease.match_id,
+                lease.leased_until,
+            ),
+            prepare=True,
+        )
+        row = cur.fetchone()
+    conn.commit()
+    return row[0] if row else "lease_lost"
+
+
+def release_match(conn, lease: Lease) -> None:
+    with conn.cursor() as cur:
+        cur.execute(RELEASE, (lease.match_id, lease.leased_until), prepare=True)
+    conn.commit()
+
+
+def queue_status(conn) -> list[dict]:
+    with conn.cursor() as cur:
+        cur.execute(QUEUE_STATUS)
+        columns = [col.name for col in cur.description]
+        return [dict(zip(columns, row)) for row in cur.fetchall()]
+
+
+def main():
+    ap = argparse.ArgumentParser(description="match_queue row counts per region and status")
+    profiler.add_argument(ap)
+    args = ap.parse_args()
+    profiler.start("queue_status", args.profile)
+
+    with connection() as conn:
+        rows = queue_status(conn)
+    if not rows:
+        print("match_queue is empty")
+        return
+    print(f"{'region':<10} {'status':<11} {'rows':>9} {'due':>9}  next_attempt_at")
+    for row in rows:
+        next_attempt = row["next_attempt_at"].isoformat(sep=" ", timespec="seconds") if row["next_attempt_at"] else ""
+        print(f"{row['region']:<10} {row['status']:<11} {row['rows']:>9} {row['due']:>9}  {next_attempt}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Crawler metric definitions shared by discovery and ingestion.
+"""
+import time
+
+from src.utils import metrics
+
+HTTP_REQUEST_SECONDS = metrics.histogram(
+    "riot_http_request_seconds", "Riot API request latency", ("endpoint",)
+)
+HTTP_RESPONSES = metrics.counter(
+    "riot_http_responses_total", "Riot API responses by status code", ("endpoint", "status")
+)
+HTTP_429 = metrics.counter(
+    "riot_http_429_total", "Riot API 429 responses", ("endpoint",)
+)
+RATE_LIMIT_SLEEP_SECONDS = metrics.counter(
+    "riot_rate_limit_sleep_seconds_total", "Seconds slept because of 429 / Retry-After", ("endpoint",)
+)
+DB_WRITE_SECONDS = metrics.histogram(
+    "db_write_seconds", "Time spent writing rows, per table", ("table",)
+)
+MATCH_QUEUE_ROWS = metrics.gauge(
+    "match_queue_rows", "match_queue row counts by status", ("status",)
+)
+MATCH_IDS_ENQUEUED = metrics.counter(
+    "match_ids_enqueued_total", "New match ids inserted into match_queue"
+)
+ACCOUNTS_CRAWLED = metrics.counter(
+    "accounts_crawled_total", "Accounts whose match history was fetched"
+)
+MATCHES_INGESTED = metrics.counter(
+    "matches_ingested_total", "Queued matches processed by ingestion", ("result",)
+)
+QUEUE_FAILURES = metrics.counter(
+    "match_queue_failures_total", "Failed match ingests by error class", ("kind",)
+)
+MATCH_QUEUE_ARCHIVED = metrics.gauge(
+    "match_queue_archived_rows", "Approximate rows in match_queue_archive"
+)
+RATE_BUDGET_WAIT_SECONDS = metrics.histogram(
+    "rate_budget_wait_seconds", "Time a crawler role waited for a request token", ("role",)
+)
+CRAWL_BUDGET_SHARE = metrics.gauge(
+    "crawl_budget_share", "Share of a region's API budget assigned to each crawler role", ("region", "role")
+)
+INGEST_MATCH_SECONDS = metrics.histogram(
+    "ingest_match_seconds", "End-to-end time to ingest one queued match"
+)
+INGEST_MATCHES_PER_SECOND = metrics.gauge(
+    "ingest_matches_per_second", "Matches written per second over the last ingest batch"
+)
+
+QUEUE_STATUSES = ("pending", "processing", "dead")
+
+_last_queue_refresh = 0.0
+
+
+def observe_response(endpoint: str, status_code: int, seconds: float) -> None:
+    HTTP_REQUEST_SECONDS.observe(seconds, endpoint=endpoint)
+    HTTP_RESPONSES.inc(endpoint=endpoint, status=status_code)
+    if status_code == 429:
+        HTTP_429.inc(endpoint=endpoint)
+
+
+def observe_rate_limit_sleep(endpoint: str, seconds: float) -> None:
+    RATE_LIMIT_SLEEP_SECONDS.inc(seconds, endpoint=endpoint)
+
+
+def refresh_queue_depth(conn, *, min_interval: float = 15.0) -> None:
+    """Updates match_queue_rows, at most once per `min_interval` seconds."""
+    global _last_queue_refresh
+    now = time.monotonic()
+    if now - _last_queue_refresh < min_interval:
+        return
+    _last_queue_refresh = now
+
+    with conn.cursor() as cur:
+        cur.execute("SELECT status, count(*) FROM match_queue GROUP BY status;")
+        counts = dict(cur.fetchall())
+        # The archive only grows; the planner's estimate avoids a full count.
+        cur.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = 'match_queue_archive'::regclass;")
+        archived = cur.fetchone()[0]
+    conn.commit()
+
+    MATCH_QUEUE_ARCHIVED.set(max(archived, 0))
+
+    for status in set(QUEUE_STATUSES) | set(counts):
+        MATCH_QUEUE_ROWS.set(counts.get(status, 0), status=status)
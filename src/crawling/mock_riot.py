@@ -0,0 +1,392 @@
+"""
+Local stand-in for the Riot Match-V5 endpoints the crawler uses.
+
+Serves a deterministic synthetic world of ARAM matches:
+
+  GET /lol/match/v5/matches/by-puuid/{puuid}/ids?queue=450&start=0&count=100
+  GET /lol/match/v5/matches/{match_id}
+
+Responses carry Riot-style rate-limit headers (X-App-Rate-Limit, X-Method-Rate-Limit
+and their -Count companions), limits are enforced with sliding windows and answered
+with 429 + Retry-After, and latency / 5xx errors can be injected.
+
+Run standalone:
+  python -m src.crawling.mock_riot --port 8787 --accounts 500 --matches 5000
+then point the crawler at it with RIOT_API_BASE=http://127.0.0.1:8787
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import random
+import re
+import string
+import threading
+import time
+from collections import defaultdict, deque
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from src.crawling.rate_limit import parse_limits
+from src.merging.store import CanonicalStore
+
+ARAM_QUEUE_ID = 450
+PUUID_LEN = 78
+PUUID_ALPHABET = string.ascii_letters + string.digits + "-_"
+
+# Used only when the canonical store has no snapshot to draw champion ids from.
+FALLBACK_CHAMPION_IDS = [1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 14, 15, 16, 17, 18, 19, 20]
+
+IDS_RE = re.compile(r"^/lol/match/v5/matches/by-puuid/([^/]+)/ids$")
+MATCH_RE = re.compile(r"^/lol/match/v5/matches/([^/]+)$")
+
+
+@dataclass
+class MockRiotConfig:
+    seed: int = 1
+    n_accounts: int = 500
+    n_matches: int = 5000
+    platform: str = "NA1"
+    game_version: str = "16.4.512.1234"
+    app_limits: str = "20:1,100:120"
+    ids_method_limits: str = "2000:10"
+    match_method_limits: str = "2000:10"
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    error_rate: float = 0.0
+
+
+def latest_champions() -> dict[str, dict]:
+    """Champion entries of the newest patch in the canonical store, keyed by id; {} if it is empty."""
+    store = CanonicalStore()
+    patch = store.latest_patch()
+    return store.snapshot(patch) if patch else {}
+
+
+def load_champion_ids() -> list[int]:
+    champs = latest_champions()
+    if not champs:
+        return list(FALLBACK_CHAMPION_IDS)
+    return sorted(int(cid) for cid in champs)
+
+
+class SlidingWindowLimiter:
+    """Counts hits per (scope, window) and reports Riot-style header values."""
+
+    def __init__(self, limits: list[tuple[int, int]]):
+        self.limits = limits
+        self.hits = {window: deque() for _, window in limits}
+        self.lock = threading.Lock()
+
+    def _expire(self, now: float) -> None:
+        for window, q in self.hits.items():
+            while q and q[0] <= now - window:
+                q.popleft()
+
+    def try_acquire(self) -> float:
+        """Returns 0.0 if the request is admitted, otherwise the seconds until it would be."""
+        now = time.monotonic()
+        with self.lock:
+            self._expire(now)
+            wait = 0.0
+            for n, window in self.limits:
+                q = self.hits[window]
+                if len(q) >= n:
+                    wait = max(wait, q[0] + window - now)
+            if wait > 0:
+                return wait
+            for q in self.hits.values():
+                q.append(now)
+            return 0.0
+
+    def header(self) -> str:
+        return ",".join(f"{n}:{window}" for n, window in self.limits)
+
+    def count_header(self) -> str:
+        with self.lock:
+            self._expire(time.monotonic())
+            return ",".join(f"{len(self.hits[window])}:{window}" for _, window in self.limits)
+
+
+class SyntheticWorld:
+    """Deterministic accounts, match histories and match payloads."""
+
+    def __init__(self, config: MockRiotConfig, champion_ids: list[int]):
+        self.config = config
+        self.champion_ids = champion_ids
+
+        rng = random.Random(config.seed)
+        self.puuids = [
+            "".join(rng.choice(PUUID_ALPHABET) for _ in range(PUUID_LEN))
+            for _ in range(config.n_accounts)
+        ]
+
+        self.match_ids: list[str] = []
+        self.match_players: dict[str, list[str]] = {}
+        self.history: dict[str, list[str]] = defaultdict(list)
+
+        base_id = 5_000_000_000
+        for i in range(config.n_matches):
+            match_id = f"{config.platform}_{base_id + i}"
+            players = rng.sample(self.puuids, 10) if config.n_accounts >= 10 else [
+                rng.choice(self.puuids) for _ in range(10)
+            ]
+            self.match_ids.append(match_id)
+            self.match_players[match_id] = players
+            for puuid in players:
+                self.history[puuid].append(match_id)
+
+        # Match-V5 returns newest first.
+        for ids in self.history.values():
+            ids.reverse()
+
+    def match_ids_for(self, puuid: str, start: int, count: int) -> list[str]:
+        return self.history.get(puuid, [])[start:start + count]
+
+    def match(self, match_id: str) -> dict | None:
+        players = self.match_players.get(match_id)
+        if players is None:
+            return None
+
+        rng = random.Random(f"{self.config.seed}:{match_id}")
+        champs = rng.sample(self.champion_ids, 10) if len(self.champion_ids) >= 10 else [
+            rng.choice(self.champion_ids) for _ in range(10)
+        ]
+        blue_wins = rng.random() < 0.5
+        start_ms = 1_767_225_600_000 + int(match_id.split("_")[-1]) % 10_000_000 * 1000
+
+        participants = []
+        for slot, (puuid, champ) in enumerate(zip(players, champs)):
+            team_id = 100 if slot < 5 else 200
+            participants.append(self._participant(rng, slot, puuid, champ, team_id, blue_wins == (team_id == 100)))
+
+        return {
+            "metadata": {
+                "dataVersion": "2",
+                "matchId": match_id,
+                "participants": list(players),
+            },
+            "info": {
+                "endOfGameResult": "GameComplete",
+                "gameCreation": start_ms - 30_000,
+                "gameDuration": rng.randint(900, 1500),
+                "gameId": int(match_id.split("_")[-1]),
+                "gameMode": "ARAM",
+                "gameStartTimestamp": start_ms,
+                "gameEndTimestamp": start_ms + 1_200_000,
+                "gameType": "MATCHED_GAME",
+                "gameVersion": self.config.game_version,
+                "mapId": 12,
+                "platformId": self.config.platform,
+                "queueId": ARAM_QUEUE_ID,
+                "participants": participants,
+                "teams": [
+                    {"teamId": 100, "win": blue_wins, "bans": [], "objectives": {}},
+                    {"teamId": 200, "win": not blue_wins, "bans": [], "objectives": {}},
+                ],
+            },
+        }
+
+    @staticmethod
+    def _participant(rng: random.Random, slot: int, puuid: str, champ: int, team_id: int, win: bool) -> dict:
+        physical = rng.randint(2_000, 40_000)
+        magic = rng.randint(2_000, 40_000)
+        true = rng.randint(0, 5_000)
+        p = {
+            "participantId": slot + 1,
+            "puuid": puuid,
+            "championId": champ,
+            "teamId": team_id,
+            "win": win,
+            "kills": rng.randint(0, 25),
+            "deaths": rng.randint(0, 20),
+            "assists": rng.randint(0, 40),
+            "goldEarned": rng.randint(8_000, 20_000),
+            "totalDamageDealtToChampions": physical + magic + true,
+            "physicalDamageDealtToChampions": physical,
+            "magicDamageDealtToChampions": magic,
+            "trueDamageDealtToChampions": true,
+            "totalDamageTaken": rng.randint(10_000, 60_000),
+            "totalHeal": rng.randint(0, 30_000),
+            "totalDamageShieldedOnTeammates": rng.randint(0, 10_000),
+            "champLevel": 18,
+            "summoner1Id": 32,
+            "summoner2Id": 4,
+        }
+        for item_slot in range(7):
+            p[f"item{item_slot}"] = rng.choice([0, 1001, 3020, 3031, 3089, 3157, 3363, 6653, 6672])
+
+        # Real payloads are dominated by these blocks; keep them so payload size is realistic.
+        p["challenges"] = {f"challenge{i}": rng.random() * 100 for i in range(120)}
+        p["missions"] = {f"playerScore{i}": 0 for i in range(12)}
+        p["perks"] = {
+            "statPerks": {"defense": 5001, "flex": 5008, "offense": 5005},
+            "styles": [
+                {"description": "primaryStyle", "style": 8100,
+                 "selections": [{"perk": 8112 + i, "var1": rng.randint(0, 2000), "var2": 0, "var3": 0} for i in range(4)]},
+                {"description": "subStyle", "style": 8300,
+                 "selections": [{"perk": 8304 + i, "var1": 0, "var2": 0, "var3": 0} for i in range(2)]},
+            ],
+        }
+        return p
+
+
+class MockRiotServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, config: MockRiotConfig, champion_ids: list[int] | None = None):
+        super().__init__(address, MockRiotHandler)
+        self.config = config
+        self.world = SyntheticWorld(config, champion_ids or load_champion_ids())
+        self.app_limiter = SlidingWindowLimiter(parse_limits(config.app_limits))
+        self.method_limiters = {
+            "ids": SlidingWindowLimiter(parse_limits(config.ids_method_limits)),
+            "match": SlidingWindowLimiter(parse_limits(config.match_method_limits)),
+        }
+        self.stats = defaultdict(int)
+        self.stats_lock = threading.Lock()
+        self.error_rng = random.Random(config.seed + 1)
+
+    def count(self, key: str) -> None:
+        with self.stats_lock:
+            self.stats[key] += 1
+
+    def snapshot_stats(self) -> dict:
+        with self.stats_lock:
+            return dict(self.stats)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+class MockRiotHandler(BaseHTTPRequestHandler):
+    server: MockRiotServer
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, payload, headers: dict | None = None) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json;charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        server = self.server
+        cfg = server.config
+        parsed = urlparse(self.path)
+
+        if parsed.path == "/__stats":
+            self._send_json(200, server.snapshot_stats())
+            return
+
+        ids_match = IDS_RE.match(parsed.path)
+        match_match = MATCH_RE.match(parsed.path)
+        endpoint = "ids" if ids_match else "match" if match_match else None
+        if endpoint is None:
+            self._send_json(404, {"status": {"message": "Not found", "status_code": 404}})
+            return
+
+        server.count(f"requests_{endpoint}")
+        if not self.headers.get("X-Riot-Token"):
+            server.count("status_401")
+            self._send_json(401, {"status": {"message": "Unauthorized", "status_code": 401}})
+            return
+
+        if cfg.latency_ms or cfg.jitter_ms:
+            time.sleep(max(0.0, cfg.latency_ms + server.error_rng.uniform(-cfg.jitter_ms, cfg.jitter_ms)) / 1000.0)
+
+        method_limiter = server.method_limiters[endpoint]
+        method_wait = method_limiter.try_acquire()
+        app_wait = server.app_limiter.try_acquire() if method_wait == 0 else 0.0
+
+        headers = {
+            "X-App-Rate-Limit": server.app_limiter.header(),
+            "X-App-Rate-Limit-Count": server.app_limiter.count_header(),
+            "X-Method-Rate-Limit": method_limiter.header(),
+            "X-Method-Rate-Limit-Count": method_limiter.count_header(),
+        }
+
+        if method_wait or app_wait:
+            server.count("status_429")
+            headers["Retry-After"] = str(max(1, math.ceil(max(method_wait, app_wait))))
+            headers["X-Rate-Limit-Type"] = "method" if method_wait else "application"
+            self._send_json(429, {"status": {"message": "Rate limit exceeded", "status_code": 429}}, headers)
+            return
+
+        if cfg.error_rate and server.error_rng.random() < cfg.error_rate:
+            status = server.error_rng.choice([500, 502, 503])
+            server.count(f"status_{status}")
+            self._send_json(status, {"status": {"message": "Injected error", "status_code": status}}, headers)
+            return
+
+        if endpoint == "ids":
+            qs = parse_qs(parsed.query)
+            queue = int(qs.get("queue", [ARAM_QUEUE_ID])[0])
+            start = int(qs.get("start", [0])[0])
+            count = min(int(qs.get("count", [20])[0]), 100)
+            ids = server.world.match_ids_for(ids_match.group(1), start, count) if queue == ARAM_QUEUE_ID else []
+            server.count("status_200")
+            self._send_json(200, ids, headers)
+            return
+
+        payload = server.world.match(match_match.group(1))
+        if payload is None:
+            server.count("status_404")
+            self._send_json(404, {"status": {"message": "Data not found - match file not found", "status_code": 404}}, headers)
+            return
+
+        server.count("status_200")
+        self._send_json(200, payload, headers)
+
+
+def start_mock_server(config: MockRiotConfig, host: str = "127.0.0.1", port: int = 0) -> MockRiotServer:
+    """Starts the server on a daemon thread. port=0 picks a free port."""
+    server = MockRiotServer((host, port), config)
+    thread = threading.Thread(target=server.serve_forever, name="mock-riot", daemon=True)
+    thread.start()
+    return server
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8787)
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--accounts", type=int, default=500)
+    ap.add_argument("--matches", type=int, default=5000)
+    ap.add_argument("--app_limits", default="20:1,100:120")
+    ap.add_argument("--latency_ms", type=float, default=0.0)
+    ap.add_argument("--jitter_ms", type=float, default=0.0)
+    ap.add_argument("--error_rate", type=float, default=0.0)
+    args = ap.parse_args()
+
+    config = MockRiotConfig(
+        seed=args.seed,
+        n_accounts=args.accounts,
+        n_matches=args.matches,
+        app_limits=args.app_limits,
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+    )
+    server = MockRiotServer((args.host, args.port), config)
+    print(f"Mock Riot API listening on {server.base_url}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
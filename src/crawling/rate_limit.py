@@ -0,0 +1,173 @@
+"""
+Client-side Riot API rate budget shared by every crawler thread in a process.
+
+RateBudget holds one token bucket per Riot limit window ("20:1,100:120" = 20 requests
+per second and 100 per two minutes) and hands tokens to named roles (e.g. "discovery"
+and "ingestion") in proportion to adjustable shares. It is work-conserving: when only
+one role is asking, it gets the whole budget.
+
+Request code does not take a budget argument. A worker thread binds one with
+`using(budget, role, stop)`, and before_request() / on_rate_limited() / sleep() act on
+whatever is bound. Unbound threads (the one-off scripts) behave exactly as before:
+no client-side limiting, plain time.sleep().
+"""
+from __future__ import annotations
+
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+from src.crawling import metrics
+
+# How quickly old grants stop counting towards a role's usage (per grant).
+USAGE_DECAY = 0.98
+
+
+class CrawlStopped(Exception):
+    """Raised from before_request() once the bound stop event is set."""
+
+
+def parse_limits(spec: str) -> list[tuple[int, int]]:
+    """'20:1,100:120' -> [(20, 1), (100, 120)]  (requests, window seconds)"""
+    limits = []
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        n, window = part.split(":")
+        limits.append((int(n), int(window)))
+    return limits
+
+
+class TokenBucket:
+    def __init__(self, capacity: float, window: float):
+        self.capacity = capacity
+        self.rate = capacity / window
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def seconds_until_token(self) -> float:
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+
+class RateBudget:
+    def __init__(self, limits: list[tuple[int, int]], *, safety: float = 0.9):
+        # Stay a little under the published limits so clock skew against Riot's
+        # windows does not turn into 429s.
+        self.buckets = [TokenBucket(max(n * safety, 1.0), window) for n, window in limits]
+        self.cond = threading.Condition()
+        self.shares: dict[str, float] = {}
+        self.usage: dict[str, float] = defaultdict(float)
+        self.waiting: dict[str, int] = defaultdict(int)
+        self.paused_until = 0.0
+
+    @classmethod
+    def from_spec(cls, spec: str, *, safety: float = 0.9) -> "RateBudget":
+        return cls(parse_limits(spec), safety=safety)
+
+    @property
+    def sustained_rate(self) -> float:
+        """Requests per second the tightest window allows in the long run."""
+        return min(b.rate for b in self.buckets)
+
+    def set_shares(self, shares: dict[str, float]) -> None:
+        with self.cond:
+            self.shares = {role: max(share, 1e-6) for role, share in shares.items()}
+            self.cond.notify_all()
+
+    def penalize(self, seconds: float) -> None:
+        """A 429 came back: nobody in this process sends anything for `seconds`."""
+        with self.cond:
+            now = time.monotonic()
+            self.paused_until = max(self.paused_until, now + seconds)
+            for bucket in self.buckets:
+                bucket.refill(now)
+                bucket.tokens = min(bucket.tokens, 0.0)
+
+    def wake(self) -> None:
+        with self.cond:
+            self.cond.notify_all()
+
+    def _next_role(self) -> str | None:
+        # The waiting role that is furthest below its share goes next.
+        candidates = [role for role, n in self.waiting.items() if n > 0]
+        if not candidates:
+            return None
+        return min(candidates, key=lambda role: self.usage[role] / self.shares.get(role, 1.0))
+
+    def acquire(self, role: str, stop: threading.Event | None = None) -> bool:
+        """Blocks until `role` may send one request. Returns False if `stop` was set."""
+        t0 = time.monotonic()
+        with self.cond:
+            self.waiting[role] += 1
+            try:
+                while stop is None or not stop.is_set():
+                    now = time.monotonic()
+                    if now < self.paused_until:
+                        self.cond.wait(min(self.paused_until - now, 1.0))
+                        continue
+                    if self._next_role() != role:
+                        self.cond.wait(1.0)
+                        continue
+
+                    for bucket in self.buckets:
+                        bucket.refill(now)
+                    wait = max(bucket.seconds_until_token() for bucket in self.buckets)
+                    if wait > 0:
+                        self.cond.wait(min(wait, 1.0))
+                        continue
+
+                    for bucket in self.buckets:
+                        bucket.tokens -= 1
+                    for r in self.usage:
+                        self.usage[r] *= USAGE_DECAY
+                    self.usage[role] += 1
+                    self.cond.notify_all()
+                    metrics.RATE_BUDGET_WAIT_SECONDS.observe(time.monotonic() - t0, role=role)
+                    return True
+                return False
+            finally:
+                self.waiting[role] -= 1
+
+
+_local = threading.local()
+
+
+@contextmanager
+def using(budget: RateBudget, role: str, stop: threading.Event):
+    """Binds `budget` to the current thread for the duration of the block."""
+    previous = getattr(_local, "binding", None)
+    _local.binding = (budget, role, stop)
+    try:
+        yield
+    finally:
+        _local.binding = previous
+
+
+def before_request() -> None:
+    binding = getattr(_local, "binding", None)
+    if binding is None:
+        return
+    budget, role, stop = binding
+    if not budget.acquire(role, stop):
+        raise CrawlStopped()
+
+
+def on_rate_limited(seconds: float) -> None:
+    binding = getattr(_local, "binding", None)
+    if binding is not None:
+        binding[0].penalize(seconds)
+
+
+def sleep(seconds: float) -> None:
+    """time.sleep() that returns early when the bound stop event is set."""
+    binding = getattr(_local, "binding", None)
+    if binding is None:
+        time.sleep(seconds)
+    elif binding[2].wait(seconds):
+        raise CrawlStopped()
@@ -0,0 +1,64 @@
+"""
+Riot routing regions and the platforms that belong to them.
+
+Match-V5 is served per routing region ({region}.api.riotgames.com) and rate limits are
+counted per region, so the crawler shards accounts and queued matches by region and
+runs an independent budget and worker set for each. A match id carries its platform
+("EUW1_7123456789"), which is enough to route it.
+
+A match id whose platform is not listed here cannot be routed and raises
+UnknownPlatformError; the queue drops such a row instead of retrying it. (The SQL
+riot_region() of 0005_regions.sql only backfilled rows that existed at the time.)
+"""
+
+REGIONS = ("americas", "europe", "asia", "sea")
+DEFAULT_REGION = "americas"
+
+PLATFORM_REGIONS = {
+    "NA1": "americas",
+    "BR1": "americas",
+    "LA1": "americas",
+    "LA2": "americas",
+    "EUW1": "europe",
+    "EUN1": "europe",
+    "TR1": "europe",
+    "RU": "europe",
+    "ME1": "europe",
+    "KR": "asia",
+    "JP1": "asia",
+    "OC1": "sea",
+    "PH2": "sea",
+    "SG2": "sea",
+    "TH2": "sea",
+    "TW2": "sea",
+    "VN2": "sea",
+}
+
+
+class UnknownPlatformError(ValueError):
+    """The platform (or match id prefix) is not one Riot routes."""
+
+
+def region_for_platform(platform: str) -> str:
+    try:
+        return PLATFORM_REGIONS[platform.upper()]
+    except KeyError:
+        raise UnknownPlatformError(f"Unknown platform {platform!r}") from None
+
+
+def region_for_match_id(match_id: str) -> str:
+    platform, sep, _ = match_id.partition("_")
+    if not sep:
+        raise UnknownPlatformError(f"Match id without platform prefix: {match_id!r}")
+    return region_for_platform(platform)
+
+
+def parse_regions(spec: str) -> list[str]:
+    """'americas,europe' -> ['americas', 'europe']; 'all' -> every region."""
+    if spec.strip().lower() == "all":
+        return list(REGIONS)
+    regions = [part.strip().lower() for part in spec.split(",") if part.strip()]
+    unknown = [r for r in regions if r not in REGIONS]
+    if unknown:
+        raise ValueError(f"Unknown region(s) {unknown}; expected some of {REGIONS}")
+    return list(dict.fromkeys(regions))
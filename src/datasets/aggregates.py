@@ -0,0 +1,169 @@
+"""
+Incrementally maintained aggregates (sql/migrations/0001_baseline.sql).
+
+record_match_aggregates() is called by ingestion in the same transaction as the match
+insert, so champion, pair and roster statistics are indexed lookups instead of
+GROUP BY scans over participants. rebuild_aggregates() recomputes them from scratch.
+"""
+import argparse
+from collections import Counter, defaultdict
+from collections.abc import Sequence
+from itertools import combinations
+
+from src.db.connection import transaction
+from src.parsing.match_v5 import ParticipantRecord
+from src.utils import profiler
+
+UPSERT_CHAMPION_STATS = """
+INSERT INTO champion_patch_stats (patch, champion_id, games, wins)
+SELECT %s, c, g, w FROM unnest(%s::int[], %s::int[], %s::int[]) AS t(c, g, w)
+ON CONFLICT (patch, champion_id) DO UPDATE
+SET games = champion_patch_stats.games + EXCLUDED.games,
+    wins  = champion_patch_stats.wins + EXCLUDED.wins;
+"""
+
+UPSERT_PAIR_STATS = """
+INSERT INTO champion_pair_patch_stats (patch, champion_a, champion_b, games, wins)
+SELECT %s, a, b, g, w FROM unnest(%s::int[], %s::int[], %s::int[], %s::int[]) AS t(a, b, g, w)
+ON CONFLICT (patch, champion_a, champion_b) DO UPDATE
+SET games = champion_pair_patch_stats.games + EXCLUDED.games,
+    wins  = champion_pair_patch_stats.wins + EXCLUDED.wins;
+"""
+
+INSERT_ROSTER = """
+INSERT INTO team_rosters (match_key, team_id, patch, queue_id, win, champs)
+VALUES (%s, %s, %s, %s, %s, %s)
+ON CONFLICT (match_key, team_id) DO NOTHING;
+"""
+
+REBUILD_STATEMENTS = [
+    "TRUNCATE champion_patch_stats, champion_pair_patch_stats, team_rosters;",
+    """
+    INSERT INTO team_rosters (match_key, team_id, patch, queue_id, win, champs)
+    SELECT p.match_key, p.team_id, p.patch, m.queue_id, bool_or(p.win),
+           array_agg(p.champion_id ORDER BY p.champion_id)
+    FROM participants p
+    JOIN matches m ON m.match_key = p.match_key AND m.patch = p.patch
+    GROUP BY p.match_key, p.team_id, p.patch, m.queue_id;
+    """,
+    """
+    INSERT INTO champion_patch_stats (patch, champion_id, games, wins)
+    SELECT p.patch, p.champion_id, count(*), count(*) FILTER (WHERE p.win)
+    FROM participants p
+    GROUP BY p.patch, p.champion_id;
+    """,
+    """
+    INSERT INTO champion_pair_patch_stats (patch, champion_a, champion_b, games, wins)
+    SELECT tr.patch, a.c, b.c, count(*), count(*) FILTER (WHERE tr.win)
+    FROM team_rosters tr
+    CROSS JOIN LATERAL unnest(tr.champs) WITH ORDINALITY AS a(c, i)
+    CROSS JOIN LATERAL unnest(tr.champs) WITH ORDINALITY AS b(c, j)
+    WHERE a.i < b.j AND a.c < b.c
+    GROUP BY tr.patch, a.c, b.c;
+    """,
+]
+
+
+def record_match_aggregates(
+    cur, match_key: int, patch: str, queue_id: int, participants: Sequence[ParticipantRecord]
+) -> None:
+    """
+    Adds one newly inserted match to the aggregates. Must only be called when the
+    match row was actually inserted, otherwise counts are applied twice.
+    """
+    teams = defaultdict(list)
+    team_win = {}
+    for p in participants:
+        teams[p.team_id].append(p.champion_id)
+        team_win[p.team_id] = team_win.get(p.team_id, False) or p.win
+
+    champ_games = Counter()
+    champ_wins = Counter()
+    pair_games = Counter()
+    pair_wins = Counter()
+
+    for team_id, champs in teams.items():
+        champs.sort()
+        win = team_win[team_id]
+        cur.execute(INSERT_ROSTER, (match_key, team_id, patch, queue_id, win, champs), prepare=True)
+
+        for c in champs:
+            champ_games[c] += 1
+            champ_wins[c] += win
+        for a, b in combinations(champs, 2):
+            if a == b:
+                continue
+            pair_games[(a, b)] += 1
+            pair_wins[(a, b)] += win
+
+    if champ_games:
+        ids = sorted(champ_games)
+        cur.execute(
+            UPSERT_CHAMPION_STATS,
+            (patch, ids, [champ_games[c] for c in ids], [champ_wins[c] for c in ids]),
+            prepare=True,
+        )
+
+    if pair_games:
+        pairs = sorted(pair_games)
+        cur.execute(
+            UPSERT_PAIR_STATS,
+            (
+                patch,
+                [a for a, _ in pairs],
+                [b for _, b in pairs],
+                [pair_games[p] for p in pairs],
+                [pair_wins[p] for p in pairs],
+            ),
+            prepare=True,
+        )
+
+
+def rebuild_aggregates(conn) -> None:
+    with conn.cursor() as cur:
+        for statement in REBUILD_STATEMENTS:
+            cur.execute(statement)
+
+
+def pair_counts(conn, patches: list[str] | None = None, min_games: int = 1) -> Counter:
+    """Ally pair frequencies {(a, b): games}, optionally restricted to some patches."""
+    with conn.cursor() as cur:
+        if patches is None:
+            cur.execute(
+                """
+                SELECT champion_a, champion_b, sum(games)::int
+                FROM champion_pair_patch_stats
+                GROUP BY champion_a, champion_b
+                HAVING sum(games) >= %s;
+                """,
+                (min_games,),
+            )
+        else:
+            cur.execute(
+                """
+                SELECT champion_a, champion_b, sum(games)::int
+                FROM champion_pair_patch_stats
+                WHERE patch = ANY(%s)
+                GROUP BY champion_a, champion_b
+                HAVING sum(games) >= %s;
+                """,
+                (patches, min_games),
+            )
+        return Counter({(row[0], row[1]): row[2] for row in cur.fetchall()})
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rebuild", action="store_true", help="Recompute all aggregates from participants")
+    profiler.add_argument(ap)
+    args = ap.parse_args()
+    profiler.start("aggregates", args.profile)
+
+    if args.rebuild:
+        with transaction() as conn:
+            rebuild_aggregates(conn)
+        print("Aggregates rebuilt.")
+
+
+if __name__ == "__main__":
+    main()
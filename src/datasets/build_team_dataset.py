@@ -1,50 +1,54 @@
-import pandas as pd
-import psycopg2
-import os
-from dotenv import load_dotenv
+import argparse
 
-load_dotenv()
+import pandas as pd
 
-conn = psycopg2.connect(os.environ["DATABASE_URL"])
+from src.db.connection import connection
+from src.utils import profiler
 
+# Reads the ingest-maintained team_rosters aggregate (sql/migrations/0001_baseline.sql)
+# instead of regrouping all of participants.
 query = """
-WITH team_rosters AS (
-  SELECT
-    p.match_id,
-    m.patch,
-    m.queue_id,
-    p.team_id,
-    bool_or(p.win) AS win,
-    array_agg(p.champion_id ORDER BY p.champion_id) AS champs,
-    count(*) AS n_players
-  FROM participants p
-  JOIN matches m ON m.match_id = p.match_id
-  GROUP BY p.match_id, m.patch, m.queue_id, p.team_id
-),
-team_tags AS (
-  SELECT
-    p.match_id,
-    p.team_id,
-    ct.tag,
-    count(*)::int AS tag_count
-  FROM participants p
-  JOIN champion_tag ct ON ct.champion_id = p.champion_id
-  GROUP BY p.match_id, p.team_id, ct.tag
-)
 SELECT
-  tr.match_id,
+  k.match_id,
   tr.patch,
   tr.queue_id,
+  m.game_datetime,
   tr.team_id,
   tr.win,
   tr.champs,
-  jsonb_object_agg(tt.tag, tt.tag_count ORDER BY tt.tag) AS tag_counts
+  (
+    SELECT jsonb_object_agg(t.tag, t.tag_count ORDER BY t.tag)
+    FROM (
+      SELECT ct.tag, count(*)::int AS tag_count
+      FROM unnest(tr.champs) AS c(champion_id)
+      JOIN champion_tag ct ON ct.champion_id = c.champion_id
+      GROUP BY ct.tag
+    ) t
+  ) AS tag_counts
 FROM team_rosters tr
-LEFT JOIN team_tags tt
-  ON tt.match_id = tr.match_id AND tt.team_id = tr.team_id
-WHERE tr.n_players = 5
-GROUP BY tr.match_id, tr.patch, tr.queue_id, tr.team_id, tr.win, tr.champs
+JOIN match_keys k ON k.match_key = tr.match_key
+JOIN matches m ON m.match_key = tr.match_key AND m.patch = tr.patch
+WHERE cardinality(tr.champs) = 5
 """
 
-df = pd.read_sql(query, conn)
-df.to_csv("aram_team_dataset.csv", index=False)
\ No newline at end of file
+
+def fetch_team_dataset(conn) -> pd.DataFrame:
+    with conn.cursor() as cur:
+        cur.execute(query)
+        columns = [col.name for col in cur.description]
+        return pd.DataFrame(cur.fetchall(), columns=columns)
+
+
+def main(out_path: str = "aram_team_dataset.csv"):
+    with connection() as conn, profiler.stage("query"):
+        df = fetch_team_dataset(conn)
+    with profiler.stage("write_csv"):
+        df.to_csv(out_path, index=False)
+    print(f"Wrote {len(df)} team rows to {out_path}")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    profiler.add_argument(ap)
+    profiler.start("build_team_dataset", ap.parse_args().profile)
+    main()
@@ -0,0 +1,93 @@
+"""
+Shared Postgres access for every entry point (psycopg 3 + psycopg_pool).
+
+  from src.db.connection import connection, transaction
+
+  with connection() as conn:          # pooled connection; commits on clean exit
+      ...
+  with transaction() as conn:         # pooled connection inside one transaction
+      ...
+
+Hot statements are executed with prepare=True so Postgres parses/plans them once per
+connection; anything else is auto-prepared after DB_PREPARE_THRESHOLD executions.
+
+Environment:
+  DATABASE_URL          required, read on first use
+  DB_POOL_MIN / MAX     pool size (default 1 / 8)
+  DB_PREPARE_THRESHOLD  psycopg prepare_threshold (default 5; "none" disables auto-prepare)
+  SQL_PROFILE           "1" profiles every statement and reports at exit (src/db/profiling.py)
+"""
+import atexit
+import os
+import threading
+from contextlib import contextmanager
+
+from dotenv import load_dotenv
+from psycopg_pool import ConnectionPool
+
+from src.db import profiling
+
+load_dotenv()
+
+_pool: ConnectionPool | None = None
+_pool_lock = threading.Lock()
+
+
+def database_url() -> str:
+    url = os.getenv("DATABASE_URL")
+    if not url:
+        raise RuntimeError("DATABASE_URL is not set")
+    return url
+
+
+def _prepare_threshold() -> int | None:
+    value = os.getenv("DB_PREPARE_THRESHOLD", "5")
+    return None if value.lower() == "none" else int(value)
+
+
+def _configure(conn) -> None:
+    conn.prepare_threshold = _prepare_threshold()
+    if profiling.enabled():
+        profiling.install(conn)
+
+
+def get_pool() -> ConnectionPool:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(
+                    database_url(),
+                    min_size=int(os.getenv("DB_POOL_MIN", "1")),
+                    max_size=int(os.getenv("DB_POOL_MAX", "8")),
+                    configure=_configure,
+                    name="aramalyze",
+                    open=True,
+                )
+                atexit.register(close_pool)
+    return _pool
+
+
+def close_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+
+
+@contextmanager
+def connection():
+    """
+    Borrows a pooled connection. Commits on clean exit, rolls back on error, and always
+    returns the connection to the pool. Callers may still commit() explicitly.
+    """
+    with get_pool().connection() as conn:
+        yield conn
+
+
+@contextmanager
+def transaction():
+    """Borrows a pooled connection and runs the block in a single transaction."""
+    with connection() as conn, conn.transaction():
+        yield conn
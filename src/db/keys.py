@@ -0,0 +1,145 @@
+"""
+Integer surrogate keys for accounts and matches (sql/migrations/0007_integer_keys.sql).
+
+The fact tables (matches, participants, participant_items, team_rosters) store
+match_keys.match_key and accounts.account_id instead of the Riot text ids. Ingestion
+resolves them here:
+
+  ids = account_ids(cur, puuids, region)   # creates missing accounts as 'inactive'
+  key = match_key(cur, match_id)           # creates the match_keys row if missing
+
+A mapping never changes once assigned, so resolved keys are kept in a per-process LRU
+cache and repeat players cost no round trip. Only keys that were already committed are
+cached: a key created in the caller's transaction could vanish on rollback, so it is
+cached the next time it is looked up instead.
+
+Environment:
+  KEY_CACHE_SIZE   mappings kept per kind (default 200000)
+"""
+from __future__ import annotations
+
+import os
+import threading
+from collections import OrderedDict
+from collections.abc import Sequence
+
+KEY_CACHE_SIZE = int(os.getenv("KEY_CACHE_SIZE", "200000"))
+
+# Rows the INSERT creates are invisible to the SELECT in the same statement, so each
+# puuid comes back exactly once; `created` says whether this transaction made it.
+RESOLVE_ACCOUNTS = """
+WITH input AS (
+  SELECT * FROM unnest(%s::text[], %s::text[]) AS t(puuid, region)
+),
+created AS (
+  INSERT INTO accounts (puuid, status, depth, region)
+  SELECT puuid, 'inactive', 1, region FROM input
+  ON CONFLICT (puuid) DO NOTHING
+  RETURNING puuid, account_id
+)
+SELECT puuid, account_id, true AS created FROM created
+UNION ALL
+SELECT a.puuid, a.account_id, false FROM accounts a JOIN input i ON i.puuid = a.puuid;
+"""
+
+RESOLVE_MATCH = """
+WITH created AS (
+  INSERT INTO match_keys (match_id) VALUES (%s)
+  ON CONFLICT (match_id) DO NOTHING
+  RETURNING match_key
+)
+SELECT match_key, true AS created FROM created
+UNION ALL
+SELECT match_key, false FROM match_keys WHERE match_id = %s;
+"""
+
+# A row another worker committed after RESOLVE_* took its snapshot is skipped by
+# ON CONFLICT but not visible to its SELECT; a fresh statement sees it.
+LOOKUP_ACCOUNTS = "SELECT puuid, account_id FROM accounts WHERE puuid = ANY(%s);"
+LOOKUP_MATCH = "SELECT match_key FROM match_keys WHERE match_id = %s;"
+
+
+class KeyCache:
+    """Thread-safe LRU map of Riot id -> integer key."""
+
+    def __init__(self, max_size: int = KEY_CACHE_SIZE):
+        self.max_size = max_size
+        self.lock = threading.Lock()
+        self.keys: OrderedDict[str, int] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def get(self, riot_id: str) -> int | None:
+        with self.lock:
+            key = self.keys.get(riot_id)
+            if key is None:
+                self.misses += 1
+                return None
+            self.keys.move_to_end(riot_id)
+            self.hits += 1
+            return key
+
+    def put(self, riot_id: str, key: int) -> None:
+        if self.max_size <= 0:
+            return
+        with self.lock:
+            self.keys[riot_id] = key
+            self.keys.move_to_end(riot_id)
+            while len(self.keys) > self.max_size:
+                self.keys.popitem(last=False)
+
+    def clear(self) -> None:
+        with self.lock:
+            self.keys.clear()
+
+
+ACCOUNT_KEYS = KeyCache()
+MATCH_KEYS = KeyCache()
+
+
+def account_ids(cur, puuids: Sequence[str], region: str) -> list[int]:
+    """account_id for each puuid (in order), inserting unknown accounts. Caller's transaction."""
+    resolved = {}
+    missing = []
+    for puuid in puuids:
+        key = ACCOUNT_KEYS.get(puuid)
+        if key is None:
+            missing.append(puuid)
+        else:
+            resolved[puuid] = key
+
+    if missing:
+        cur.execute(RESOLVE_ACCOUNTS, (missing, [region] * len(missing)), prepare=True)
+        for puuid, key, created in cur.fetchall():
+            resolved[puuid] = key
+            if not created:
+                ACCOUNT_KEYS.put(puuid, key)
+
+        raced = [puuid for puuid in missing if puuid not in resolved]
+        if raced:
+            cur.execute(LOOKUP_ACCOUNTS, (raced,))
+            for puuid, key in cur.fetchall():
+                resolved[puuid] = key
+                ACCOUNT_KEYS.put(puuid, key)
+
+    return [resolved[puuid] for puuid in puuids]
+
+
+def match_key(cur, match_id: str) -> int:
+    """match_key for `match_id`, inserting it if new. Caller's transaction."""
+    key = MATCH_KEYS.get(match_id)
+    if key is not None:
+        return key
+
+    cur.execute(RESOLVE_MATCH, (match_id, match_id), prepare=True)
+    row = cur.fetchone()
+    if row is None:
+        cur.execute(LOOKUP_MATCH, (match_id,))
+        row = (cur.fetchone()[0], False)
+    key, created = row
+    if not created:
+        MATCH_KEYS.put(match_id, key)
+    return key
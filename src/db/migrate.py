@@ -0,0 +1,382 @@
+"""
+Versioned schema migrations: sql/migrations/NNNN_name.sql, applied in order.
+
+  python3 -m src.db.migrate status
+  python3 -m src.db.migrate up [--to N]
+  python3 -m src.db.migrate bench N [--matches 100000] [--out plans.json]
+
+Each file runs in its own transaction and is recorded in schema_migrations. Files are
+sent as one batch without parameters, so they are plain SQL (a literal % needs no escaping).
+
+A migration lists the queries it is meant to speed up in `-- bench: <query>` lines.
+`bench N` builds a throwaway schema, applies the migrations before N, fills it with a
+generated dataset (see GENERATE_DATASET), then captures EXPLAIN (ANALYZE, BUFFERS) for
+each bench query before and after applying N, plus table and index sizes on both sides.
+A query that only makes sense on one side (e.g. a column the migration adds) is reported
+as an error on the other side, unless a `-- bench-after: <query>` line right below it
+gives the equivalent query for the migrated schema.
+"""
+import argparse
+import json
+import re
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+from psycopg import errors, sql
+
+from src.config.paths import PROJECT_ROOT
+from src.db.connection import connection
+from src.utils import profiler
+
+MIGRATIONS_DIR = PROJECT_ROOT / "sql" / "migrations"
+BENCH_SCHEMA = "migration_bench"
+
+MIGRATION_NAME_RE = re.compile(r"^(\d{4})_([\w-]+)\.sql$")
+BENCH_RE = re.compile(r"^--\s*bench(-after)?:\s*(.+?)\s*$", re.MULTILINE)
+
+CREATE_MIGRATIONS_TABLE = """
+CREATE TABLE IF NOT EXISTS schema_migrations (
+  version     INT PRIMARY KEY,
+  name        TEXT NOT NULL,
+  applied_at  TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+"""
+
+# Fills the baseline (0001) tables; later migrations carry the rows forward themselves.
+# {matches}/{accounts} are substituted as integers. 12 patches, one match a minute from
+# 2026-01-01, 10 distinct champions and accounts per match, 6 items per participant,
+# 1% of the queue still pending.
+GENERATE_DATASET = """
+INSERT INTO champions (id, key, name)
+SELECT g, 'Champ' || g, 'Champion ' || g FROM generate_series(1, 170) g
+ON CONFLICT DO NOTHING;
+
+INSERT INTO champion_tag (champion_id, tag)
+SELECT g, (ARRAY['Fighter', 'Mage', 'Tank', 'Marksman', 'Assassin', 'Support'])[1 + g % 6]
+FROM generate_series(1, 170) g
+ON CONFLICT DO NOTHING;
+
+INSERT INTO accounts (puuid, status, depth, last_crawled)
+SELECT md5(g::text) || md5((-g)::text),
+       CASE WHEN g % 20 = 0 THEN 'active' ELSE 'inactive' END,
+       1,
+       CASE WHEN g % 3 = 0 THEN NULL ELSE timestamptz '2026-01-01' + g * interval '1 second' END
+FROM generate_series(1, {accounts}) g;
+
+INSERT INTO matches (match_id, patch, queue_id, game_datetime)
+SELECT 'NA1_' || g, '16.' || (1 + g * 12 / ({matches} + 1)), 450,
+       timestamptz '2026-01-01' + g * interval '1 minute'
+FROM generate_series(1, {matches}) g;
+
+INSERT INTO participants (
+  match_id, puuid, champion_id, team_id, win,
+  total_damage_dealt, physical_damage_dealt, magic_damage_dealt, true_damage_dealt,
+  damage_taken, gold_earned, heals, shields, kills, deaths, assists
+)
+SELECT 'NA1_' || m,
+       md5(a::text) || md5((-a)::text),
+       1 + (m * 7 + s * 13) % 170,
+       CASE WHEN s < 5 THEN 100 ELSE 200 END,
+       (s < 5) = (m % 2 = 0),
+       20000 + (m * s) % 30000, 10000, 8000, 2000, 25000, 11000, 3000, 1000,
+       (m + s) % 15, (m * s) % 12, (m + 2 * s) % 30
+FROM generate_series(1, {matches}) m
+CROSS JOIN generate_series(0, 9) s
+CROSS JOIN LATERAL (SELECT 1 + (m * 10 + s) % {accounts} AS a) acc;
+
+INSERT INTO participant_items (match_id, puuid, item_id, slot)
+SELECT p.match_id, p.puuid, 3000 + (p.champion_id * 31 + slot * 7) % 400, slot
+FROM participants p
+CROSS JOIN generate_series(0, 5) slot;
+
+INSERT INTO match_queue (match_id, discovered_at, fetched_at, status)
+SELECT 'NA1_' || g,
+       timestamp '2026-01-01' + g * interval '1 minute',
+       CASE WHEN g % 100 = 0 THEN NULL ELSE timestamp '2026-01-01' + g * interval '1 minute' END,
+       CASE WHEN g % 100 = 0 THEN 'pending' ELSE 'done' END
+FROM generate_series(1, {matches}) g;
+
+INSERT INTO team_rosters (match_id, team_id, patch, queue_id, win, champs)
+SELECT p.match_id, p.team_id, m.patch, m.queue_id, bool_or(p.win),
+       array_agg(p.champion_id ORDER BY p.champion_id)
+FROM participants p
+JOIN matches m ON m.match_id = p.match_id
+GROUP BY p.match_id, p.team_id, m.patch, m.queue_id;
+"""
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    path: Path
+
+    @property
+    def sql(self) -> str:
+        return self.path.read_text(encoding="utf-8")
+
+    @property
+    def bench_queries(self) -> list[tuple[str, str]]:
+        """(before, after) query pairs; the same query on both sides unless bench-after is given."""
+        pairs = []
+        for after_only, query in BENCH_RE.findall(self.sql):
+            if after_only:
+                if not pairs:
+                    raise ValueError(f"{self.path.name}: bench-after without a preceding bench line")
+                pairs[-1] = (pairs[-1][0], query)
+            else:
+                pairs.append((query, query))
+        return pairs
+
+
+def list_migrations(directory: Path = MIGRATIONS_DIR) -> list[Migration]:
+    migrations = []
+    for path in sorted(directory.glob("*.sql")):
+        m = MIGRATION_NAME_RE.match(path.name)
+        if not m:
+            raise ValueError(f"Unexpected file in {directory}: {path.name} (want NNNN_name.sql)")
+        migrations.append(Migration(int(m.group(1)), m.group(2), path))
+
+    versions = [m.version for m in migrations]
+    if len(set(versions)) != len(versions):
+        raise ValueError(f"Duplicate migration versions in {directory}")
+    return migrations
+
+
+def applied_versions(conn) -> dict[int, str]:
+    with conn.cursor() as cur:
+        cur.execute(CREATE_MIGRATIONS_TABLE)
+        cur.execute("SELECT version, name FROM schema_migrations ORDER BY version;")
+        return dict(cur.fetchall())
+
+
+def apply_migration(conn, migration: Migration) -> float:
+    t0 = time.perf_counter()
+    with conn.transaction(), conn.cursor() as cur:
+        cur.execute(migration.sql)
+        cur.execute(
+            "INSERT INTO schema_migrations (version, name) VALUES (%s, %s);",
+            (migration.version, migration.name),
+        )
+    return time.perf_counter() - t0
+
+
+def migrate(conn, target: int | None = None) -> list[Migration]:
+    """Applies every pending migration up to and including `target` (default: all)."""
+    done = applied_versions(conn)
+    conn.commit()
+
+    applied = []
+    for migration in list_migrations():
+        if migration.version in done:
+            continue
+        if target is not None and migration.version > target:
+            break
+        seconds = apply_migration(conn, migration)
+        print(f"applied {migration.version:04d}_{migration.name} in {seconds:.2f}s", flush=True)
+        applied.append(migration)
+    return applied
+
+
+# ---- benchmark --------------------------------------------------------------
+
+def _explain(conn, query: str) -> dict:
+    """EXPLAIN (ANALYZE, BUFFERS) inside a savepoint that is always rolled back."""
+    try:
+        with conn.transaction(force_rollback=True), conn.cursor() as cur:
+            cur.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + query)
+            plan = cur.fetchone()[0][0]
+    except errors.Error as e:
+        return {"error": str(e).strip().splitlines()[0]}
+
+    root = plan["Plan"]
+    return {
+        "execution_ms": round(plan["Execution Time"], 3),
+        "planning_ms": round(plan["Planning Time"], 3),
+        "node": root["Node Type"],
+        "shared_hit_blocks": root.get("Shared Hit Blocks", 0),
+        "shared_read_blocks": root.get("Shared Read Blocks", 0),
+        "plan": plan,
+    }
+
+
+RELATION_SIZES = """
+SELECT c.relname,
+       sum(pg_table_size(coalesce(t.relid, c.oid)))::bigint AS table_bytes,
+       sum(pg_indexes_size(coalesce(t.relid, c.oid)))::bigint AS index_bytes
+FROM pg_class c
+JOIN pg_namespace n ON n.oid = c.relnamespace
+-- pg_partition_tree() is empty for a plain table.
+LEFT JOIN LATERAL pg_partition_tree(c.oid) t ON true
+WHERE n.nspname = %s AND c.relkind IN ('r', 'p') AND NOT c.relispartition
+GROUP BY c.relname;
+"""
+
+
+def _relation_sizes(conn) -> dict[str, dict]:
+    """Table and index bytes per bench table, partitions summed into their parent."""
+    with conn.cursor() as cur:
+        cur.execute(RELATION_SIZES, (BENCH_SCHEMA,))
+        return {
+            name: {"table_bytes": int(table_bytes), "index_bytes": int(index_bytes)}
+            for name, table_bytes, index_bytes in cur.fetchall()
+        }
+
+
+def _vacuum_analyze(conn) -> None:
+    # VACUUM refuses to run in a transaction block; the bench connection is autocommit.
+    # Only the bench schema's tables, not the whole database.
+    with conn.cursor() as cur:
+        cur.execute("SELECT tablename FROM pg_tables WHERE schemaname = %s;", (BENCH_SCHEMA,))
+        tables = [row[0] for row in cur.fetchall()]
+        for table in tables:
+            cur.execute(sql.SQL("VACUUM ANALYZE {};").format(sql.Identifier(BENCH_SCHEMA, table)))
+
+
+def bench_migration(conn, version: int, *, matches: int, accounts: int, repeat: int = 3) -> dict:
+    """
+    Before/after plans for one migration in a scratch schema (dropped afterwards).
+    Each query is run `repeat` times per side and the fastest run is kept.
+    """
+    migrations = list_migrations()
+    by_version = {m.version: m for m in migrations}
+    if version not in by_version:
+        raise SystemExit(f"No migration {version:04d} in {MIGRATIONS_DIR}")
+    target = by_version[version]
+    queries = target.bench_queries
+    if not queries:
+        raise SystemExit(f"{target.path.name} has no '-- bench:' queries")
+    earlier = [m for m in migrations if m.version < version]
+    if not earlier:
+        raise SystemExit("The baseline migration has nothing to compare against")
+
+    schema = sql.Identifier(BENCH_SCHEMA)
+    conn.autocommit = True
+    with conn.cursor() as cur:
+        cur.execute(sql.SQL("DROP SCHEMA IF EXISTS {} CASCADE;").format(schema))
+        cur.execute(sql.SQL("CREATE SCHEMA {};").format(schema))
+        cur.execute(sql.SQL("SET search_path TO {};").format(schema))
+
+    try:
+        applied_versions(conn)
+        apply_migration(conn, earlier[0])
+
+        t0 = time.perf_counter()
+        with conn.transaction(), conn.cursor() as cur:
+            cur.execute(GENERATE_DATASET.format(matches=int(matches), accounts=int(accounts)))
+        generate_seconds = time.perf_counter() - t0
+
+        for migration in earlier[1:]:
+            apply_migration(conn, migration)
+        _vacuum_analyze(conn)
+
+        def run_all(side: int) -> list[dict]:
+            results = []
+            for pair in queries:
+                runs = [_explain(conn, pair[side]) for _ in range(repeat)]
+                ok = [r for r in runs if "error" not in r]
+                results.append(min(ok, key=lambda r: r["execution_ms"]) if ok else runs[0])
+            return results
+
+        before = run_all(0)
+        sizes_before = _relation_sizes(conn)
+        migrate_seconds = apply_migration(conn, target)
+        _vacuum_analyze(conn)
+        after = run_all(1)
+        sizes_after = _relation_sizes(conn)
+    finally:
+        with conn.cursor() as cur:
+            cur.execute(sql.SQL("DROP SCHEMA IF EXISTS {} CASCADE;").format(schema))
+            cur.execute("RESET search_path;")
+        conn.autocommit = False
+
+    return {
+        "migration": f"{target.version:04d}_{target.name}",
+        "matches": matches,
+        "accounts": accounts,
+        "generate_seconds": round(generate_seconds, 2),
+        "migrate_seconds": round(migrate_seconds, 2),
+        "queries": [
+            {"query": q, **({"after_query": aq} if aq != q else {}), "before": b, "after": a}
+            for (q, aq), b, a in zip(queries, before, after)
+        ],
+        "sizes": {
+            name: {"before": sizes_before.get(name), "after": sizes_after.get(name)}
+            for name in sorted(set(sizes_before) | set(sizes_after))
+        },
+    }
+
+
+def _summary(side: dict) -> str:
+    if "error" in side:
+        return f"error: {side['error']}"
+    return (
+        f"{side['execution_ms']:>10.2f} ms  {side['node']:<22} "
+        f"hit={side['shared_hit_blocks']} read={side['shared_read_blocks']}"
+    )
+
+
+def print_bench_report(report: dict) -> None:
+    print(
+        f"=== {report['migration']}: {report['matches']} matches, {report['accounts']} accounts "
+        f"(generate {report['generate_seconds']}s, migrate {report['migrate_seconds']}s) ==="
+    )
+    for entry in report["queries"]:
+        print(entry["query"])
+        if "after_query" in entry:
+            print(f"  after: {entry['after_query']}")
+        print(f"  before {_summary(entry['before'])}")
+        print(f"  after  {_summary(entry['after'])}")
+
+    changed = {n: s for n, s in report["sizes"].items() if s["before"] != s["after"]}
+    if changed:
+        print(f"{'table':<28} {'table MB before':>16} {'after':>8} {'index MB before':>16} {'after':>8}")
+    for name, side in changed.items():
+        def mb(s, key):
+            return f"{s[key] / 2**20:.1f}" if s else "-"
+        print(
+            f"{name:<28} {mb(side['before'], 'table_bytes'):>16} {mb(side['after'], 'table_bytes'):>8} "
+            f"{mb(side['before'], 'index_bytes'):>16} {mb(side['after'], 'index_bytes'):>8}"
+        )
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("status", help="List migrations and whether they are applied")
+    up = sub.add_parser("up", help="Apply pending migrations")
+    up.add_argument("--to", type=int, default=None, help="Stop after this version")
+    bench = sub.add_parser("bench", help="EXPLAIN ANALYZE a migration's bench queries before/after it")
+    bench.add_argument("version", type=int)
+    bench.add_argument("--matches", type=int, default=100_000)
+    bench.add_argument("--accounts", type=int, default=50_000)
+    bench.add_argument("--repeat", type=int, default=3)
+    bench.add_argument("--out", default=None, help="Write full JSON plans here")
+    # After the subcommand, where its own options go: `<module> <command> --profile`.
+    for parser in sub.choices.values():
+        profiler.add_argument(parser)
+    args = ap.parse_args()
+    profiler.start("migrate", args.profile)
+
+    with connection() as conn:
+        if args.cmd == "status":
+            done = applied_versions(conn)
+            for migration in list_migrations():
+                mark = "applied" if migration.version in done else "pending"
+                print(f"{migration.version:04d}_{migration.name:<32} {mark}")
+        elif args.cmd == "up":
+            if not migrate(conn, args.to):
+                print("Schema is up to date.")
+        else:
+            report = bench_migration(
+                conn, args.version, matches=args.matches, accounts=args.accounts, repeat=args.repeat,
+            )
+            print_bench_report(report)
+            if args.out:
+                Path(args.out).write_text(json.dumps(report, indent=2), encoding="utf-8")
+                print(f"Wrote plans to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
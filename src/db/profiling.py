@@ -0,0 +1,279 @@
+"""
+Opt-in per-statement SQL profiling for every pooled connection (src/db/connection.py).
+
+  SQL_PROFILE=1 python3 -m scripts.ingest_matches
+  SQL_PROFILE=1 SQL_PROFILE_OUT=profiles/ingest.json python3 -m src.datasets.build_team_dataset
+
+When enabled, the pool's configure hook installs ProfilingCursor as the connection's
+cursor factory. Every execute()/executemany() is timed and grouped by statement
+template: whitespace collapsed, and inline literals replaced by "?" so statements that
+only differ by a literal share one row. At process exit a table of templates by total time
+(calls, mean / p50 / p95 / p99 / max latency, rows) goes to stderr and, if
+SQL_PROFILE_OUT is set, a JSON report with full templates and EXPLAIN samples.
+
+Statements slower than SQL_PROFILE_EXPLAIN_MS are re-run once more as
+EXPLAIN (ANALYZE, BUFFERS) with the same parameters, inside a savepoint that is always
+rolled back, at most SQL_PROFILE_EXPLAIN_SAMPLES times per template. The re-run does
+execute the statement, so it costs as much as the original and advances sequences; the
+plan of a write that already happened (e.g. a DELETE) reflects the post-write state.
+
+Server-side (named) cursors and COPY are not profiled.
+
+Environment:
+  SQL_PROFILE                   "1" enables profiling (default off)
+  SQL_PROFILE_OUT               JSON report path (default: stderr table only)
+  SQL_PROFILE_EXPLAIN_MS        slow-statement threshold in ms (default 200; 0 disables EXPLAIN)
+  SQL_PROFILE_EXPLAIN_SAMPLES   EXPLAIN samples kept per template (default 1)
+"""
+from __future__ import annotations
+
+import atexit
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from pathlib import Path
+
+import psycopg
+from psycopg import errors, sql
+from psycopg.pq import TransactionStatus
+
+# Latencies kept per template for percentiles (reservoir sample beyond this).
+RESERVOIR_SIZE = 2048
+
+EXPLAINABLE = ("select", "insert", "update", "delete", "with", "values")
+
+_STRING_LITERAL_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL_RE = re.compile(r"(?<![\w$.])-?\d+(?:\.\d+)?\b")
+_IN_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_COMMENT_RE = re.compile(r"--[^\n]*")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def enabled() -> bool:
+    return os.getenv("SQL_PROFILE", "").lower() not in ("", "0", "false", "no")
+
+
+def _explain_threshold() -> float:
+    return float(os.getenv("SQL_PROFILE_EXPLAIN_MS", "200")) / 1000.0
+
+
+def _explain_samples() -> int:
+    return int(os.getenv("SQL_PROFILE_EXPLAIN_SAMPLES", "1"))
+
+
+def normalize(query: str) -> str:
+    """Collapses whitespace and replaces inline literals, so one template = one row."""
+    text = _COMMENT_RE.sub(" ", query)
+    text = _STRING_LITERAL_RE.sub("?", text)
+    text = _NUMBER_LITERAL_RE.sub("?", text)
+    text = _IN_LIST_RE.sub("(...)", text)
+    return _WHITESPACE_RE.sub(" ", text).strip().rstrip(";").strip()
+
+
+class TemplateStats:
+    def __init__(self, template: str):
+        self.template = template
+        self.calls = 0
+        self.errors = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.rows = 0
+        self.samples: list[float] = []
+        self.explains: list[dict] = []
+        # Claimed before an EXPLAIN runs, so concurrent slow calls don't all sample.
+        self.explains_started = 0
+
+    def record(self, seconds: float, rows: int, failed: bool) -> None:
+        self.calls += 1
+        self.errors += failed
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+        if rows > 0:
+            self.rows += rows
+        if len(self.samples) < RESERVOIR_SIZE:
+            self.samples.append(seconds)
+        else:
+            i = random.randrange(self.calls)
+            if i < RESERVOIR_SIZE:
+                self.samples[i] = seconds
+
+    def percentile(self, q: float) -> float:
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+    def summary(self) -> dict:
+        return {
+            "template": self.template,
+            "calls": self.calls,
+            "errors": self.errors,
+            "total_s": round(self.total_seconds, 4),
+            "mean_ms": round(1000 * self.total_seconds / max(self.calls, 1), 3),
+            "p50_ms": round(1000 * self.percentile(0.50), 3),
+            "p95_ms": round(1000 * self.percentile(0.95), 3),
+            "p99_ms": round(1000 * self.percentile(0.99), 3),
+            "max_ms": round(1000 * self.max_seconds, 3),
+            "rows": self.rows,
+            "explains": self.explains,
+        }
+
+
+_stats: dict[str, TemplateStats] = {}
+_templates: dict[str, str] = {}
+_lock = threading.Lock()
+_started = time.time()
+_report_registered = False
+
+
+def _template(query) -> str:
+    text = query if isinstance(query, str) else bytes(query).decode()
+    template = _templates.get(text)
+    if template is None:
+        template = normalize(text)
+        with _lock:
+            if len(_templates) > 4096:
+                # Statements built with inline values would grow this without bound.
+                _templates.clear()
+            _templates[text] = template
+    return template
+
+
+def _stats_for(template: str) -> TemplateStats:
+    stats = _stats.get(template)
+    if stats is None:
+        with _lock:
+            stats = _stats.setdefault(template, TemplateStats(template))
+    return stats
+
+
+class ProfilingCursor(psycopg.Cursor):
+    def _query_text(self, query) -> str:
+        if isinstance(query, sql.Composable):
+            return query.as_string(self)
+        return query if isinstance(query, str) else bytes(query).decode()
+
+    def _record(self, text: str, seconds: float, failed: bool) -> TemplateStats:
+        stats = _stats_for(_template(text))
+        rows = -1 if failed else self.rowcount
+        with _lock:
+            stats.record(seconds, rows, failed)
+        return stats
+
+    def execute(self, query, params=None, **kwargs):
+        text = self._query_text(query)
+        t0 = time.perf_counter()
+        try:
+            result = super().execute(query, params, **kwargs)
+        except BaseException:
+            self._record(text, time.perf_counter() - t0, failed=True)
+            raise
+        seconds = time.perf_counter() - t0
+        stats = self._record(text, seconds, failed=False)
+        self._maybe_explain(stats, text, params, seconds)
+        return result
+
+    def executemany(self, query, params_seq, **kwargs):
+        text = self._query_text(query)
+        t0 = time.perf_counter()
+        failed = True
+        try:
+            super().executemany(query, params_seq, **kwargs)
+            failed = False
+        finally:
+            self._record(text, time.perf_counter() - t0, failed=failed)
+
+    def _maybe_explain(self, stats: TemplateStats, text: str, params, seconds: float) -> None:
+        threshold = _explain_threshold()
+        if threshold <= 0 or seconds < threshold:
+            return
+        if not text.lstrip().lower().startswith(EXPLAINABLE):
+            return
+        conn = self.connection
+        if conn.info.transaction_status == TransactionStatus.INERROR:
+            return
+        with _lock:
+            if stats.explains_started >= _explain_samples():
+                return
+            stats.explains_started += 1
+        stats.explains.append(_explain(conn, text, params, seconds))
+
+
+def _explain(conn, text: str, params, seconds: float) -> dict:
+    """EXPLAIN (ANALYZE, BUFFERS) inside a savepoint that is always rolled back."""
+    sample = {"observed_ms": round(1000 * seconds, 3)}
+    try:
+        # A plain cursor, so the EXPLAIN itself is not profiled.
+        with conn.transaction(force_rollback=True), psycopg.Cursor(conn) as cur:
+            cur.execute("EXPLAIN (ANALYZE, BUFFERS) " + text, params)
+            sample["plan"] = "\n".join(row[0] for row in cur.fetchall())
+    except errors.Error as e:
+        sample["error"] = str(e).strip().splitlines()[0]
+    return sample
+
+
+def install(conn) -> None:
+    """Makes `conn` hand out ProfilingCursors and registers the exit report (once)."""
+    global _report_registered
+    conn.cursor_factory = ProfilingCursor
+    with _lock:
+        if not _report_registered:
+            atexit.register(write_report)
+            _report_registered = True
+
+
+def reset() -> None:
+    with _lock:
+        _stats.clear()
+
+
+def report() -> dict:
+    with _lock:
+        templates = sorted((s.summary() for s in _stats.values()), key=lambda s: -s["total_s"])
+    return {
+        "argv": sys.argv,
+        "wall_s": round(time.time() - _started, 3),
+        "db_s": round(sum(t["total_s"] for t in templates), 3),
+        "templates": templates,
+    }
+
+
+def print_report(data: dict, *, limit: int = 25, file=None) -> None:
+    file = file or sys.stderr
+    print(
+        f"=== SQL profile: {len(data['templates'])} templates, {data['db_s']:.2f}s in the "
+        f"database over {data['wall_s']:.2f}s wall ===",
+        file=file,
+    )
+    print(
+        f"{'total_s':>9} {'calls':>8} {'mean_ms':>9} {'p50_ms':>9} {'p95_ms':>9} "
+        f"{'p99_ms':>9} {'max_ms':>9} {'rows':>9}  template",
+        file=file,
+    )
+    for t in data["templates"][:limit]:
+        template = t["template"] if len(t["template"]) <= 100 else t["template"][:97] + "..."
+        print(
+            f"{t['total_s']:>9.3f} {t['calls']:>8} {t['mean_ms']:>9.2f} {t['p50_ms']:>9.2f} "
+            f"{t['p95_ms']:>9.2f} {t['p99_ms']:>9.2f} {t['max_ms']:>9.2f} {t['rows']:>9}  {template}",
+            file=file,
+        )
+    explained = sum(1 for t in data["templates"] if t["explains"])
+    if explained:
+        print(f"({explained} templates have EXPLAIN samples in the JSON report)", file=file)
+
+
+def write_report() -> None:
+    data = report()
+    if not data["templates"]:
+        return
+    print_report(data)
+    out = os.getenv("SQL_PROFILE_OUT")
+    if out:
+        path = Path(out)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(data, indent=2))
+        print(f"SQL profile written to {path}", file=sys.stderr)
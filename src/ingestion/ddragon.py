@@ -1,6 +1,10 @@
+import hashlib
 import json
+import os
 import requests
 import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from src.config.paths import DATA_DIR
 
@@ -12,6 +16,13 @@ DDDRAGON_DIR = DATA_DIR / "ddragon"
 ICON_DIR = DDDRAGON_DIR / "icons"
 RAW_DIR = DDDRAGON_DIR / "raw"
 
+# Content-addressed icon blobs ({sha256}.png); per-patch icon dirs hold hardlinks into it.
+ICON_STORE_DIR = DDDRAGON_DIR / "icon_store"
+ICON_MANIFEST_PATH = ICON_DIR / "manifest.json"
+ICON_SYNC_WORKERS = 16
+
+_thread_local = threading.local()
+
 
 def fetch_latest_patch() -> str:
     r = requests.get(PATCH_VERSION_URL, timeout=10)
@@ -32,15 +43,134 @@ def save_raw_json(patch: str, data: dict) -> None:
     path.write_text(json.dumps(data, indent=2), encoding="utf-8")
 
 
-def download_champion_icon(patch: str, icon_dir: Path, filename: str) -> None:
+def _session() -> requests.Session:
+    session = getattr(_thread_local, "session", None)
+    if session is None:
+        session = requests.Session()
+        _thread_local.session = session
+    return session
+
+
+def load_icon_manifest() -> dict:
+    """
+    {filename: {"sha256": ..., "etag": ..., "last_modified": ..., "patch": ...}}
+    for the most recently synced version of every icon.
+    """
+    if not ICON_MANIFEST_PATH.exists():
+        return {}
+    return json.loads(ICON_MANIFEST_PATH.read_text(encoding="utf-8"))
+
+
+def save_icon_manifest(manifest: dict) -> None:
+    ICON_MANIFEST_PATH.parent.mkdir(parents=True, exist_ok=True)
+    tmp = ICON_MANIFEST_PATH.with_suffix(".json.tmp")
+    tmp.write_text(json.dumps(manifest, indent=2, sort_keys=True), encoding="utf-8")
+    tmp.replace(ICON_MANIFEST_PATH)
+
+
+def _store_blob(content: bytes) -> str:
+    digest = hashlib.sha256(content).hexdigest()
+    blob = ICON_STORE_DIR / f"{digest}.png"
+    if not blob.exists():
+        tmp = blob.with_name(f"{blob.name}.{threading.get_ident()}.tmp")
+        tmp.write_bytes(content)
+        tmp.replace(blob)
+    return digest
+
+
+def _link_from_store(digest: str, target: Path) -> None:
+    blob = ICON_STORE_DIR / f"{digest}.png"
+    if target.exists():
+        target.unlink()
+    try:
+        os.link(blob, target)
+    except OSError:
+        # Different filesystem or no hardlink support.
+        shutil.copyfile(blob, target)
+
+
+def sync_champion_icon(patch: str, icon_dir: Path, filename: str, previous: dict | None) -> tuple[str, dict]:
+    """
+    Returns (outcome, manifest_entry) where outcome is one of
+    "present", "reused" (304 from a previous patch's validators) or "downloaded".
+    """
+    target = icon_dir / filename
+    if target.exists():
+        if previous and previous.get("patch") == patch:
+            return "present", previous
+        # Icon downloaded before the store existed: adopt it without validators.
+        digest = _store_blob(target.read_bytes())
+        _link_from_store(digest, target)
+        return "present", {"sha256": digest, "etag": None, "last_modified": None, "patch": patch}
+
+    headers = {}
+    blob_known = bool(previous) and (ICON_STORE_DIR / f"{previous['sha256']}.png").exists()
+    if blob_known:
+        if previous.get("etag"):
+            headers["If-None-Match"] = previous["etag"]
+        if previous.get("last_modified"):
+            headers["If-Modified-Since"] = previous["last_modified"]
+
     url = CHAMPION_ICON_URL.format(patch=patch, filename=filename)
-    filepath = icon_dir / filename
-    if filepath.exists():
-        return
+    r = _session().get(url, headers=headers, timeout=10)
+
+    if r.status_code == 304 and blob_known:
+        _link_from_store(previous["sha256"], target)
+        return "reused", {**previous, "patch": patch}
 
-    r = requests.get(url, timeout=10)
     r.raise_for_status()
-    filepath.write_bytes(r.content)
+    digest = _store_blob(r.content)
+    _link_from_store(digest, target)
+
+    entry = {
+        "sha256": digest,
+        "etag": r.headers.get("ETag"),
+        "last_modified": r.headers.get("Last-Modified"),
+        "patch": patch,
+    }
+    outcome = "reused" if previous and previous.get("sha256") == digest else "downloaded"
+    return outcome, entry
+
+
+def sync_champion_icons(patch: str, filenames: list[str], *, max_workers: int = ICON_SYNC_WORKERS) -> dict:
+    """
+    Materializes icons for `patch` under ICON_DIR/{patch} using a bounded thread pool.
+    Unchanged icons are validated with conditional requests against the previous patch's
+    ETag/Last-Modified and hardlinked from the content-addressed store instead of rewritten.
+    """
+    icon_dir = ICON_DIR / patch
+    icon_dir.mkdir(parents=True, exist_ok=True)
+    ICON_STORE_DIR.mkdir(parents=True, exist_ok=True)
+
+    manifest = load_icon_manifest()
+    stats = {"present": 0, "reused": 0, "downloaded": 0}
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {
+            filename: pool.submit(sync_champion_icon, patch, icon_dir, filename, manifest.get(filename))
+            for filename in filenames
+        }
+        for filename, future in futures.items():
+            outcome, entry = future.result()
+            stats[outcome] += 1
+            manifest[filename] = entry
+
+    save_icon_manifest(manifest)
+    return stats
+
+
+def prune_icon_store() -> int:
+    """Deletes store blobs no patch directory links to anymore. Returns the number removed."""
+    if not ICON_STORE_DIR.exists():
+        return 0
+
+    referenced = {entry["sha256"] for entry in load_icon_manifest().values()}
+    removed = 0
+    for blob in ICON_STORE_DIR.glob("*.png"):
+        if blob.stem not in referenced and blob.stat().st_nlink <= 1:
+            blob.unlink()
+            removed += 1
+    return removed
 
 
 def update_ddragon(keep_only_latest: bool = True) -> str:
@@ -48,19 +178,19 @@ def update_ddragon(keep_only_latest: bool = True) -> str:
 
     patch = fetch_latest_patch()
 
+    champ_json = fetch_champion_json(patch)
+    save_raw_json(patch, champ_json)
+
+    filenames = [champ_data["image"]["full"] for champ_data in champ_json["data"].values()]
+    stats = sync_champion_icons(patch, filenames)
+    print(f"Icons for {patch}: {stats}")
+
+    # Old patch dirs are only hardlinks into the store, so removing them after the sync is cheap
+    # and never forces a re-download of unchanged icons.
     if keep_only_latest:
         for p in ICON_DIR.iterdir():
             if p.is_dir() and p.name != patch:
                 shutil.rmtree(p)
-
-    patch_icon_dir = ICON_DIR / patch
-    patch_icon_dir.mkdir(parents=True, exist_ok=True)
-
-    champ_json = fetch_champion_json(patch)
-    save_raw_json(patch, champ_json)
-
-    for champ_data in champ_json["data"].values():
-        filename = champ_data["image"]["full"]
-        download_champion_icon(patch, patch_icon_dir, filename)
+        prune_icon_store()
 
     return patch
@@ -1,3 +1,5 @@
+import datetime
+import json
 import requests
 from pathlib import Path
 from src.config.paths import DATA_DIR
@@ -8,41 +10,116 @@ HEADERS = {"User-Agent": "Aram Modifiers Bot/1.0"}
 FANDOM_RAW_DIR = DATA_DIR / "fandom_api" / "raw"
 FANDOM_RAW_DIR.mkdir(parents=True, exist_ok=True)
 
+# Revision metadata (revid / timestamp / sha1) of the raw files currently on disk.
+REVISIONS_PATH = FANDOM_RAW_DIR / "revisions.json"
+
+FANDOM_PAGES = {
+    "Module:ChampionData/data": "champions.lua",
+    "Template:Map_changes/data/aram": "aram_modifiers.wikitext",
+}
+
 def save_raw(filename: str, content: str) -> Path:
     path = FANDOM_RAW_DIR / filename
     path.write_text(content, encoding="utf-8")
     return path
 
-def fetch_data(title: str) -> str:
-    params = {
+def _query(params: dict) -> dict:
+    base = {
         "action": "query",
         "format": "json",
         "formatversion": "2",
-        "prop": "revisions",
-        "rvprop": "content",
-        "rvslots": "main",
-        "titles": title,
         "origin": "*",
     }
-
-    r = requests.get(API_URL, params=params, headers=HEADERS, timeout=30)
+    r = requests.get(API_URL, params={**base, **params}, headers=HEADERS, timeout=30)
     r.raise_for_status()
+    return r.json()
+
+def fetch_latest_revisions(titles: list[str]) -> dict:
+    """
+    One query for the latest revision metadata of every title (no content).
+    Returns {requested_title: {"revid": ..., "timestamp": ..., "sha1": ...}}.
+    """
+    data = _query({
+        "prop": "revisions",
+        "rvprop": "ids|timestamp|sha1",
+        "titles": "|".join(titles),
+    })
+    query = data["query"]
+
+    # MediaWiki normalizes titles (e.g. underscores -> spaces); map back to what we asked for.
+    requested = {t: t for t in titles}
+    for n in query.get("normalized", []):
+        requested[n["to"]] = n["from"]
+
+    revisions = {}
+    for page in query["pages"]:
+        title = requested.get(page["title"], page["title"])
+        if "missing" in page:
+            raise ValueError(f"Page not found: {title}")
+        revs = page.get("revisions")
+        if not revs:
+            raise ValueError(f"No revisions available for: {title}")
+        rev = revs[0]
+        revisions[title] = {"revid": rev["revid"], "timestamp": rev.get("timestamp"), "sha1": rev.get("sha1")}
+
+    return revisions
+
+def fetch_revision_contents(revids: list[int]) -> dict:
+    """One query for the content of several revisions. Returns {revid: content}."""
+    data = _query({
+        "prop": "revisions",
+        "rvprop": "ids|content",
+        "rvslots": "main",
+        "revids": "|".join(str(r) for r in revids),
+    })
+
+    contents = {}
+    for page in data["query"]["pages"]:
+        for rev in page.get("revisions") or []:
+            contents[rev["revid"]] = rev["slots"]["main"]["content"]
+
+    missing = set(revids) - set(contents)
+    if missing:
+        raise ValueError(f"No content returned for revisions: {sorted(missing)}")
+    return contents
+
+def load_revisions() -> dict:
+    if not REVISIONS_PATH.exists():
+        return {}
+    return json.loads(REVISIONS_PATH.read_text(encoding="utf-8"))
 
-    data = r.json()
-    page = data["query"]["pages"][0]
+def save_revisions(revisions: dict) -> None:
+    REVISIONS_PATH.write_text(json.dumps(revisions, indent=2, sort_keys=True), encoding="utf-8")
 
-    if "missing" in page:
-        raise ValueError(f"Page not found: {title}")
+def update_fandom(force: bool = False) -> list[str]:
+    """
+    Checks the latest revision of every page in FANDOM_PAGES and only downloads and
+    rewrites the raw files whose revision changed (or that are missing locally).
+    Returns the filenames that were rewritten.
+    """
+    known = load_revisions()
+    latest = fetch_latest_revisions(list(FANDOM_PAGES))
 
-    revs = page.get("revisions")
-    if not revs:
-        raise ValueError(f"No revisions/content available for: {title}")
+    stale = [
+        title for title, filename in FANDOM_PAGES.items()
+        if force
+        or not (FANDOM_RAW_DIR / filename).exists()
+        or known.get(title, {}).get("revid") != latest[title]["revid"]
+    ]
+    if not stale:
+        print("Fandom pages unchanged.")
+        return []
 
-    return revs[0]["slots"]["main"]["content"]
+    contents = fetch_revision_contents([latest[title]["revid"] for title in stale])
 
-def update_fandom() -> None:
-    champ_content = fetch_data("Module:ChampionData/data")
-    aram_content = fetch_data("Template:Map_changes/data/aram")
+    fetched_at = datetime.datetime.now(datetime.timezone.utc).isoformat()
+    changed = []
+    for title in stale:
+        filename = FANDOM_PAGES[title]
+        save_raw(filename, contents[latest[title]["revid"]])
+        known[title] = {**latest[title], "file": filename, "fetched_at": fetched_at}
+        changed.append(filename)
 
-    save_raw("champions.lua", champ_content)
-    save_raw("aram_modifiers.wikitext", aram_content)
+    save_revisions(known)
+    print(f"Fandom pages updated: {changed}")
+    return changed
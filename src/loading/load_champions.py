@@ -1,14 +1,17 @@
+import argparse
 import json
-import os
+import struct
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
-import psycopg
 from dotenv import load_dotenv
 
+from src.db.connection import transaction
+from src.merging.store import CanonicalStore, canonical_dir, version_key
+from src.utils import profiler
+
 load_dotenv()
 
-DB_URL = os.environ["DATABASE_URL"]
-CANONICAL_DIR = Path(os.environ["CANONICAL_DIR"])
 
 
 def extract_champions_map(payload: dict) -> dict:
@@ -42,137 +45,272 @@ def extract_champions_map(payload: dict) -> dict:
     raise ValueError(f"Couldn't find champions map. Top-level keys: {list(payload.keys())[:30]}")
 
 
-UPSERT_CHAMPION = """
+MOD_FIELDS = (
+    "ability_haste", "dmg_dealt", "dmg_taken", "healing", "shielding", "tenacity",
+    "attack_speed", "energy_regen",
+)
+
+UPSERT_CHAMPIONS = """
 INSERT INTO champions (id, key, name)
-VALUES (%s, %s, %s)
+SELECT * FROM unnest(%s::int[], %s::text[], %s::text[])
 ON CONFLICT (id) DO UPDATE
 SET key = EXCLUDED.key,
     name = EXCLUDED.name;
 """
 
-UPSERT_TAG = """
+INSERT_TAGS = """
 INSERT INTO champion_tag (champion_id, tag)
-VALUES (%s, %s)
+SELECT * FROM unnest(%s::int[], %s::text[])
 ON CONFLICT (champion_id, tag) DO NOTHING;
 """
 
-UPSERT_ARAM_MODS = """
-INSERT INTO champion_aram_mods (
-  champion_id, patch,
-  ability_haste, dmg_dealt, dmg_taken, healing, shielding, tenacity,
-  attack_speed, energy_regen
-)
-VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
+DELETE_TAGS = """
+DELETE FROM champion_tag
+WHERE (champion_id, tag) IN (SELECT * FROM unnest(%s::int[], %s::text[]));
+"""
+
+UPSERT_ARAM_MODS = f"""
+INSERT INTO champion_aram_mods (champion_id, patch, {", ".join(MOD_FIELDS)})
+SELECT c, %s, {", ".join(MOD_FIELDS)}
+FROM unnest(%s::int[], {", ".join(["%s::real[]"] * len(MOD_FIELDS))})
+  AS t(c, {", ".join(MOD_FIELDS)})
 ON CONFLICT (champion_id, patch) DO UPDATE
-SET
-  ability_haste = EXCLUDED.ability_haste,
-  dmg_dealt     = EXCLUDED.dmg_dealt,
-  dmg_taken     = EXCLUDED.dmg_taken,
-  healing       = EXCLUDED.healing,
-  shielding     = EXCLUDED.shielding,
-  tenacity      = EXCLUDED.tenacity,
-  attack_speed  = EXCLUDED.attack_speed,
-  energy_regen  = EXCLUDED.energy_regen;
+SET {", ".join(f"{f} = EXCLUDED.{f}" for f in MOD_FIELDS)};
 """
 
-UPSERT_SPELL_CHANGE = """
+DELETE_ARAM_MODS = """
+DELETE FROM champion_aram_mods
+WHERE patch = %s AND champion_id = ANY(%s::int[]);
+"""
+
+UPSERT_SPELL_CHANGES = """
 INSERT INTO champion_spell_changes (champion_id, patch, spell_key, idx, change_text)
-VALUES (%s,%s,%s,%s,%s)
+SELECT c, %s, k, i, t
+FROM unnest(%s::int[], %s::text[], %s::int[], %s::text[]) AS u(c, k, i, t)
 ON CONFLICT (champion_id, patch, spell_key, idx) DO UPDATE
 SET change_text = EXCLUDED.change_text;
 """
 
+DELETE_SPELL_CHANGES = """
+DELETE FROM champion_spell_changes
+WHERE patch = %s
+  AND (champion_id, spell_key, idx) IN (SELECT * FROM unnest(%s::int[], %s::text[], %s::int[]));
+"""
+
 
-def load_champions_for_patch(patch: str, canonical_path: Path | None = None) -> dict:
+def _real(value):
+    """Round to float32 so canonical values compare equal to what a REAL column returns."""
+    if value is None:
+        return None
+    return struct.unpack("f", struct.pack("f", float(value)))[0]
+
+
+def _columns(rows) -> list[list]:
+    rows = list(rows)
+    if not rows:
+        return []
+    return [list(col) for col in zip(*rows)]
+
+
+def shared_rows(champions_map: dict) -> tuple[dict, set]:
+    """({champ_id: (key, name)}, {(champ_id, tag)}) -- patch-independent tables."""
+    champs = {}
+    tags = set()
+    for champ in champions_map.values():
+        if not isinstance(champ, dict):
+            continue
+        champ_id = int(champ["id"])
+        champs[champ_id] = (champ["key"], champ["name"])
+        for tag in champ.get("tags") or []:
+            tags.add((champ_id, tag))
+    return champs, tags
+
+
+def patch_rows(champions_map: dict) -> tuple[dict, dict]:
+    """({champ_id: mods_tuple}, {(champ_id, spell_key, idx): text}) for one patch."""
+    mods = {}
+    spells = {}
+    for champ in champions_map.values():
+        if not isinstance(champ, dict):
+            continue
+        champ_id = int(champ["id"])
+
+        aram_mods = champ.get("aram_mods") or {}
+        if isinstance(aram_mods, dict) and aram_mods:
+            mods[champ_id] = tuple(_real(aram_mods.get(f)) for f in MOD_FIELDS)
+
+        spell_changes = champ.get("spell_changes") or {}
+        if isinstance(spell_changes, dict) and spell_changes:
+            for spell_key, lines in spell_changes.items():
+                for i, line in enumerate(lines or []):
+                    spells[(champ_id, spell_key, i)] = line
+    return mods, spells
+
+
+def sync_shared(cur, champions_map: dict) -> dict:
+    """Upserts changed champions and adds/removes tags for the champions in the snapshot."""
+    want_champs, want_tags = shared_rows(champions_map)
+    ids = list(want_champs)
+
+    cur.execute("SELECT id, key, name FROM champions WHERE id = ANY(%s::int[]);", (ids,))
+    have_champs = {row[0]: (row[1], row[2]) for row in cur.fetchall()}
+
+    cur.execute("SELECT champion_id, tag FROM champion_tag WHERE champion_id = ANY(%s::int[]);", (ids,))
+    have_tags = set(cur.fetchall())
+
+    changed = [(cid, *vals) for cid, vals in sorted(want_champs.items()) if have_champs.get(cid) != vals]
+    new_tags = sorted(want_tags - have_tags)
+    stale_tags = sorted(have_tags - want_tags)
+
+    if changed:
+        cur.execute(UPSERT_CHAMPIONS, _columns(changed))
+    if stale_tags:
+        cur.execute(DELETE_TAGS, _columns(stale_tags))
+    if new_tags:
+        cur.execute(INSERT_TAGS, _columns(new_tags))
+
+    return {"champions": len(changed), "tags": len(new_tags), "tags_deleted": len(stale_tags)}
+
+
+def sync_patch(cur, patch: str, champions_map: dict) -> dict:
+    """Brings champion_aram_mods / champion_spell_changes for `patch` in line with the snapshot."""
+    want_mods, want_spells = patch_rows(champions_map)
+
+    cur.execute(
+        f"SELECT champion_id, {', '.join(MOD_FIELDS)} FROM champion_aram_mods WHERE patch = %s;",
+        (patch,),
+    )
+    # psycopg reads REAL back as its shortest decimal (1.05), not the float32 value.
+    have_mods = {row[0]: tuple(_real(v) for v in row[1:]) for row in cur.fetchall()}
+
+    cur.execute(
+        "SELECT champion_id, spell_key, idx, change_text FROM champion_spell_changes WHERE patch = %s;",
+        (patch,),
+    )
+    have_spells = {(row[0], row[1], row[2]): row[3] for row in cur.fetchall()}
+
+    mods_upsert = [(cid, *vals) for cid, vals in sorted(want_mods.items()) if have_mods.get(cid) != vals]
+    mods_delete = sorted(set(have_mods) - set(want_mods))
+    spells_upsert = [(*key, text) for key, text in sorted(want_spells.items()) if have_spells.get(key) != text]
+    spells_delete = sorted(set(have_spells) - set(want_spells))
+
+    if mods_delete:
+        cur.execute(DELETE_ARAM_MODS, (patch, mods_delete))
+    if mods_upsert:
+        cur.execute(UPSERT_ARAM_MODS, (patch, *_columns(mods_upsert)))
+    if spells_delete:
+        cur.execute(DELETE_SPELL_CHANGES, (patch, *_columns(spells_delete)))
+    if spells_upsert:
+        cur.execute(UPSERT_SPELL_CHANGES, (patch, *_columns(spells_upsert)))
+
+    return {
+        "mods_rows": len(mods_upsert),
+        "mods_deleted": len(mods_delete),
+        "spell_rows": len(spells_upsert),
+        "spell_deleted": len(spells_delete),
+    }
+
+
+def load_champions_for_patch(
+    patch: str,
+    canonical_path: Path | None = None,
+    *,
+    include_shared: bool = True,
+    champions_map: dict | None = None,
+) -> dict:
     """
     Callable entrypoint for run.py.
 
-    Loads champions/tags/aram_mods/spell_changes for `patch` into Postgres.
+    Diffs the canonical snapshot for `patch` against champions/champion_tag (unless
+    include_shared=False) and the patch's champion_aram_mods/champion_spell_changes rows,
+    then applies only the changes with set-based statements in a single transaction.
+
+    The snapshot is `champions_map` if given, else the file at `canonical_path`, else
+    the patch in the canonical store, else a pre-store {patch}.json file in canonical_dir().
 
-    Returns a dict of counts:
-      {"patch": patch, "champions": X, "tags": Y, "mods_rows": Z, "spell_rows": W}
+    Returns a dict of counts of rows written:
+      {"patch": patch, "champions": X, "tags": Y, "mods_rows": Z, "spell_rows": W, ...}
     """
-    if canonical_path is None:
-        canonical_path = CANONICAL_DIR / f"{patch}.json"
+    if champions_map is not None:
+        source = "caller"
+    elif canonical_path is not None:
+        champions_map = extract_champions_map(json.loads(canonical_path.read_text(encoding="utf-8")))
+        source = str(canonical_path)
+    else:
+        store = CanonicalStore()
+        legacy = canonical_dir() / f"{patch}.json"
+        if patch in store.patches():
+            champions_map = store.snapshot(patch)
+            source = "store"
+        elif legacy.exists():
+            champions_map = extract_champions_map(json.loads(legacy.read_text(encoding="utf-8")))
+            source = str(legacy)
+        else:
+            raise KeyError(f"Patch {patch} not in the canonical store or {legacy.parent}")
+
+    stats = {"patch": patch, "champions": 0, "tags": 0, "tags_deleted": 0}
+
+    with transaction() as conn:
+        with conn.cursor() as cur:
+            if include_shared:
+                stats.update(sync_shared(cur, champions_map))
+            stats.update(sync_patch(cur, patch, champions_map))
 
-    payload = json.loads(canonical_path.read_text(encoding="utf-8"))
-    champions_map = extract_champions_map(payload)
+    stats["source"] = source
+    return stats
 
-    champs_upserted = 0
-    tags_inserted = 0
-    mods_rows_upserted = 0
-    spell_rows_upserted = 0
 
-    with psycopg.connect(DB_URL) as conn:
-        with conn.cursor() as cur:
-            for champ in champions_map.values():
-                if not isinstance(champ, dict):
-                    continue
-
-                champ_id = int(champ["id"])
-                key = champ["key"]
-                name = champ["name"]
-
-                cur.execute(UPSERT_CHAMPION, (champ_id, key, name))
-                champs_upserted += 1
-
-                for tag in champ.get("tags") or []:
-                    cur.execute(UPSERT_TAG, (champ_id, tag))
-                    tags_inserted += 1
-
-                aram_mods = champ.get("aram_mods") or {}
-                if isinstance(aram_mods, dict) and aram_mods:
-                    cur.execute(
-                        UPSERT_ARAM_MODS,
-                        (
-                            champ_id,
-                            patch,
-                            aram_mods.get("ability_haste"), 
-                            aram_mods.get("dmg_dealt"),
-                            aram_mods.get("dmg_taken"),
-                            aram_mods.get("healing"),
-                            aram_mods.get("shielding"),
-                            aram_mods.get("tenacity"),
-                            aram_mods.get("attack_speed"),
-                            aram_mods.get("energy_regen"),
-                        ),
-                    )
-                    mods_rows_upserted += 1
-
-                spell_changes = champ.get("spell_changes") or {}
-                if isinstance(spell_changes, dict) and spell_changes:
-                    for spell_key, lines in spell_changes.items():
-                        if not lines:
-                            continue
-                        for i, line in enumerate(lines):
-                            cur.execute(UPSERT_SPELL_CHANGE, (champ_id, patch, spell_key, i, line))
-                            spell_rows_upserted += 1
-
-        conn.commit()
+def backfill_patches(store: CanonicalStore, patches: list[str], max_workers: int = 4) -> list[dict]:
+    """
+    Loads many patches of the canonical store. Shared tables are synced once from the
+    union of all snapshots (newest wins), then per-patch tables are loaded concurrently,
+    one pooled connection and transaction per patch (size DB_POOL_MAX accordingly).
+    """
+    patches = sorted(patches, key=version_key)
+    snapshots = {patch: store.snapshot(patch) for patch in patches}
 
-    return {
-        "patch": patch,
-        "champions": champs_upserted,
-        "tags": tags_inserted,
-        "mods_rows": mods_rows_upserted,
-        "spell_rows": spell_rows_upserted,
-        "canonical_path": str(canonical_path),
-    }
+    union = {}
+    for champions_map in snapshots.values():
+        for champ in champions_map.values():
+            if isinstance(champ, dict):
+                union[int(champ["id"])] = champ
 
+    with transaction() as conn:
+        with conn.cursor() as cur:
+            shared = sync_shared(cur, union)
+    print("Shared tables:", shared)
 
-def main():
-    files = list(CANONICAL_DIR.glob("*.json"))
-    if not files:
-        raise FileNotFoundError(f"No *.json files found in {CANONICAL_DIR}")
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = [
+            pool.submit(load_champions_for_patch, patch, include_shared=False, champions_map=champions_map)
+            for patch, champions_map in snapshots.items()
+        ]
+        return [f.result() for f in futures]
 
-    def ver_tuple(path: Path):
-        return tuple(int(x) for x in path.stem.split("."))
 
-    best = max(files, key=ver_tuple)
-    patch = best.stem
-    stats = load_champions_for_patch(patch, canonical_path=best)
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--all", action="store_true", help="Backfill every patch in the canonical store instead of only the latest")
+    ap.add_argument("--workers", type=int, default=4, help="Concurrent patch loads for --all")
+    profiler.add_argument(ap)
+    args = ap.parse_args()
+    profiler.start("load_champions", args.profile)
+
+    store = CanonicalStore()
+    if not store.patches():
+        raise FileNotFoundError(
+            f"Canonical store {store.root} is empty; import snapshot files with python3 -m src.merging.store import"
+        )
+
+    if args.all:
+        for stats in backfill_patches(store, store.patches(), max_workers=args.workers):
+            print("Loaded:", stats)
+        return
+
+    patch = store.latest_patch()
+    stats = load_champions_for_patch(patch, champions_map=store.snapshot(patch))
     print("Loaded:", stats)
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
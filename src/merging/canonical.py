@@ -1,5 +1,4 @@
-import json
-from pathlib import Path
+from src.merging.store import CanonicalStore
 
 
 def merge_champion_data(
@@ -34,15 +33,5 @@ def merge_champion_data(
 
         merged[champ_id] = entry
 
-    snapshot = {
-        "patch": patch,
-        "champions": merged,
-    }
-
-    output_path = Path(f"data/canonical/{patch}.json")
-    output_path.parent.mkdir(parents=True, exist_ok=True)
-
-    with open(output_path, "w", encoding="utf-8") as f:
-        json.dump(snapshot, f, indent=2, ensure_ascii=False)
-
-    return output_path
\ No newline at end of file
+    # The multi-patch store (base + deltas) is the only copy; load_champions reads it.
+    return CanonicalStore().add_snapshot(patch, merged)
@@ -0,0 +1,313 @@
+"""
+Multi-patch canonical champion store.
+
+Layout (under data/canonical/store/):
+  records.jsonl       {"id": record_id, "entry": champion_entry} per line; content-addressed,
+                      each distinct entry stored once, appended to and never rewritten
+  base.json           {"patch": oldest, "champions": {champ_id: record_id}}
+  deltas/{patch}.json {"patch", "parent", "changed": {champ_id: record_id}, "removed": [champ_id]}
+  index.json          {"patches": [...ordered...]}
+
+Adding a patch appends its new records, writes its own delta (or base.json if it is the
+oldest) and the delta of the patch after it, and rewrites the patch list. Nothing on disk
+grows with patches x champions. On load, base + deltas are replayed in index.json order
+(or by following each delta's parent, see rebuild_index) into a {champ_id: record_id} map
+per patch, so lookups of any champion at any patch are O(1). Diffing two patches compares
+two small maps instead of re-reading whole snapshots.
+
+Replacing a patch's snapshot can leave records no patch references; `compact` drops them.
+Stores written before records.jsonl (records.json, and an index.json carrying the full
+maps) are read as before and converted on the next write.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+from pathlib import Path
+
+from src.config.paths import DATA_DIR
+from src.utils import profiler
+from src.utils.cache import sha256_json
+from src.utils.versioning import patch_mm
+
+DEFAULT_CANONICAL_DIR = DATA_DIR / "canonical"
+
+
+def canonical_dir() -> Path:
+    """
+    CANONICAL_DIR from the environment (or .env), else data/canonical. Read on use, so
+    importing this module does not load .env. Every reader and writer of the store
+    resolves its location through here.
+    """
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    return Path(os.getenv("CANONICAL_DIR", str(DEFAULT_CANONICAL_DIR)))
+
+
+def store_dir() -> Path:
+    return canonical_dir() / "store"
+
+
+def version_key(patch: str) -> tuple:
+    return tuple(int(x) for x in patch.split("."))
+
+
+def record_id(entry: dict) -> str:
+    return sha256_json(entry)[:16]
+
+
+def _read_json(path: Path, default):
+    if not path.exists():
+        return default
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def _record_line(rid: str, entry: dict) -> str:
+    return json.dumps({"id": rid, "entry": entry}, separators=(",", ":"), ensure_ascii=False, sort_keys=True) + "\n"
+
+
+def _write_json(path: Path, payload) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_text(json.dumps(payload, separators=(",", ":"), ensure_ascii=False, sort_keys=True), encoding="utf-8")
+    tmp.replace(path)
+
+
+class CanonicalStore:
+    def __init__(self, root: Path | None = None):
+        self.root = root if root is not None else store_dir()
+        self.records: dict[str, dict] = self._read_records()
+        index = self._index_from_patch_list() or self._index_from_deltas()
+        self.patch_order: list[str] = index["patches"]
+        self.at: dict[str, dict[str, str]] = index["at"]
+
+    # ---- reading -------------------------------------------------------------
+
+    def patches(self) -> list[str]:
+        return list(self.patch_order)
+
+    def latest_patch(self) -> str | None:
+        return self.patch_order[-1] if self.patch_order else None
+
+    def champion(self, champ_id, patch: str) -> dict | None:
+        rid = self.at.get(patch, {}).get(str(champ_id))
+        return self.records[rid] if rid else None
+
+    def aram_mods(self, champ_id, patch: str) -> dict:
+        entry = self.champion(champ_id, patch)
+        return (entry or {}).get("aram_mods") or {}
+
+    def snapshot(self, patch: str) -> dict:
+        """{champ_id(str): entry} -- same shape as the "champions" map of a canonical JSON file."""
+        if patch not in self.at:
+            raise KeyError(f"Patch {patch} not in canonical store")
+        return {cid: self.records[rid] for cid, rid in self.at[patch].items()}
+
+    def changes(self, from_patch: str, to_patch: str) -> dict:
+        """
+        What changed between two patches:
+          {"added": {id: entry}, "removed": {id: entry}, "changed": {id: {"from": entry, "to": entry}}}
+        """
+        a = self.at[from_patch]
+        b = self.at[to_patch]
+        return {
+            "added": {cid: self.records[rid] for cid, rid in b.items() if cid not in a},
+            "removed": {cid: self.records[rid] for cid, rid in a.items() if cid not in b},
+            "changed": {
+                cid: {"from": self.records[a[cid]], "to": self.records[rid]}
+                for cid, rid in b.items()
+                if cid in a and a[cid] != rid
+            },
+        }
+
+    # ---- writing -------------------------------------------------------------
+
+    def add_snapshot(self, patch: str, champions: dict) -> dict:
+        """
+        Adds (or replaces) the snapshot for `patch`. `champions` is {champ_id: entry}.
+        Returns a summary of the resulting delta against the previous patch.
+        """
+        mapping = {}
+        new_records = {}
+        for cid, entry in champions.items():
+            rid = record_id(entry)
+            if rid not in self.records:
+                self.records[rid] = new_records[rid] = entry
+            mapping[str(cid)] = rid
+
+        self.at[patch] = mapping
+        self.patch_order = sorted(self.at, key=version_key)
+        pos = self.patch_order.index(patch)
+
+        # Records first and the index last, so an interrupted write never leaves a delta
+        # pointing at a record that is not on disk.
+        self._append_records(new_records)
+        self._write_patch(pos)
+        if pos + 1 < len(self.patch_order):
+            self._write_patch(pos + 1)
+        _write_json(self.root / "index.json", {"patches": self.patch_order})
+
+        summary = {"patch": patch, "snapshot": sha256_json(mapping)[:16]}
+        if pos == 0:
+            return {**summary, "parent": None, "changed": len(mapping), "removed": 0}
+        delta = self._delta(self.patch_order[pos - 1], patch)
+        return {**summary, "parent": delta["parent"], "changed": len(delta["changed"]), "removed": len(delta["removed"])}
+
+    def has_snapshot(self, patch: str, snapshot: str) -> bool:
+        """Whether `patch` is stored with the mapping add_snapshot() summarized as `snapshot`."""
+        return patch in self.at and sha256_json(self.at[patch])[:16] == snapshot
+
+    def _delta(self, parent: str, patch: str) -> dict:
+        a = self.at[parent]
+        b = self.at[patch]
+        return {
+            "patch": patch,
+            "parent": parent,
+            "changed": {cid: rid for cid, rid in b.items() if a.get(cid) != rid},
+            "removed": sorted(cid for cid in a if cid not in b),
+        }
+
+    def _write_patch(self, pos: int) -> None:
+        patch = self.patch_order[pos]
+        if pos == 0:
+            _write_json(self.root / "base.json", {"patch": patch, "champions": self.at[patch]})
+            # A patch older than the previous base turns that base into a delta.
+            (self.root / "deltas" / f"{patch}.json").unlink(missing_ok=True)
+        else:
+            _write_json(self.root / "deltas" / f"{patch}.json", self._delta(self.patch_order[pos - 1], patch))
+
+    def _append_records(self, records: dict[str, dict]) -> None:
+        legacy = self.root / "records.json"
+        if legacy.exists():
+            # First write to an older store: move every record into the log.
+            self._write_records(self.records)
+            legacy.unlink()
+            return
+        if not records:
+            return
+        self.root.mkdir(parents=True, exist_ok=True)
+        with open(self.root / "records.jsonl", "a", encoding="utf-8") as f:
+            f.write("".join(_record_line(rid, entry) for rid, entry in records.items()))
+
+    def _write_records(self, records: dict[str, dict]) -> None:
+        path = self.root / "records.jsonl"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        tmp.write_text("".join(_record_line(rid, entry) for rid, entry in records.items()), encoding="utf-8")
+        tmp.replace(path)
+
+    def _read_records(self) -> dict[str, dict]:
+        legacy = self.root / "records.json"
+        if legacy.exists():
+            return _read_json(legacy, {})
+        path = self.root / "records.jsonl"
+        if not path.exists():
+            return {}
+        records = {}
+        for line in path.read_text(encoding="utf-8").splitlines():
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # torn last line of an interrupted append; its delta was never written
+            records[row["id"]] = row["entry"]
+        return records
+
+    def compact(self) -> int:
+        """Rewrites records.jsonl without records no patch references. Returns how many were dropped."""
+        live = {rid for mapping in self.at.values() for rid in mapping.values()}
+        dropped = len(self.records) - len(live)
+        self.records = {rid: rec for rid, rec in self.records.items() if rid in live}
+        self._write_records(self.records)
+        (self.root / "records.json").unlink(missing_ok=True)
+        return dropped
+
+    def _index_from_patch_list(self) -> dict | None:
+        """Replays base + deltas in index.json order; None if the list is missing or stale."""
+        patches = _read_json(self.root / "index.json", {}).get("patches")
+        base = _read_json(self.root / "base.json", None)
+        if not patches or base is None or base["patch"] != patches[0]:
+            return None
+        at = {patches[0]: dict(base["champions"])}
+        for parent, patch in zip(patches, patches[1:]):
+            delta = _read_json(self.root / "deltas" / f"{patch}.json", None)
+            if delta is None or delta["parent"] != parent:
+                return None
+            mapping = {**at[parent], **delta["changed"]}
+            for cid in delta["removed"]:
+                mapping.pop(cid, None)
+            at[patch] = mapping
+        return {"patches": list(patches), "at": at}
+
+    def _index_from_deltas(self) -> dict:
+        base = _read_json(self.root / "base.json", None)
+        if base is None:
+            return {"patches": [], "at": {}}
+
+        deltas = {}
+        deltas_dir = self.root / "deltas"
+        if deltas_dir.exists():
+            for path in deltas_dir.glob("*.json"):
+                delta = _read_json(path, None)
+                deltas[delta["parent"]] = delta
+
+        at = {base["patch"]: dict(base["champions"])}
+        order = [base["patch"]]
+        while order[-1] in deltas:
+            delta = deltas[order[-1]]
+            mapping = {**at[order[-1]], **delta["changed"]}
+            for cid in delta["removed"]:
+                mapping.pop(cid, None)
+            at[delta["patch"]] = mapping
+            order.append(delta["patch"])
+
+        return {"patches": order, "at": at}
+
+    def rebuild_index(self) -> None:
+        index = self._index_from_deltas()
+        self.patch_order = index["patches"]
+        self.at = index["at"]
+        _write_json(self.root / "index.json", {"patches": self.patch_order})
+
+
+def import_snapshot_files(store: CanonicalStore, paths: list[Path]) -> list[dict]:
+    """Imports canonical {patch}.json files; patches are normalized to major.minor."""
+    summaries = []
+    for path in sorted(paths, key=lambda p: version_key(p.stem)):
+        payload = json.loads(path.read_text(encoding="utf-8"))
+        patch = patch_mm(payload.get("patch") or path.stem)
+        summaries.append(store.add_snapshot(patch, payload["champions"]))
+    return summaries
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("import", help="Import every data/canonical/*.json snapshot into the store")
+    sub.add_parser("rebuild-index", help="Rebuild index.json from base + deltas")
+    sub.add_parser("compact", help="Drop records no patch references from records.jsonl")
+    diff = sub.add_parser("diff", help="Show what changed between two patches")
+    diff.add_argument("from_patch")
+    diff.add_argument("to_patch")
+    # After the subcommand, where its own options go: `<module> <command> --profile`.
+    for parser in sub.choices.values():
+        profiler.add_argument(parser)
+    args = ap.parse_args()
+    profiler.start("store", args.profile)
+
+    store = CanonicalStore()
+    if args.cmd == "import":
+        for summary in import_snapshot_files(store, list(canonical_dir().glob("*.json"))):
+            print(summary)
+    elif args.cmd == "rebuild-index":
+        store.rebuild_index()
+        print("patches:", store.patches())
+    elif args.cmd == "compact":
+        print("records dropped:", store.compact())
+    else:
+        print(json.dumps(store.changes(args.from_patch, args.to_patch), indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
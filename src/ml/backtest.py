@@ -0,0 +1,241 @@
+"""
+Walk-forward backtest of the train.py model across patches or time.
+
+The team dataset is cut into chunks, either one per patch or one per `--days` of
+game_datetime. Window i trains on the chunks before chunk i and tests on chunk i:
+
+  python3 -m src.ml.backtest --csv aram_team_dataset.csv                      # by patch
+  python3 -m src.ml.backtest --csv aram_team_dataset.csv --by time --days 7 --max_train 4
+
+Every chunk is featurized once into a hashed feature space and cached under
+data/cache/backtest/. The space is fixed, so every window reuses the same chunk
+matrices. A Vocab is built from the training rows and would change with each window.
+The cache key covers the CSV contents, the feature space and the ARAM modifier table.
+A rerun with the same settings does not parse the CSV at all.
+
+Windows are fitted in parallel on a process pool. Workers read their chunks from the
+cache, not through the pool's pipe. Each window is a single-threaded saga fit, so on a
+box with at least as many cores as windows the whole backtest takes about as long as
+its largest window.
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import hashlib
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+import numpy as np
+from scipy.sparse import vstack
+
+from src.merging.store import version_key
+from src.utils import profiler
+from src.utils.cache import CACHE_DIR, read_pickle, sha256_file, sha256_json, write_pickle
+from src.utils.versioning import patch_mm
+
+from .features import HashSpace, ModTable, featurize_df, load_team_csv
+
+BACKTEST_CACHE_DIR = CACHE_DIR / "backtest"
+CACHE_VERSION = 1
+
+
+@dataclass(frozen=True)
+class Chunk:
+    label: str       # patch, or the first day of the time bin
+    path: str        # cached (X, y)
+    rows: int
+    matches: int
+
+
+@dataclass(frozen=True)
+class Window:
+    train: tuple[Chunk, ...]
+    test: Chunk
+
+
+def _mods_fingerprint(mods: ModTable | None) -> str | None:
+    if mods is None:
+        return None
+    h = hashlib.sha256(mods.values.tobytes())
+    h.update(repr((mods.patches, mods.fields, mods.champ_lookup.tolist())).encode("utf-8"))
+    return h.hexdigest()
+
+
+def _chunk_labels(df, by: str, days: int) -> np.ndarray:
+    if by == "patch":
+        return df["patch"].astype(str).map(patch_mm).to_numpy()
+
+    import pandas as pd
+
+    if "game_datetime" not in df.columns:
+        raise ValueError("--by time needs a game_datetime column; rebuild the CSV with src.datasets.build_team_dataset")
+    when = pd.to_datetime(df["game_datetime"], utc=True)
+    start = when.min().floor("D")
+    bins = ((when - start) // pd.Timedelta(days=days)).to_numpy()
+    return np.array([(start + pd.Timedelta(days=int(b) * days)).strftime("%Y-%m-%d") for b in bins], dtype=object)
+
+
+def featurize_chunks(
+    csv_path: str, space: HashSpace, mods: ModTable | None = None, *, by: str = "patch", days: int = 7
+) -> list[Chunk]:
+    """Featurized chunks of the CSV in walk-forward order, from the cache when possible."""
+    key = sha256_json({
+        "version": CACHE_VERSION,
+        "csv": sha256_file(Path(csv_path)),
+        "space": asdict(space),
+        "mods": _mods_fingerprint(mods),
+        "by": by,
+        "days": days if by == "time" else None,
+    })
+    cache_dir = BACKTEST_CACHE_DIR / key[:16]
+    manifest = cache_dir / "chunks.pkl"
+    if manifest.exists():
+        # Plain dicts: Chunk pickles as __main__.Chunk when this module runs as a script.
+        chunks = [Chunk(**entry) for entry in read_pickle(manifest)]
+        if all(Path(c.path).exists() for c in chunks):
+            return chunks
+
+    df = load_team_csv(csv_path)
+    labels = _chunk_labels(df, by, days)
+    order = sorted(set(labels), key=version_key if by == "patch" else None)
+
+    chunks = []
+    for label in order:
+        part = df[labels == label].reset_index(drop=True)
+        X, y = featurize_df(part, space, mods)
+        path = cache_dir / f"chunk-{label}.pkl"
+        write_pickle(path, (X, y))
+        chunks.append(Chunk(label=label, path=str(path), rows=len(part), matches=int(part["match_id"].nunique())))
+    write_pickle(manifest, [asdict(c) for c in chunks])
+    return chunks
+
+
+def walk_forward(chunks: list[Chunk], *, min_train: int = 1, max_train: int = 0) -> list[Window]:
+    """
+    One window per chunk after the first `min_train`. Training uses every earlier chunk
+    (expanding), or only the last `max_train` of them.
+    """
+    windows = []
+    for i in range(max(min_train, 1), len(chunks)):
+        first = max(0, i - max_train) if max_train else 0
+        windows.append(Window(train=tuple(chunks[first:i]), test=chunks[i]))
+    return windows
+
+
+def _load(chunks) -> tuple:
+    parts = [read_pickle(Path(c.path)) for c in chunks]
+    return vstack([X for X, _ in parts], format="csr"), np.concatenate([y for _, y in parts])
+
+
+def evaluate_window(window: Window) -> dict:
+    """Fits train.make_model() on the window's training chunks and scores the test chunk."""
+    from sklearn.metrics import accuracy_score, roc_auc_score
+
+    from .train import make_model
+
+    X_train, y_train = _load(window.train)
+    X_test, y_test = _load([window.test])
+
+    t0 = time.perf_counter()
+    model = make_model()
+    model.fit(X_train, y_train)
+    fit_s = time.perf_counter() - t0
+
+    proba = model.predict_proba(X_test)[:, 1]
+    pred = (proba >= 0.5).astype(int)
+    # AUC is undefined when the test chunk has a single class.
+    auc = roc_auc_score(y_test, proba) if len(np.unique(y_test)) == 2 else float("nan")
+    return {
+        "train": f"{window.train[0].label}..{window.train[-1].label}",
+        "test": window.test.label,
+        "rows_train": int(len(y_train)),
+        "rows_test": int(len(y_test)),
+        "matches_test": window.test.matches,
+        "accuracy": round(float(accuracy_score(y_test, pred)), 4),
+        "roc_auc": round(float(auc), 4),
+        "fit_s": round(fit_s, 2),
+    }
+
+
+def backtest(windows: list[Window], workers: int | None = None) -> list[dict]:
+    workers = min(workers or os.cpu_count() or 1, len(windows))
+    if workers <= 1:
+        return [evaluate_window(w) for w in windows]
+    # Largest windows first, so the longest fits do not start last.
+    order = sorted(range(len(windows)), key=lambda i: -sum(c.rows for c in windows[i].train))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = dict(zip(order, pool.map(evaluate_window, [windows[i] for i in order])))
+    return [results[i] for i in range(len(windows))]
+
+
+COLUMNS = ("train", "test", "rows_train", "rows_test", "matches_test", "accuracy", "roc_auc", "fit_s")
+
+
+def print_table(results: list[dict]) -> None:
+    widths = {c: max(len(c), *(len(str(r[c])) for r in results)) for c in COLUMNS}
+    print("  ".join(f"{c:>{widths[c]}}" for c in COLUMNS))
+    for r in results:
+        print("  ".join(f"{r[c]!s:>{widths[c]}}" for c in COLUMNS))
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Walk-forward backtest by patch or game time")
+    ap.add_argument("--csv", required=True, help="Path to aram team dataset csv")
+    ap.add_argument("--by", choices=("patch", "time"), default="patch", help="Chunk by patch or by game_datetime")
+    ap.add_argument("--days", type=int, default=7, help="--by time: days per chunk")
+    ap.add_argument("--min_train", type=int, default=1, help="Chunks before the first test chunk")
+    ap.add_argument("--max_train", type=int, default=0, help="Train on at most this many earlier chunks (0 = all)")
+    ap.add_argument("--workers", type=int, default=0, help="Processes (0 = one per CPU)")
+    ap.add_argument("--out", default=None, help="Also write the table to this CSV")
+    ap.add_argument("--hash_bits", type=int, default=20, help="Hashed feature space of 2**hash_bits columns")
+    ap.add_argument("--hash_unsigned", action="store_true", help="Disable signed hashing")
+    ap.add_argument("--no_triples", action="store_true", help="Skip ally triples")
+    ap.add_argument("--no_champ_tags", action="store_true", help="Skip champion x tag features")
+    ap.add_argument("--aram_mods", action="store_true",
+                    help="Add per-team ARAM balance modifier features from the canonical store")
+    profiler.add_argument(ap)
+    args = ap.parse_args()
+    profiler.start("backtest", args.profile)
+
+    space = HashSpace(
+        n_features=1 << args.hash_bits,
+        signed=not args.hash_unsigned,
+        triples=not args.no_triples,
+        champ_tags=not args.no_champ_tags,
+    )
+    mods = None
+    if args.aram_mods:
+        from src.merging.store import CanonicalStore
+
+        mods = ModTable.from_store(CanonicalStore())
+
+    with profiler.stage("featurize"):
+        chunks = featurize_chunks(args.csv, space, mods, by=args.by, days=args.days)
+    windows = walk_forward(chunks, min_train=args.min_train, max_train=args.max_train)
+    if not windows:
+        raise SystemExit(f"Need more than {max(args.min_train, 1)} chunks, got {len(chunks)}: {[c.label for c in chunks]}")
+
+    t0 = time.perf_counter()
+    with profiler.stage("windows"):
+        results = backtest(windows, args.workers or None)
+    wall = time.perf_counter() - t0
+
+    print_table(results)
+    print(f"windows: {len(results)}  wall: {wall:.1f}s  sum of fits: {sum(r['fit_s'] for r in results):.1f}s")
+
+    if args.out:
+        out_path = Path(args.out)
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(out_path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=COLUMNS)
+            writer.writeheader()
+            writer.writerows(results)
+        print("saved:", out_path)
+
+
+if __name__ == "__main__":
+    main()
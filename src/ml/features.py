@@ -1,15 +1,22 @@
 from __future__ import annotations
 
 import ast
+import zlib
 from dataclasses import dataclass
 from itertools import combinations
-from typing import Dict, List, Tuple
+from typing import TYPE_CHECKING, Dict, List, Tuple
 from collections import Counter
 
 import numpy as np
-import pandas as pd
 from scipy.sparse import csr_matrix, hstack
 
+from src.merging.store import version_key
+from src.utils.versioning import patch_mm
+
+if TYPE_CHECKING:
+    # Only the CSV loader needs pandas at runtime; predict never imports it.
+    import pandas as pd
+
 
 @dataclass(frozen=True)
 class Vocab:
@@ -18,6 +25,200 @@ class Vocab:
     pair2idx: Dict[Tuple[int, int], int]
 
 
+@dataclass(frozen=True)
+class HashSpace:
+    """
+    Hashed alternative to Vocab: every feature is hashed straight to one of
+    `n_features` columns, so nothing is counted or stored up front and the width (and
+    model size) stays fixed however many interactions are enabled.
+
+    Features: champion, tag count, and optionally ally pair, ally triple and
+    champion x team-tag (value = that tag's count on the team). With `signed`, each
+    feature's value is multiplied by a hash-derived +-1 so collisions cancel out in
+    expectation instead of piling up. Hashes are a splitmix64 mix of integer keys, so
+    they are stable across processes and Python versions.
+    """
+    n_features: int = 1 << 20
+    signed: bool = True
+    pairs: bool = True
+    triples: bool = True
+    champ_tags: bool = True
+    seed: int = 0
+
+
+# ARAM balance modifiers as stored in canonical snapshots ("aram_mods") and
+# champion_aram_mods. All are multipliers (neutral 1.0) except ability_haste, which is
+# additive (neutral 0) and scaled per 100 haste to sit on the same scale.
+MOD_FIELDS = (
+    "dmg_dealt", "dmg_taken", "healing", "shielding", "tenacity", "attack_speed", "energy_regen", "ability_haste",
+)
+_MOD_NEUTRAL = {"ability_haste": 0.0}
+_MOD_SCALE = {"ability_haste": 0.01}
+
+
+@dataclass(frozen=True, eq=False)
+class ModTable:
+    """
+    Dense champion x patch ARAM modifier lookup, built once from the canonical store.
+
+    values[patch_idx, champ_idx, field] is the modifier's deviation from neutral
+    (dmg_dealt 1.05 -> 0.05), so unmodified champions contribute 0. The last champion
+    row is all zeros and stands in for champions the store does not know. team_features()
+    gathers a whole batch in one fancy-indexing step and reduces it to per-team sum,
+    min and max of each field.
+    """
+    patches: Tuple[str, ...]
+    champ_lookup: np.ndarray   # champion id -> champion row (unknown -> last row)
+    values: np.ndarray         # (n_patches, n_champs + 1, n_fields) float32
+    fields: Tuple[str, ...] = MOD_FIELDS
+
+    @classmethod
+    def from_store(cls, store, fields: Tuple[str, ...] = MOD_FIELDS) -> "ModTable":
+        """`store` is a src.merging.store.CanonicalStore. Patches are keyed major.minor."""
+        snapshots = {}
+        for patch in store.patches():
+            # Later builds of the same major.minor replace earlier ones.
+            snapshots[patch_mm(patch)] = store.snapshot(patch)
+        if not snapshots:
+            raise ValueError("Canonical store has no patches; run python3 -m src.merging.store import")
+
+        patches = tuple(snapshots)
+        champ_ids = sorted({int(cid) for snapshot in snapshots.values() for cid in snapshot})
+        champ_lookup = np.full(max(champ_ids) + 2, len(champ_ids), dtype=np.int64)
+        champ_lookup[champ_ids] = np.arange(len(champ_ids))
+
+        values = np.zeros((len(patches), len(champ_ids) + 1, len(fields)), dtype=np.float32)
+        for p, patch in enumerate(patches):
+            for cid, entry in snapshots[patch].items():
+                mods = (entry or {}).get("aram_mods") or {}
+                for f, field in enumerate(fields):
+                    value = mods.get(field)
+                    if value is not None:
+                        neutral = _MOD_NEUTRAL.get(field, 1.0)
+                        values[p, champ_lookup[int(cid)], f] = (float(value) - neutral) * _MOD_SCALE.get(field, 1.0)
+        return cls(patches=patches, champ_lookup=champ_lookup, values=values, fields=tuple(fields))
+
+    @property
+    def latest_patch(self) -> str:
+        return self.patches[-1]
+
+    @property
+    def n_features(self) -> int:
+        return 3 * len(self.fields)
+
+    def feature_names(self) -> List[str]:
+        return [f"mod_{stat}_{field}" for stat in ("sum", "min", "max") for field in self.fields]
+
+    def _patch_index(self, patch: str) -> int:
+        """Exact patch, else the newest earlier one (balance carries over), else the oldest."""
+        patch = patch_mm(str(patch))
+        if patch in self.patches:
+            return self.patches.index(patch)
+        earlier = [i for i, p in enumerate(self.patches) if version_key(p) <= version_key(patch)]
+        return earlier[-1] if earlier else 0
+
+    def team_features(self, champs: np.ndarray, patches) -> np.ndarray:
+        """(n, 5) champion ids + n patch strings -> (n, 3 * n_fields) float32."""
+        unique, inverse = np.unique(np.asarray(patches, dtype=object).astype(str), return_inverse=True)
+        patch_idx = np.array([self._patch_index(p) for p in unique], dtype=np.int64)[inverse]
+
+        # The lookup's last slot (and id 0) map to the all-zero unknown row.
+        rows = self.champ_lookup[np.clip(champs, 0, len(self.champ_lookup) - 1)]
+        gathered = self.values[patch_idx[:, None], rows]  # (n, 5, n_fields)
+        return np.concatenate([gathered.sum(axis=1), gathered.min(axis=1), gathered.max(axis=1)], axis=1)
+
+
+def _mod_matrix(champs: List[List[int]], patches, mods: ModTable) -> csr_matrix:
+    return csr_matrix(mods.team_features(_champ_matrix(champs), patches))
+
+
+# Feature families, mixed into every key so e.g. champion 5 and tag code 5 differ.
+_KIND_CHAMP, _KIND_TAG, _KIND_PAIR, _KIND_TRIPLE, _KIND_CHAMP_TAG = range(1, 6)
+
+_PAIR_SLOTS = np.array(list(combinations(range(5), 2)))
+_TRIPLE_SLOTS = np.array(list(combinations(range(5), 3)))
+
+
+def _splitmix64(x: np.ndarray) -> np.ndarray:
+    x = x + np.uint64(0x9E3779B97F4A7C15)
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+def _hash_keys(space: HashSpace, kind: int, *parts: np.ndarray) -> np.ndarray:
+    h = _splitmix64(np.full(parts[0].shape, space.seed * 8 + kind, dtype=np.uint64))
+    for part in parts:
+        h = _splitmix64(h ^ part.astype(np.int64).astype(np.uint64))
+    return h
+
+
+def _tag_code(tag: str) -> int:
+    return zlib.crc32(str(tag).encode("utf-8"))
+
+
+def _champ_matrix(champs: List[List[int]]) -> np.ndarray:
+    """(n, 5) champion ids, sorted per row so pairs/triples have one canonical order."""
+    if not champs:
+        return np.empty((0, 5), dtype=np.int64)
+    try:
+        return np.array([sorted(int(c) for c in row) for row in champs], dtype=np.int64).reshape(len(champs), 5)
+    except ValueError:
+        raise ValueError("Hashed features need exactly 5 champs per team") from None
+
+
+def _featurize_hashed(champs: List[List[int]], tag_counts: List[Dict[str, int]], space: HashSpace) -> csr_matrix:
+    n = len(champs)
+    arr = _champ_matrix(champs)
+    width = arr.shape[1]
+    rows_all, hashes_all, values_all = [], [], []
+
+    def add(rows: np.ndarray, hashes: np.ndarray, values: np.ndarray | None = None):
+        rows_all.append(rows.ravel())
+        hashes_all.append(hashes.ravel())
+        values_all.append(np.ones(hashes.size, dtype=np.float32) if values is None else values.ravel().astype(np.float32))
+
+    row_ids = np.arange(n)
+    add(np.repeat(row_ids, width), _hash_keys(space, _KIND_CHAMP, arr))
+    if space.pairs:
+        add(np.repeat(row_ids, len(_PAIR_SLOTS)),
+            _hash_keys(space, _KIND_PAIR, arr[:, _PAIR_SLOTS[:, 0]], arr[:, _PAIR_SLOTS[:, 1]]))
+    if space.triples:
+        add(np.repeat(row_ids, len(_TRIPLE_SLOTS)),
+            _hash_keys(space, _KIND_TRIPLE, *(arr[:, _TRIPLE_SLOTS[:, i]] for i in range(3))))
+
+    tag_rows, tag_codes, tag_values = [], [], []
+    for i, counts in enumerate(tag_counts):
+        for tag, count in counts.items():
+            if count:
+                tag_rows.append(i)
+                tag_codes.append(_tag_code(tag))
+                tag_values.append(float(count))
+    tag_rows = np.array(tag_rows, dtype=np.int64)
+    tag_codes = np.array(tag_codes, dtype=np.int64)
+    tag_values = np.array(tag_values, dtype=np.float32)
+
+    if len(tag_rows):
+        add(tag_rows, _hash_keys(space, _KIND_TAG, tag_codes), tag_values)
+        if space.champ_tags:
+            # Every (champion on the team, tag present on the team) combination.
+            champ_of = arr[tag_rows]
+            add(np.repeat(tag_rows, width),
+                _hash_keys(space, _KIND_CHAMP_TAG, champ_of, np.repeat(tag_codes[:, None], width, axis=1)),
+                np.repeat(tag_values, width))
+
+    rows = np.concatenate(rows_all)
+    hashes = np.concatenate(hashes_all)
+    values = np.concatenate(values_all)
+
+    cols = (hashes % np.uint64(space.n_features)).astype(np.int64)
+    if space.signed:
+        values = np.where((hashes >> np.uint64(63)) == 1, -values, values)
+
+    # Duplicate (row, col) entries -- hash collisions -- are summed.
+    return csr_matrix((values, (rows, cols)), shape=(n, space.n_features), dtype=np.float32)
+
+
 def _parse_champs(x) -> List[int]:
 
     if isinstance(x, list):
@@ -43,8 +244,10 @@ def _parse_tag_counts(x) -> Dict[str, int]:
 
 
 def load_team_csv(path: str) -> pd.DataFrame:
+    import pandas as pd
 
-    df = pd.read_csv(path)
+    # Patches are strings: read as floats, '16.10' would become 16.1.
+    df = pd.read_csv(path, dtype={"patch": str})
 
     required = {"match_id", "win", "champs", "tag_counts"}
     missing = required - set(df.columns)
@@ -62,7 +265,11 @@ def load_team_csv(path: str) -> pd.DataFrame:
     return df
 
 
-def build_vocab(df: pd.DataFrame, min_pair_freq: int = 20) -> Vocab:
+def build_vocab(df: pd.DataFrame, min_pair_freq: int = 20, pair_counts: Counter | None = None) -> Vocab:
+    """
+    `pair_counts` ({(a, b): games}, e.g. from src.datasets.aggregates.pair_counts) skips
+    counting pairs over `df`.
+    """
 
     all_champs = sorted({c for row in df["champs"] for c in row})
     champ2idx = {c: i for i, c in enumerate(all_champs)}
@@ -70,12 +277,15 @@ def build_vocab(df: pd.DataFrame, min_pair_freq: int = 20) -> Vocab:
     all_tags = sorted({t for row in df["tag_counts"] for t in row.keys()})
     tag2idx = {t: i for i, t in enumerate(all_tags)}
 
-    pair_counter = Counter()
+    if pair_counts is not None:
+        pair_counter = pair_counts
+    else:
+        pair_counter = Counter()
 
-    for champs in df["champs"]:
-        champs_sorted = sorted(champs)
-        for a, b in combinations(champs_sorted, 2):
-            pair_counter[(a, b)] += 1
+        for champs in df["champs"]:
+            champs_sorted = sorted(champs)
+            for a, b in combinations(champs_sorted, 2):
+                pair_counter[(a, b)] += 1
 
     frequent_pairs = [
         pair for pair, count in pair_counter.items()
@@ -94,7 +304,25 @@ def build_vocab(df: pd.DataFrame, min_pair_freq: int = 20) -> Vocab:
     )
 
 
-def featurize_df(df: pd.DataFrame, vocab: Vocab):
+def featurize_df(df: pd.DataFrame, vocab: Vocab | HashSpace, mods: ModTable | None = None):
+    """
+    With `mods`, ModTable.team_features() columns for each row's patch (df["patch"])
+    are appended after the champion/tag/pair features.
+    """
+    X, y = _featurize_df(df, vocab)
+    if mods is None:
+        return X, y
+    if "patch" not in df.columns:
+        raise ValueError("ARAM modifier features need a 'patch' column")
+    X_mod = _mod_matrix(list(df["champs"]), df["patch"].to_numpy(), mods)
+    return hstack([X, X_mod], format="csr", dtype=np.float32), y
+
+
+def _featurize_df(df: pd.DataFrame, vocab: Vocab | HashSpace):
+
+    if isinstance(vocab, HashSpace):
+        X = _featurize_hashed(list(df["champs"]), list(df["tag_counts"]), vocab)
+        return X, df["win"].to_numpy(dtype=np.int64)
 
     n = len(df)
     n_ch = len(vocab.champ2idx)
@@ -153,7 +381,25 @@ def featurize_df(df: pd.DataFrame, vocab: Vocab):
     return X, y
 
 
-def featurize_team(champs: List[int], tag_counts: Dict[str, int], vocab: Vocab) -> csr_matrix:
+def featurize_team(
+    champs: List[int],
+    tag_counts: Dict[str, int],
+    vocab: Vocab | HashSpace,
+    mods: ModTable | None = None,
+    patch: str | None = None,
+) -> csr_matrix:
+    """Single-team featurize_df(); `patch` defaults to the newest patch in `mods`."""
+    X = _featurize_team(champs, tag_counts, vocab)
+    if mods is None:
+        return X
+    X_mod = _mod_matrix([list(champs)], [patch or mods.latest_patch], mods)
+    return hstack([X, X_mod], format="csr", dtype=np.float32)
+
+
+def _featurize_team(champs: List[int], tag_counts: Dict[str, int], vocab: Vocab | HashSpace) -> csr_matrix:
+
+    if isinstance(vocab, HashSpace):
+        return _featurize_hashed([list(champs)], [dict(tag_counts)], vocab)
 
     champs_sorted = sorted(int(c) for c in champs)
 
@@ -0,0 +1,34 @@
+"""
+Inference-only copy of a fitted binary LogisticRegression.
+
+Unpickling the scikit-learn estimator imports sklearn (~2 s), which dwarfs the actual
+prediction. The artifact's "model" is this class instead, and it only needs numpy; the
+full estimator is kept alongside as pickled bytes:
+
+  artifact["model"].predict_proba(X)              # same result as the estimator's
+  pickle.loads(artifact["estimator"])              # the LogisticRegression itself
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+import numpy as np
+
+
+@dataclass(frozen=True, eq=False)
+class LinearModel:
+    coef: np.ndarray         # (n_features,) weights of the positive class
+    intercept: float
+
+    @classmethod
+    def from_estimator(cls, model) -> LinearModel:
+        if len(model.classes_) != 2:
+            raise ValueError(f"Expected a binary classifier, got classes {list(model.classes_)}")
+        return cls(coef=np.asarray(model.coef_[0], dtype=np.float64), intercept=float(model.intercept_[0]))
+
+    def decision_function(self, X) -> np.ndarray:
+        return np.asarray(X @ self.coef, dtype=np.float64).ravel() + self.intercept
+
+    def predict_proba(self, X) -> np.ndarray:
+        p = 1.0 / (1.0 + np.exp(-self.decision_function(X)))
+        return np.column_stack([1.0 - p, p])
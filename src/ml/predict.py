@@ -6,6 +6,8 @@ from typing import Dict, List
 
 import joblib
 
+from src.utils import profiler
+
 from .features import featurize_team
 
 
@@ -31,11 +33,19 @@ def main():
     ap.add_argument("--model", default="models/aram_lr.joblib", help="Path to saved joblib artifact")
     ap.add_argument("--champs", required=True, help='5 champs, e.g. "[57,63,233,245,555]" or "57,63,233,245,555"')
     ap.add_argument("--tag_counts", required=True, help='dict string, e.g. "{\'Mage\':2, \'Tank\':1}"')
+    ap.add_argument("--patch", default=None,
+                    help="Patch for ARAM modifier features, e.g. 16.4 (default: newest the model knows)")
+    profiler.add_argument(ap)
     args = ap.parse_args()
+    profiler.start("predict", args.profile)
 
     artifact = joblib.load(args.model)
     model = artifact["model"]
     vocab = artifact["vocab"]
+    # Artifacts saved before modifier features existed have no "mods".
+    mods = artifact.get("mods")
+    if args.patch and mods is None:
+        print("note: this model has no ARAM modifier features; --patch is ignored")
 
     champs = parse_int_list(args.champs)
     if len(champs) != 5:
@@ -43,7 +53,7 @@ def main():
 
     tag_counts = parse_tag_counts(args.tag_counts)
 
-    X = featurize_team(champs, tag_counts, vocab)
+    X = featurize_team(champs, tag_counts, vocab, mods, args.patch)
     win_prob = float(model.predict_proba(X)[0, 1])
 
     print("win_prob:", round(win_prob, 4))
@@ -1,6 +1,8 @@
 from __future__ import annotations
 
 import argparse
+import pickle
+from collections import Counter
 from pathlib import Path
 
 import joblib
@@ -9,7 +11,41 @@ from sklearn.linear_model import LogisticRegression
 from sklearn.metrics import accuracy_score, roc_auc_score
 from sklearn.model_selection import GridSearchCV
 
-from .features import load_team_csv, build_vocab, featurize_df
+from src.merging.store import CanonicalStore
+from src.utils import profiler
+from src.utils.versioning import patch_mm
+
+from .features import HashSpace, ModTable, load_team_csv, build_vocab, featurize_df
+from .linear import LinearModel
+
+
+def make_model() -> LogisticRegression:
+    """The estimator train and backtest fit."""
+    return LogisticRegression(
+        C=0.15,
+        l1_ratio=0.5,
+        max_iter=5000,
+        solver="saga",
+    )
+
+
+def _db_pair_counts(train_df) -> Counter:
+    """
+    Pair frequencies of the training rows' patches from the ingest-maintained aggregate.
+
+    The split is by match, not by patch, so these counts also include the held-out
+    matches on those patches (and matches not in the CSV). Only which pairs clear
+    build_vocab's min_pair_freq depends on them, never a label, but the test score is
+    not strictly out-of-sample for vocab selection.
+    """
+    from src.datasets.aggregates import pair_counts
+    from src.db.connection import connection
+
+    if "patch" not in train_df.columns:
+        raise ValueError("--db_pair_counts needs a 'patch' column")
+    patches = sorted({patch_mm(str(p)) for p in train_df["patch"]})
+    with connection() as conn:
+        return pair_counts(conn, patches)
 
 
 def main():
@@ -18,9 +54,22 @@ def main():
     ap.add_argument("--out", default="models/aram_lr.joblib", help="Output model artifact path")
     ap.add_argument("--test_size", type=float, default=0.2, help="Fraction of matches held out")
     ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--hash_bits", type=int, default=0,
+                    help="Use a hashed feature space of 2**hash_bits columns instead of a vocab (0 = vocab)")
+    ap.add_argument("--hash_unsigned", action="store_true", help="Disable signed hashing")
+    ap.add_argument("--no_triples", action="store_true", help="Hashed mode: skip ally triples")
+    ap.add_argument("--no_champ_tags", action="store_true", help="Hashed mode: skip champion x tag features")
+    ap.add_argument("--db_pair_counts", action="store_true",
+                    help="Vocab mode: read ally pair frequencies from champion_pair_patch_stats "
+                         "for the training patches instead of counting them over the CSV")
+    ap.add_argument("--aram_mods", action="store_true",
+                    help="Add per-team ARAM balance modifier features from the canonical store")
+    profiler.add_argument(ap)
     args = ap.parse_args()
+    profiler.start("train", args.profile)
 
-    df = load_team_csv(args.csv)
+    with profiler.stage("load"):
+        df = load_team_csv(args.csv)
 
     match_ids = df["match_id"].unique()
     rng = np.random.default_rng(args.seed)
@@ -33,19 +82,26 @@ def main():
     train_df = df[df["match_id"].isin(train_matches)].reset_index(drop=True)
     test_df = df[df["match_id"].isin(test_matches)].reset_index(drop=True)
 
-    vocab = build_vocab(train_df)
-
-    X_train, y_train = featurize_df(train_df, vocab)
-    X_test, y_test = featurize_df(test_df, vocab)
+    with profiler.stage("featurize"):
+        if args.hash_bits:
+            vocab = HashSpace(
+                n_features=1 << args.hash_bits,
+                signed=not args.hash_unsigned,
+                triples=not args.no_triples,
+                champ_tags=not args.no_champ_tags,
+            )
+        else:
+            vocab = build_vocab(train_df, pair_counts=_db_pair_counts(train_df) if args.db_pair_counts else None)
+
+        mods = ModTable.from_store(CanonicalStore()) if args.aram_mods else None
+
+        X_train, y_train = featurize_df(train_df, vocab, mods)
+        X_test, y_test = featurize_df(test_df, vocab, mods)
     
-    model = LogisticRegression(
-        C=0.15,
-        l1_ratio=0.5,
-        max_iter=5000,
-        solver="saga",
-    )
+    model = make_model()
 
-    model.fit(X_train, y_train)
+    with profiler.stage("fit"):
+        model.fit(X_train, y_train)
 
     proba = model.predict_proba(X_test)[:, 1]
     pred = (proba >= 0.5).astype(int)
@@ -63,8 +119,11 @@ def main():
     out_path.parent.mkdir(parents=True, exist_ok=True)
 
     artifact = {
-        "model": model,
+        # predict loads this without importing sklearn (src/ml/linear.py).
+        "model": LinearModel.from_estimator(model),
+        "estimator": pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL),
         "vocab": vocab,
+        "mods": mods,
         "meta": {
             "csv": str(args.csv),
             "matches_total": int(len(match_ids)),
@@ -75,10 +134,14 @@ def main():
             "features": int(X_train.shape[1]),
             "test_size": float(args.test_size),
             "seed": int(args.seed),
+            "hash_bits": int(args.hash_bits),
+            "db_pair_counts": bool(args.db_pair_counts and not args.hash_bits),
+            "aram_mod_patches": list(mods.patches) if mods is not None else [],
         },
     }
 
-    joblib.dump(artifact, out_path)
+    with profiler.stage("save"):
+        joblib.dump(artifact, out_path)
     print("saved:", out_path)
 
 
@@ -5,6 +5,14 @@ from src.config.paths import DATA_DIR
 
 
 TEMPLATE_RE = re.compile(r"\{\{([^{}]|\{[^{}]*\})*\}\}")
+BRACE_TOKEN_RE = re.compile(r"\{\{|\}\}|[{}]")
+RANGE_RE = re.compile(r"^\s*(\d+(?:\.\d+)?)\s+to\s+(\d+(?:\.\d+)?)(?:\s+(\d+))?\s*$")
+BOLD_ITALIC_RE = re.compile(r"'''''(.*?)'''''")
+BOLD_RE = re.compile(r"'''(.*?)'''")
+ITALIC_RE = re.compile(r"''(.*?)''")
+SPACES_RE = re.compile(r"[ \t]+")
+BLANK_LINES_RE = re.compile(r"\n{3,}")
+HEADER_RE = re.compile(r"^\|(.+?)\s+([A-Z])\s*=")
 
 def extract_champions(text: str) -> str:
     start_marker = "<!--Champions-->"
@@ -23,10 +31,10 @@ def expand_range(value: str) -> str:
       "2 to 4 3"   -> "2 / 3 / 4"              (explicit 3 ranks)
       Supports floats too.
     """
-    m = re.match(
-        r"^\s*(\d+(?:\.\d+)?)\s+to\s+(\d+(?:\.\d+)?)(?:\s+(\d+))?\s*$",
-        value,
-    )
+    if "to" not in value:
+        return value
+
+    m = RANGE_RE.match(value)
     if not m:
         return value
 
@@ -63,17 +71,59 @@ def template_to_values(template_text: str) -> str:
 
     return " ".join(vals)
 
-def flatten_templates(text: str) -> str:
+def _flatten_templates_fixed_point(text: str) -> str:
     while True:
         new = TEMPLATE_RE.sub(lambda m: template_to_values(m.group(0)), text)
         if new == text:
             return text
         text = new
 
+def flatten_templates(text: str) -> str:
+    """
+    Expands every {{...}} template (innermost first) with template_to_values in one
+    left-to-right pass, using an explicit stack for nesting instead of rescanning the
+    whole text once per nesting level.
+
+    Output is identical to applying TEMPLATE_RE.sub until a fixed point. Brace runs that
+    are ambiguous under that regex (single braces inside a template, "{{{", unclosed
+    templates) are rare in practice and fall back to the fixed-point loop.
+    """
+    stack = []
+    parts = []
+    pos = 0
+
+    for m in BRACE_TOKEN_RE.finditer(text):
+        token = m.group()
+        i = m.start()
+
+        if token == "{{":
+            if text.startswith("{", i + 2):
+                return _flatten_templates_fixed_point(text)
+            parts.append(text[pos:i])
+            stack.append(parts)
+            parts = []
+            pos = i + 2
+        elif token == "}}":
+            if not stack:
+                continue
+            parts.append(text[pos:i])
+            parent = stack.pop()
+            parent.append(template_to_values("{{" + "".join(parts) + "}}"))
+            parts = parent
+            pos = i + 2
+        elif stack:
+            return _flatten_templates_fixed_point(text)
+
+    if stack:
+        return _flatten_templates_fixed_point(text)
+
+    parts.append(text[pos:])
+    return "".join(parts)
+
 def strip_bold_italics(text: str) -> str:
-    text = re.sub(r"'''''(.*?)'''''", r"\1", text)
-    text = re.sub(r"'''(.*?)'''", r"\1", text)
-    text = re.sub(r"''(.*?)''", r"\1", text)
+    text = BOLD_ITALIC_RE.sub(r"\1", text)
+    text = BOLD_RE.sub(r"\1", text)
+    text = ITALIC_RE.sub(r"\1", text)
     return text
 
 def build_champion_dict(text: str) -> dict:
@@ -84,12 +134,11 @@ def build_champion_dict(text: str) -> dict:
     current_ability = None
 
     lines = text.splitlines()
-    header_re = re.compile(r"^\|(.+?)\s+([A-Z])\s*=")
 
     for line in lines:
         line = line.strip()
 
-        header_match = header_re.match(line)
+        header_match = HEADER_RE.match(line)
         if header_match:
             current_champ = header_match.group(1).strip()
             current_ability = header_match.group(2).strip()
@@ -107,17 +156,21 @@ def build_champion_dict(text: str) -> dict:
 
     return champ_dict
 
-def parse_aram_modifiers():
-    path = DATA_DIR / "fandom_api" / "raw" / "aram_modifiers.wikitext"
-    raw = path.read_text(encoding="utf-8")
+ARAM_MODIFIERS_PATH = DATA_DIR / "fandom_api" / "raw" / "aram_modifiers.wikitext"
+
+def parse_aram_modifiers_text(raw: str) -> dict:
     champions_text = extract_champions(raw)
 
     champions_text = flatten_templates(champions_text)
     champions_text = strip_bold_italics(champions_text)
-    champions_text = re.sub(r"[ \t]+", " ", champions_text)
-    champions_text = re.sub(r"\n{3,}", "\n\n", champions_text).strip()
+    champions_text = SPACES_RE.sub(" ", champions_text)
+    champions_text = BLANK_LINES_RE.sub("\n\n", champions_text).strip()
 
     champ_dict = build_champion_dict(champions_text)
 
     return champ_dict
 
+def parse_aram_modifiers(path: Path | None = None):
+    path = path or ARAM_MODIFIERS_PATH
+    raw = path.read_text(encoding="utf-8")
+    return parse_aram_modifiers_text(raw)
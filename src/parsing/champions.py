@@ -1,33 +1,68 @@
 from lupa import LuaRuntime
 from pathlib import Path
 from src.config.paths import DATA_DIR
+from src.utils.cache import CACHE_DIR, read_pickle, sha256_file, write_pickle
+
+CHAMPIONS_LUA_PATH = DATA_DIR / "fandom_api" / "raw" / "champions.lua"
+CHAMPIONS_CACHE_DIR = CACHE_DIR / "champions_lua"
+
+# Bump when the extracted shape changes so stale cache entries are ignored.
+EXTRACT_VERSION = "1"
+
+# Runs inside the Lua VM: keeps only champions with an id and a non-empty stats.aram,
+# so Python never converts the rest of the module.
+EXTRACT_LUA = """
+function(data)
+    local out = {}
+    for name, champ in pairs(data) do
+        if type(champ) == "table" then
+            local id = champ.id
+            local stats = champ.stats
+            local aram = type(stats) == "table" and stats.aram or nil
+            if id and id ~= 0 and id ~= "" and type(aram) == "table" and next(aram) ~= nil then
+                out[#out + 1] = {name, id, aram}
+            end
+        end
+    end
+    return out
+end
+"""
 
 def lua_to_py(obj):
     if hasattr(obj, "items"):
         return {lua_to_py(k): lua_to_py(v) for k, v in obj.items()}
     return obj
 
-def parse_champions_lua() -> dict:
-    path = DATA_DIR / "fandom_api" / "raw" / "champions.lua"
-
+def extract_champions_lua(source: str) -> dict:
     lua = LuaRuntime(unpack_returned_tuples=True)
-    table = lua.execute(path.read_text(encoding="utf-8"))
-    py_data = lua_to_py(table)
+    table = lua.execute(source)
+    rows = lua.eval(EXTRACT_LUA)(table)
 
     champions = {}
-
-    for champ_name, champ_data in py_data.items():
-        champ_id = champ_data.get("id")
-        if not champ_id:
-            continue
-
-        aram = champ_data.get("stats", {}).get("aram")
-        if not aram:
-            continue
-
+    for row in rows.values():
+        champ_name, champ_id, aram = row[1], row[2], row[3]
         champions[champ_id] = {
             "name": champ_name,
-            "aram": aram
+            "aram": lua_to_py(aram),
         }
 
-    return champions
\ No newline at end of file
+    return champions
+
+def parse_champions_lua(path: Path | None = None, *, use_cache: bool = True) -> dict:
+    """
+    {champion_id: {"name": ..., "aram": {...}}} for every champion with ARAM stats.
+
+    Results are cached on disk keyed by the raw file's sha256, so unchanged files
+    never start the Lua VM.
+    """
+    path = path or CHAMPIONS_LUA_PATH
+    cache_path = CHAMPIONS_CACHE_DIR / f"{sha256_file(path)}-v{EXTRACT_VERSION}.pkl"
+
+    if use_cache and cache_path.exists():
+        return read_pickle(cache_path)
+
+    champions = extract_champions_lua(path.read_text(encoding="utf-8"))
+
+    if use_cache:
+        write_pickle(cache_path, champions)
+    return champions
@@ -0,0 +1,102 @@
+"""
+Match-V5 payload -> compact records holding only what ingestion stores.
+
+A raw match response is ~100-300 KB of nested dicts, mostly per-participant
+`challenges`, `perks` and `missions` blocks we never read. parse_match() copies the
+stored fields into slotted records straight after the fetch, so the payload can be
+dropped before any DB work and buffered matches cost a few KB each.
+
+  match = parse_match(match_id, fetch_match(match_id))
+  cur.executemany(INSERT_PARTICIPANT, match.participant_rows(key, account_ids))
+
+Records keep the Riot ids. The row helpers take the integer keys resolved for them
+(src/db/keys.py) and return tuples in the column order of the INSERT statements in
+scripts/ingest_matches.py.
+"""
+from __future__ import annotations
+
+import datetime
+import sys
+from collections.abc import Sequence
+from dataclasses import dataclass
+
+from src.utils.versioning import patch_mm
+
+ITEM_SLOTS = 7
+
+# Participant payload key -> participants column, in INSERT_PARTICIPANT order.
+STAT_FIELDS = (
+    ("totalDamageDealtToChampions", "total_damage_dealt"),
+    ("physicalDamageDealtToChampions", "physical_damage_dealt"),
+    ("magicDamageDealtToChampions", "magic_damage_dealt"),
+    ("trueDamageDealtToChampions", "true_damage_dealt"),
+    ("totalDamageTaken", "damage_taken"),
+    ("goldEarned", "gold_earned"),
+    ("totalHeal", "heals"),
+    ("totalDamageShieldedOnTeammates", "shields"),
+    ("kills", "kills"),
+    ("deaths", "deaths"),
+    ("assists", "assists"),
+)
+
+
+@dataclass(slots=True)
+class ParticipantRecord:
+    puuid: str
+    champion_id: int
+    team_id: int
+    win: bool
+    # STAT_FIELDS values in order; None where the payload omits one.
+    stats: tuple[int | None, ...]
+    # item0..item6; 0 is an empty slot.
+    items: tuple[int, ...]
+
+
+@dataclass(slots=True)
+class MatchRecord:
+    match_id: str
+    patch: str
+    queue_id: int
+    game_datetime: datetime.datetime
+    participants: tuple[ParticipantRecord, ...]
+
+    def participant_rows(self, match_key: int, account_ids: Sequence[int]) -> list[tuple]:
+        """`account_ids` are in participant order."""
+        return [
+            (match_key, self.patch, account_id, p.champion_id, p.team_id, p.win, *p.stats)
+            for p, account_id in zip(self.participants, account_ids)
+        ]
+
+    def item_rows(self, match_key: int, account_ids: Sequence[int]) -> list[tuple]:
+        return [
+            (match_key, self.patch, account_id, item_id, slot)
+            for p, account_id in zip(self.participants, account_ids)
+            for slot, item_id in enumerate(p.items)
+            if item_id
+        ]
+
+
+def parse_participant(p: dict) -> ParticipantRecord:
+    return ParticipantRecord(
+        puuid=p["puuid"],
+        champion_id=int(p["championId"]),
+        team_id=int(p["teamId"]),
+        win=bool(p["win"]),
+        stats=tuple(p.get(key) for key, _ in STAT_FIELDS),
+        items=tuple(p.get(f"item{slot}") or 0 for slot in range(ITEM_SLOTS)),
+    )
+
+
+def parse_match(match_id: str, payload: dict) -> MatchRecord:
+    """Extracts the stored fields of a Match-V5 response. Raises KeyError if one is missing."""
+    info = payload["info"]
+    return MatchRecord(
+        match_id=match_id,
+        # Interned: every match of a patch then shares one string.
+        patch=sys.intern(patch_mm(info.get("gameVersion", ""))),
+        queue_id=int(info["queueId"]),
+        game_datetime=datetime.datetime.fromtimestamp(
+            info["gameStartTimestamp"] / 1000.0, tz=datetime.timezone.utc
+        ),
+        participants=tuple(parse_participant(p) for p in info["participants"]),
+    )
@@ -1,49 +1,97 @@
-from pathlib import Path
+import argparse
 
-from src.config.paths import DATA_DIR
-from src.ingestion.ddragon import update_ddragon, fetch_latest_patch
-from src.ingestion.fandom import update_fandom
+from src.ingestion.ddragon import update_ddragon, fetch_latest_patch, RAW_DIR
+from src.ingestion.fandom import update_fandom, FANDOM_RAW_DIR
 from src.parsing.ddragon import parse_ddragon_basic_json
 from src.parsing.champions import parse_champions_lua
 from src.parsing.aram_modifiers import parse_aram_modifiers
 from src.merging.canonical import merge_champion_data
+from src.merging.store import CanonicalStore
 from src.loading.load_champions import load_champions_for_patch
+from src.pipeline.stages import Stage, run_stages
+from src.utils import profiler
 from src.utils.versioning import patch_mm
 
 
-def run_pipeline():
-    latest_patch = fetch_latest_patch()
-    patch_dir = DATA_DIR / "ddragon" / "raw" / latest_patch
+PIPELINE_STAGES = [
+    Stage(
+        name="ddragon_basic",
+        run=lambda ctx: parse_ddragon_basic_json(ctx["full_patch"]),
+        files=lambda ctx: [RAW_DIR / ctx["full_patch"] / "ddragon_champions.json"],
+        code=("src/parsing/ddragon.py",),
+        params=("full_patch",),
+    ),
+    Stage(
+        name="champions_lua",
+        run=lambda ctx: parse_champions_lua(),
+        files=lambda ctx: [FANDOM_RAW_DIR / "champions.lua"],
+        code=("src/parsing/champions.py",),
+    ),
+    Stage(
+        name="aram_modifiers",
+        run=lambda ctx: parse_aram_modifiers(),
+        files=lambda ctx: [FANDOM_RAW_DIR / "aram_modifiers.wikitext"],
+        code=("src/parsing/aram_modifiers.py",),
+    ),
+    Stage(
+        name="canonical",
+        run=lambda ctx, ddragon_basic, champions_lua, aram_changes: merge_champion_data(
+            ddragon_basic, champions_lua, aram_changes, ctx["patch"]
+        ),
+        deps=("ddragon_basic", "champions_lua", "aram_modifiers"),
+        code=("src/merging/canonical.py",),
+        params=("patch",),
+        # Cached only while the store still holds this exact snapshot for the patch.
+        is_valid=lambda summary: CanonicalStore().has_snapshot(summary["patch"], summary["snapshot"]),
+    ),
+    Stage(
+        name="load_db",
+        run=lambda ctx, canonical: load_champions_for_patch(canonical["patch"]),
+        deps=("canonical",),
+        # Diffs against the tables and writes only changes, so running it every time is
+        # cheap and also repairs a reset or different database.
+        cache=False,
+    ),
+]
 
-    is_new_patch = not patch_dir.exists()
 
-    if not is_new_patch:
-        print(f"Patch {latest_patch} already downloaded. Skipping ingestion.")
-        full_patch = latest_patch
-    else:
-        print(f"New patch detected: {latest_patch}")
+def run_pipeline(force: bool = False):
+    with profiler.stage("fetch"):
+        latest_patch = fetch_latest_patch()
+        patch_dir = RAW_DIR / latest_patch
+
+        if patch_dir.exists():
+            print(f"Patch {latest_patch} already downloaded.")
+            full_patch = latest_patch
+        else:
+            print(f"New patch detected: {latest_patch}")
+            full_patch = update_ddragon(keep_only_latest=True)
+
+        # Fandom pages change mid-patch, so their revisions are checked on every run; only
+        # changed pages are downloaded, and unchanged files leave the stages below cached.
         update_fandom()
-        full_patch = update_ddragon(keep_only_latest=True)
 
     patch = patch_mm(full_patch)
+    ctx = {"full_patch": full_patch, "patch": patch}
 
-    print("Parsing data...")
-    ddragon_basic = parse_ddragon_basic_json(full_patch)
-    champions_lua = parse_champions_lua()
-    aram_changes = parse_aram_modifiers()
-
-    print("Merging...")
-    merge_champion_data(
-        ddragon_basic,
-        champions_lua,
-        aram_changes,
-        patch,
-    )
-
-    if is_new_patch:
-        stats = load_champions_for_patch(patch)
-        print("Champion DB load:", stats)
-    else:
-        print("Patch already loaded in DB")
+    outputs, status = run_stages(PIPELINE_STAGES, ctx, force=force)
+    print("Stages:", ", ".join(f"{name}={state}" for name, state in status.items()))
+
+    print("Champion DB load:", outputs["load_db"])
 
     return patch
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Build the champion canonical data for the latest patch and load it")
+    ap.add_argument("--force", action="store_true", help="Re-run every stage, ignoring cached outputs")
+    profiler.add_argument(ap)
+    args = ap.parse_args()
+    profiler.start("champion_pipeline", args.profile)
+
+    patch = run_pipeline(force=args.force)
+    print(f"Built champion dataset for patch {patch}")
+
+
+if __name__ == "__main__":
+    main()
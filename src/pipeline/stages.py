@@ -0,0 +1,104 @@
+"""
+Tiny content-addressed stage runner for the champion pipeline.
+
+Each stage's cache key is a hash of:
+  - its name,
+  - the contents of its input files,
+  - the source of the modules that implement it,
+  - selected context values (e.g. patch),
+  - the keys of its upstream stages.
+If a pickled output for that key exists (and is still valid) the stage is skipped,
+so a changed input re-runs exactly the stages downstream of it.
+
+Stages with cache=False always run and are never pickled. That is for stages whose
+output lives outside the repo (the database load): the key cannot tell whether the
+database it was written to is the one being used now, or still holds the rows.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable
+
+from src.config.paths import PROJECT_ROOT
+from src.utils import profiler
+from src.utils.cache import CACHE_DIR, read_pickle, sha256_file, sha256_json, write_pickle
+
+STAGE_CACHE_DIR = CACHE_DIR / "pipeline"
+KEEP_PER_STAGE = 5
+
+
+@dataclass(frozen=True)
+class Stage:
+    name: str
+    run: Callable[..., object]                      # run(ctx, *upstream_outputs)
+    deps: tuple[str, ...] = ()
+    files: Callable[[dict], list[Path]] = lambda ctx: []
+    code: tuple[str, ...] = ()                      # repo-relative source files
+    params: tuple[str, ...] = ()                    # ctx keys that affect the output
+    is_valid: Callable[[object], bool] = field(default=lambda output: True)
+    cache: bool = True
+
+
+def stage_key(stage: Stage, ctx: dict, upstream_keys: list[str]) -> str:
+    files = {}
+    for path in stage.files(ctx):
+        files[str(path)] = sha256_file(path) if path.exists() else None
+
+    code = {rel: sha256_file(PROJECT_ROOT / rel) for rel in stage.code}
+
+    return sha256_json({
+        "stage": stage.name,
+        "files": files,
+        "code": code,
+        "params": {k: ctx.get(k) for k in stage.params},
+        "upstream": upstream_keys,
+    })
+
+
+def _prune(stage_dir: Path) -> None:
+    entries = sorted(stage_dir.glob("*.pkl"), key=lambda p: p.stat().st_mtime, reverse=True)
+    for old in entries[KEEP_PER_STAGE:]:
+        old.unlink(missing_ok=True)
+
+
+def run_stages(stages: list[Stage], ctx: dict, *, force: bool = False) -> tuple[dict, dict]:
+    """
+    Runs `stages` (already in dependency order).
+    Returns (outputs, status) where status[name] is "cached" or "ran".
+    Each stage, cached or not, is timed as a profiler stage of the same name.
+    """
+    outputs: dict[str, object] = {}
+    keys: dict[str, str] = {}
+    status: dict[str, str] = {}
+
+    for stage in stages:
+        missing = [d for d in stage.deps if d not in outputs]
+        if missing:
+            raise ValueError(f"Stage {stage.name} depends on {missing}, which must come earlier")
+
+        with profiler.stage(stage.name):
+            key = stage_key(stage, ctx, [keys[d] for d in stage.deps])
+            keys[stage.name] = key
+            cache_path = STAGE_CACHE_DIR / stage.name / f"{key}.pkl"
+
+            if not stage.cache:
+                outputs[stage.name] = stage.run(ctx, *[outputs[d] for d in stage.deps])
+                status[stage.name] = "ran"
+                continue
+
+            if not force and cache_path.exists():
+                output = read_pickle(cache_path)
+                if stage.is_valid(output):
+                    outputs[stage.name] = output
+                    status[stage.name] = "cached"
+                    continue
+
+            output = stage.run(ctx, *[outputs[d] for d in stage.deps])
+            write_pickle(cache_path, output)
+            _prune(cache_path.parent)
+
+            outputs[stage.name] = output
+            status[stage.name] = "ran"
+
+    return outputs, status
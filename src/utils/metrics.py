@@ -0,0 +1,269 @@
+"""
+Minimal in-process metrics for the crawler: counters, gauges and histograms with labels.
+
+Exposed either as a Prometheus text endpoint (METRICS_PORT) or as a JSON file rewritten
+periodically (METRICS_JSON_PATH, every METRICS_INTERVAL seconds). Both are opt-in via
+start_from_env(); recording is always on and cheap.
+"""
+from __future__ import annotations
+
+import atexit
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _label_key(labelnames: tuple[str, ...], labels: dict) -> tuple:
+    if set(labels) != set(labelnames):
+        raise ValueError(f"expected labels {labelnames}, got {sorted(labels)}")
+    return tuple(str(labels[name]) for name in labelnames)
+
+
+def _format_labels(labelnames: tuple[str, ...], key: tuple, extra: dict | None = None) -> str:
+    pairs = list(zip(labelnames, key)) + list((extra or {}).items())
+    if not pairs:
+        return ""
+    inner = ",".join(f'{name}="{str(value)}"' for name, value in pairs)
+    return "{" + inner + "}"
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.lock = threading.Lock()
+        self.values: dict[tuple, object] = {}
+
+    def header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = _label_key(self.labelnames, labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0.0) + amount
+
+    def render(self) -> list[str]:
+        with self.lock:
+            items = list(self.values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, k)} {v}" for k, v in items]
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            return {",".join(k) or "_": v for k, v in self.values.items()}
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        key = _label_key(self.labelnames, labels)
+        with self.lock:
+            self.values[key] = float(value)
+
+    def render(self) -> list[str]:
+        with self.lock:
+            items = list(self.values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, k)} {v}" for k, v in items]
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            return {",".join(k) or "_": v for k, v in self.values.items()}
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = (), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels) -> None:
+        key = _label_key(self.labelnames, labels)
+        idx = bisect_left(self.buckets, value)
+        with self.lock:
+            state = self.values.get(key)
+            if state is None:
+                state = {"counts": [0] * (len(self.buckets) + 1), "sum": 0.0, "count": 0}
+                self.values[key] = state
+            state["counts"][idx] += 1
+            state["sum"] += value
+            state["count"] += 1
+
+    def render(self) -> list[str]:
+        with self.lock:
+            items = [(k, {"counts": list(s["counts"]), "sum": s["sum"], "count": s["count"]})
+                     for k, s in self.values.items()]
+
+        lines = []
+        for key, state in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets, state["counts"]):
+                cumulative += n
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, {'le': bound})} {cumulative}")
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, {'le': '+Inf'})} {state['count']}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {state['sum']}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {state['count']}")
+        return lines
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            out = {}
+            for key, state in self.values.items():
+                out[",".join(key) or "_"] = {
+                    "count": state["count"],
+                    "sum": round(state["sum"], 6),
+                    "mean": round(state["sum"] / state["count"], 6) if state["count"] else None,
+                    "buckets": dict(zip([str(b) for b in self.buckets] + ["+Inf"], state["counts"])),
+                }
+            return out
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.metrics: dict[str, _Metric] = {}
+
+    def _get_or_create(self, cls, name: str, help: str, labelnames, **kwargs):
+        with self.lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = cls(name, help, tuple(labelnames), **kwargs)
+                self.metrics[name] = metric
+            elif not isinstance(metric, cls):
+                raise ValueError(f"metric {name} already registered as {metric.kind}")
+            return metric
+
+    def counter(self, name: str, help: str, labelnames=()) -> Counter:
+        return self._get_or_create(Counter, name, help, labelnames)
+
+    def gauge(self, name: str, help: str, labelnames=()) -> Gauge:
+        return self._get_or_create(Gauge, name, help, labelnames)
+
+    def histogram(self, name: str, help: str, labelnames=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, help, labelnames, buckets=buckets)
+
+    def render_prometheus(self) -> str:
+        with self.lock:
+            metrics = list(self.metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.header())
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            metrics = list(self.metrics.values())
+        return {
+            "timestamp": time.time(),
+            "metrics": {m.name: {"type": m.kind, "labels": list(m.labelnames), "values": m.snapshot()} for m in metrics},
+        }
+
+
+REGISTRY = Registry()
+PROCESS_START = time.time()
+
+counter = REGISTRY.counter
+gauge = REGISTRY.gauge
+histogram = REGISTRY.histogram
+
+
+@contextmanager
+def timer(hist: Histogram, **labels):
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        hist.observe(time.perf_counter() - t0, **labels)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/metrics", "/"):
+            self.send_response(404)
+            self.end_headers()
+            return
+        body = REGISTRY.render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start_http_exporter(port: int, host: str = "0.0.0.0") -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
+
+
+def write_json_snapshot(path: Path) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_text(json.dumps(REGISTRY.snapshot(), indent=2), encoding="utf-8")
+    tmp.replace(path)
+
+
+def start_json_writer(path: Path, interval: float = 15.0) -> threading.Thread:
+    """Rewrites the snapshot every `interval` seconds, and once more at exit."""
+    def write():
+        try:
+            write_json_snapshot(path)
+        except OSError as e:
+            print(f"metrics: failed to write {path}: {e}", flush=True)
+
+    def loop():
+        while True:
+            time.sleep(interval)
+            write()
+
+    # Otherwise runs shorter than one interval, and every run's last interval, are lost.
+    atexit.register(write)
+    thread = threading.Thread(target=loop, name="metrics-json", daemon=True)
+    thread.start()
+    return thread
+
+
+_started = False
+
+
+def start_from_env() -> None:
+    """
+    METRICS_PORT=9108            -> Prometheus text endpoint on :9108/metrics
+    METRICS_JSON_PATH=path.json  -> JSON snapshot rewritten every METRICS_INTERVAL seconds (default 15) and at exit
+    Safe to call more than once.
+    """
+    global _started
+    if _started:
+        return
+    _started = True
+
+    gauge("process_start_time_seconds", "Unix time the process started").set(PROCESS_START)
+
+    port = os.getenv("METRICS_PORT")
+    if port:
+        start_http_exporter(int(port))
+        print(f"metrics: serving Prometheus text on :{port}/metrics", flush=True)
+
+    json_path = os.getenv("METRICS_JSON_PATH")
+    if json_path:
+        start_json_writer(Path(json_path), float(os.getenv("METRICS_INTERVAL", "15")))
+        print(f"metrics: writing JSON snapshots to {json_path}", flush=True)
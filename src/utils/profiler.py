@@ -0,0 +1,408 @@
+"""
+Opt-in whole-run profiling for the entry points (main.py, ingest, dataset, train, ...).
+
+  python3 main.py --profile
+  python3 -m src.ml.train --csv aram_team_dataset.csv --profile sample
+  PROFILE=1 python3 -m scripts.ingest_matches
+
+An entry point calls start() after parsing its arguments. When profiling is on, the
+run writes to PROFILE_DIR/<name>-<YYYYmmdd-HHMMSS>-<pid>/ at process exit:
+
+  summary.json   argv, wall / CPU time, max RSS, traced peak memory, stage timings
+  profile.pstats cProfile data (mode "cprofile"; open with pstats / snakeviz)
+  profile.txt    top functions by cumulative and by own time (mode "cprofile")
+  stacks.txt     collapsed stacks, one "frame;frame;... count" per line (mode "sample";
+                 feed to flamegraph.pl or speedscope)
+  samples.txt    top functions by inclusive and by own samples (mode "sample")
+  memory.txt     tracemalloc top allocation sites near the traced peak, plus per-stage peaks
+
+cProfile traces every call of the thread that called start(), which is exact but slows
+call-heavy code 1.5-3x and misses worker threads. "sample" instead snapshots the stack of
+every thread each PROFILE_SAMPLE_MS, which is cheap and covers run_crawl_cycle's workers.
+
+Code marks its phases with stage():
+
+  with profiler.stage("fetch"):
+      data = fetch_match(match_id)
+
+Stages are aggregated by name (calls, total / max seconds, peak traced memory while the
+stage was open); nested stages are named "outer/inner". They cost nothing when profiling
+is off. If SQL profiling (src/db/profiling.py) is also on, its JSON report goes to the
+same directory unless SQL_PROFILE_OUT says otherwise.
+
+Environment:
+  PROFILE               "1" / "cprofile" or "sample" enables profiling (default off;
+                        --profile overrides it)
+  PROFILE_DIR           parent of the run directories (default data/profiles)
+  PROFILE_SAMPLE_MS     sampling interval of mode "sample" (default 5)
+  PROFILE_MEMORY        "0" disables tracemalloc, which slows allocation-heavy code ~2x
+  PROFILE_MEMORY_FRAMES frames kept per traced allocation (default 1)
+"""
+from __future__ import annotations
+
+import argparse
+import atexit
+import cProfile
+import io
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+
+from src.config.paths import DATA_DIR, PROJECT_ROOT
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+MODES = ("cprofile", "sample")
+DEFAULT_PROFILE_DIR = DATA_DIR / "profiles"
+
+# A snapshot is only retaken once traced memory grows this much past the last one, so
+# a stage run per match costs a handful of snapshots rather than one per call.
+SNAPSHOT_GROWTH = 1.25
+TOP_LINES = 40
+
+
+def mode_from_env() -> str | None:
+    value = os.getenv("PROFILE", "").strip().lower()
+    if value in ("", "0", "false", "no", "off"):
+        return None
+    return "sample" if value == "sample" else "cprofile"
+
+
+def add_argument(ap: argparse.ArgumentParser) -> None:
+    ap.add_argument(
+        "--profile",
+        nargs="?",
+        const="cprofile",
+        choices=MODES,
+        default=None,
+        help="Profile this run (cprofile or sample) and write it under PROFILE_DIR",
+    )
+
+
+class StackSampler:
+    """Background thread counting the collapsed stack of every other thread."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.stacks: Counter[str] = Counter()
+        self.samples = 0
+        self._labels: dict = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            filename = code.co_filename
+            try:
+                filename = str(Path(filename).resolve().relative_to(PROJECT_ROOT))
+            except ValueError:
+                filename = Path(filename).name
+            label = f"{code.co_name} ({filename}:{code.co_firstlineno})"
+            self._labels[code] = label
+        return label
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                frames = []
+                while frame is not None:
+                    frames.append(self._label(frame.f_code))
+                    frame = frame.f_back
+                frames.append(names.get(ident, f"thread-{ident}"))
+                self.stacks[";".join(reversed(frames))] += 1
+            self.samples += 1
+
+    def write(self, out_dir: Path) -> None:
+        with open(out_dir / "stacks.txt", "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+        inclusive: Counter[str] = Counter()
+        own: Counter[str] = Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(";")[1:]
+            if not frames:
+                continue
+            own[frames[-1]] += count
+            for label in set(frames):
+                inclusive[label] += count
+
+        total = max(sum(self.stacks.values()), 1)
+        lines = [f"{self.samples} sampling rounds every {1000 * self.interval:g} ms, {total} thread samples", ""]
+        for title, counts in (("inclusive", inclusive), ("own", own)):
+            lines.append(f"{'samples':>8} {'%':>6}  function ({title})")
+            for label, count in counts.most_common(TOP_LINES):
+                lines.append(f"{count:>8} {100 * count / total:>6.1f}  {label}")
+            lines.append("")
+        (out_dir / "samples.txt").write_text("\n".join(lines), encoding="utf-8")
+
+
+class StageStats:
+    def __init__(self, name: str):
+        self.name = name
+        self.calls = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.peak_bytes = 0
+
+    def summary(self, traced: bool) -> dict:
+        return {
+            "stage": self.name,
+            "calls": self.calls,
+            "total_s": round(self.total_seconds, 4),
+            "mean_ms": round(1000 * self.total_seconds / max(self.calls, 1), 3),
+            "max_ms": round(1000 * self.max_seconds, 3),
+            "peak_mb": round(self.peak_bytes / 2**20, 2) if traced else None,
+        }
+
+
+class ProfileSession:
+    def __init__(self, name: str, mode: str, out_dir: Path):
+        self.name = name
+        self.mode = mode
+        self.out_dir = out_dir
+        self.started_at = time.time()
+        self.wall_start = time.perf_counter()
+        self.cpu_start = time.process_time()
+        self.lock = threading.Lock()
+        self.stages: dict[str, StageStats] = {}
+        # Running peak of each open stage, keyed by id() of its open-stage token.
+        self.open_peaks: dict[int, int] = {}
+        self.traced = False
+        self.peak_bytes = 0
+        self.snapshot = None
+        self.snapshot_bytes = 0
+        self.snapshot_stage = ""
+        self.profiler: cProfile.Profile | None = None
+        self.sampler: StackSampler | None = None
+        self.stopped = False
+
+    def fold_peak(self) -> int:
+        """Credits the traced peak since the last fold to the run and every open stage."""
+        if not tracemalloc.is_tracing():
+            return 0
+        current, peak = tracemalloc.get_traced_memory()
+        with self.lock:
+            self.peak_bytes = max(self.peak_bytes, peak)
+            for token, value in self.open_peaks.items():
+                self.open_peaks[token] = max(value, peak)
+            tracemalloc.reset_peak()
+        return current
+
+    def maybe_snapshot(self, current: int, stage_name: str) -> None:
+        if not tracemalloc.is_tracing() or current <= self.snapshot_bytes * SNAPSHOT_GROWTH:
+            return
+        with self.lock:
+            if current <= self.snapshot_bytes * SNAPSHOT_GROWTH:
+                return
+            self.snapshot_bytes = current
+        snapshot = tracemalloc.take_snapshot()
+        self.snapshot, self.snapshot_stage = snapshot, stage_name
+
+    def record_stage(self, name: str, seconds: float, peak: int) -> None:
+        with self.lock:
+            stats = self.stages.get(name)
+            if stats is None:
+                stats = self.stages[name] = StageStats(name)
+            stats.calls += 1
+            stats.total_seconds += seconds
+            stats.max_seconds = max(stats.max_seconds, seconds)
+            stats.peak_bytes = max(stats.peak_bytes, peak)
+
+    def stop(self) -> None:
+        if self.stopped:
+            return
+        self.stopped = True
+        if self.profiler is not None:
+            self.profiler.disable()
+        if self.sampler is not None:
+            self.sampler.stop()
+        wall = time.perf_counter() - self.wall_start
+        cpu = time.process_time() - self.cpu_start
+
+        if tracemalloc.is_tracing():
+            self.maybe_snapshot(self.fold_peak(), "<exit>")
+            tracemalloc.stop()
+
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        if self.profiler is not None:
+            self._write_cprofile()
+        if self.sampler is not None:
+            self.sampler.write(self.out_dir)
+        if self.traced:
+            self._write_memory()
+
+        summary = {
+            "name": self.name,
+            "argv": sys.argv,
+            "mode": self.mode,
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%S%z", time.localtime(self.started_at)),
+            "wall_s": round(wall, 3),
+            "cpu_s": round(cpu, 3),
+            "max_rss_mb": _max_rss_mb(),
+            "traced_peak_mb": round(self.peak_bytes / 2**20, 2) if self.traced else None,
+            "stages": [s.summary(self.traced) for s in self.stages.values()],
+        }
+        (self.out_dir / "summary.json").write_text(json.dumps(summary, indent=2), encoding="utf-8")
+        print_summary(summary)
+        print(f"profile written to {self.out_dir}", file=sys.stderr)
+
+    def _write_cprofile(self) -> None:
+        self.profiler.dump_stats(self.out_dir / "profile.pstats")
+        buf = io.StringIO()
+        stats = pstats.Stats(self.profiler, stream=buf).strip_dirs()
+        stats.sort_stats("cumulative").print_stats(TOP_LINES)
+        stats.sort_stats("tottime").print_stats(TOP_LINES)
+        (self.out_dir / "profile.txt").write_text(buf.getvalue(), encoding="utf-8")
+
+    def _write_memory(self) -> None:
+        lines = [f"traced peak: {self.peak_bytes / 2**20:.1f} MB", ""]
+        if self.snapshot is not None:
+            snapshot = self.snapshot.filter_traces((
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, __file__),
+                # Module code objects from imports, which dominate short runs.
+                tracemalloc.Filter(False, "<frozen *>"),
+            ))
+            top = snapshot.statistics("lineno")
+            lines.append(
+                f"largest snapshot: {self.snapshot_bytes / 2**20:.1f} MB traced, "
+                f"taken leaving stage {self.snapshot_stage}"
+            )
+            lines.append(f"{'MB':>9} {'blocks':>9}  allocation site")
+            for stat in top[:TOP_LINES]:
+                frame = stat.traceback[0]
+                lines.append(f"{stat.size / 2**20:>9.2f} {stat.count:>9}  {frame.filename}:{frame.lineno}")
+            lines.append("")
+        lines.append(f"{'peak_mb':>9}  stage")
+        for stats in self.stages.values():
+            lines.append(f"{stats.peak_bytes / 2**20:>9.1f}  {stats.name}")
+        (self.out_dir / "memory.txt").write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+def _max_rss_mb() -> float | None:
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS bytes.
+    return round(rss / (2**20 if sys.platform == "darwin" else 2**10), 1)
+
+
+def print_summary(summary: dict, *, file=None) -> None:
+    file = file or sys.stderr
+    print(
+        f"=== profile {summary['name']}: {summary['wall_s']:.2f}s wall, {summary['cpu_s']:.2f}s CPU, "
+        f"max RSS {summary['max_rss_mb']} MB, traced peak {summary['traced_peak_mb']} MB ===",
+        file=file,
+    )
+    if not summary["stages"]:
+        return
+    print(f"{'total_s':>9} {'calls':>8} {'mean_ms':>10} {'max_ms':>10} {'peak_mb':>8}  stage", file=file)
+    for s in summary["stages"]:
+        peak = "" if s["peak_mb"] is None else f"{s['peak_mb']:.1f}"
+        print(
+            f"{s['total_s']:>9.3f} {s['calls']:>8} {s['mean_ms']:>10.2f} {s['max_ms']:>10.2f} {peak:>8}  {s['stage']}",
+            file=file,
+        )
+
+
+_session: ProfileSession | None = None
+_local = threading.local()
+
+
+def active() -> bool:
+    return _session is not None
+
+
+def start(name: str, mode: str | None = None) -> ProfileSession | None:
+    """
+    Starts profiling this process if `mode` (from --profile) or PROFILE asks for it,
+    and writes the results at exit. Returns the session, or None when off.
+    """
+    global _session
+    mode = mode or mode_from_env()
+    if mode is None or _session is not None:
+        return _session
+    if mode not in MODES:
+        raise ValueError(f"unknown profile mode {mode!r}; expected one of {MODES}")
+
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    out_dir = Path(os.getenv("PROFILE_DIR", str(DEFAULT_PROFILE_DIR))) / f"{name}-{stamp}-{os.getpid()}"
+    session = ProfileSession(name, mode, out_dir)
+    os.environ.setdefault("SQL_PROFILE_OUT", str(out_dir / "sql.json"))
+
+    if os.getenv("PROFILE_MEMORY", "1") not in ("0", "false", "no"):
+        tracemalloc.start(int(os.getenv("PROFILE_MEMORY_FRAMES", "1")))
+        session.traced = True
+    if mode == "sample":
+        session.sampler = StackSampler(float(os.getenv("PROFILE_SAMPLE_MS", "5")) / 1000.0)
+        session.sampler.start()
+    else:
+        session.profiler = cProfile.Profile()
+        session.profiler.enable()
+
+    _session = session
+    atexit.register(stop)
+    print(f"profiling {name} ({mode}) -> {out_dir}", file=sys.stderr)
+    return session
+
+
+def stop() -> None:
+    """Writes the profile now instead of at exit. Safe to call more than once."""
+    global _session
+    session, _session = _session, None
+    if session is not None:
+        session.stop()
+
+
+@contextmanager
+def stage(name: str):
+    """Times a phase of the run (and its traced peak memory) when profiling is on."""
+    session = _session
+    if session is None:
+        yield
+        return
+
+    parents = getattr(_local, "stages", None)
+    if parents is None:
+        parents = _local.stages = []
+    full_name = "/".join(parents + [name])
+    parents.append(name)
+
+    token = object()
+    session.fold_peak()
+    with session.lock:
+        session.open_peaks[id(token)] = 0
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - t0
+        parents.pop()
+        current = session.fold_peak()
+        with session.lock:
+            peak = session.open_peaks.pop(id(token))
+        session.record_stage(full_name, seconds, peak)
+        session.maybe_snapshot(current, full_name)
@@ -0,0 +1,78 @@
+"""
+flatten_templates() of src/parsing/aram_modifiers.py must match the regex fixed-point
+loop it replaced, including on the malformed brace runs it hands back to that loop.
+"""
+import random
+
+import pytest
+
+from src.parsing.aram_modifiers import _flatten_templates_fixed_point, expand_range, flatten_templates
+
+CASES = [
+    "",
+    "no templates here",
+    "{{as|5}}% damage dealt",
+    "{{ap|6 to 14}} bonus",
+    "{{pp|2 to 4 3|key=value}}",
+    "outer {{a|{{b|{{c|1 to 2 2}}}}|x=1}} tail",
+    "{{a|1}}{{b|2}} and {{c|{{d|3}}}}",
+    "{{a|single { brace}}",
+    "{{{triple}}}",
+    "{{unclosed|1",
+    "stray }} and {{ok|1}}",
+    "}}{{",
+]
+
+
+@pytest.mark.parametrize("text", CASES)
+def test_matches_fixed_point(text):
+    assert flatten_templates(text) == _flatten_templates_fixed_point(text)
+
+
+def random_template(rng: random.Random, depth: int = 0) -> str:
+    params = []
+    for _ in range(rng.randint(0, 3)):
+        kind = rng.random()
+        if kind < 0.3 and depth < 3:
+            params.append("x " + random_template(rng, depth + 1))
+        elif kind < 0.5:
+            params.append(f"key{rng.randint(0, 9)}={rng.randint(0, 9)}")
+        elif kind < 0.75:
+            params.append(f"{rng.randint(0, 20)} to {rng.randint(0, 20)} {rng.randint(1, 6)}")
+        else:
+            params.append(rng.choice(["", "7", "a b", "%"]))
+    return "{{" + "|".join([rng.choice(["as", "ap", "pp"]), *params]) + "}}"
+
+
+def test_fuzz_well_formed_matches_fixed_point():
+    rng = random.Random(0)
+    for _ in range(1000):
+        text = "".join(rng.choice([" text ", "\n", random_template(rng)]) for _ in range(rng.randint(0, 6)))
+        assert flatten_templates(text) == _flatten_templates_fixed_point(text), repr(text)
+
+
+def test_fuzz_malformed_matches_fixed_point():
+    rng = random.Random(0)
+    alphabet = ["{{", "}}", "{", "}", "|", "=", "a", "7", " ", " to ", "\n"]
+    for _ in range(2000):
+        text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 30)))
+        assert flatten_templates(text) == _flatten_templates_fixed_point(text), repr(text)
+
+
+def test_nested_templates_expand_innermost_first():
+    assert flatten_templates("x {{a|{{b|1 to 3 3}}|k=v}} y") == "x 1 / 2 / 3 y"
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        ("6 to 14", "6 / 8 / 10 / 12 / 14"),
+        ("2 to 4 3", "2 / 3 / 4"),
+        ("0.5 to 1 3", "0.5 / 0.75 / 1"),
+        ("5 to 9 1", "5"),
+        ("towards", "towards"),
+        ("10", "10"),
+    ],
+)
+def test_expand_range(value, expected):
+    assert expand_range(value) == expected
@@ -0,0 +1,123 @@
+"""
+src/merging/store.py: snapshots survive a reopen from base + deltas, out-of-order and
+replaced patches keep the chain consistent, and compaction keeps every live record.
+"""
+import json
+
+from src.merging.store import CanonicalStore
+
+
+def champ(cid: int, name: str, **mods) -> dict:
+    return {"id": cid, "key": name, "name": name, "aram_mods": mods}
+
+
+P1 = {"1": champ(1, "Annie"), "2": champ(2, "Olaf", dmg_dealt=1.05)}
+P2 = {"1": champ(1, "Annie"), "2": champ(2, "Olaf", dmg_dealt=1.1), "3": champ(3, "Galio")}
+P3 = {"2": champ(2, "Olaf", dmg_dealt=1.1), "3": champ(3, "Galio", dmg_taken=0.95)}
+
+
+def test_round_trip(tmp_path):
+    store = CanonicalStore(tmp_path)
+    store.add_snapshot("16.1", P1)
+    store.add_snapshot("16.2", P2)
+    store.add_snapshot("16.3", P3)
+
+    reopened = CanonicalStore(tmp_path)
+    assert reopened.patches() == ["16.1", "16.2", "16.3"]
+    assert reopened.latest_patch() == "16.3"
+    for patch, snapshot in (("16.1", P1), ("16.2", P2), ("16.3", P3)):
+        assert reopened.snapshot(patch) == snapshot
+    assert reopened.aram_mods(2, "16.1") == {"dmg_dealt": 1.05}
+    assert reopened.champion(1, "16.3") is None
+
+
+def test_unchanged_champions_share_a_record(tmp_path):
+    store = CanonicalStore(tmp_path)
+    store.add_snapshot("16.1", P1)
+    summary = store.add_snapshot("16.2", P2)
+
+    assert summary["parent"] == "16.1"
+    assert summary["changed"] == 2   # Olaf changed, Galio added
+    assert summary["removed"] == 0
+    assert len(store.records) == 4
+    delta = json.loads((tmp_path / "deltas" / "16.2.json").read_text(encoding="utf-8"))
+    assert sorted(delta["changed"]) == ["2", "3"]
+
+
+def test_older_patch_becomes_the_base(tmp_path):
+    store = CanonicalStore(tmp_path)
+    store.add_snapshot("16.2", P2)
+    store.add_snapshot("16.10", P3)
+    store.add_snapshot("16.1", P1)
+
+    reopened = CanonicalStore(tmp_path)
+    assert reopened.patches() == ["16.1", "16.2", "16.10"]
+    assert json.loads((tmp_path / "base.json").read_text(encoding="utf-8"))["patch"] == "16.1"
+    assert not (tmp_path / "deltas" / "16.1.json").exists()
+    assert reopened.snapshot("16.2") == P2
+    assert reopened.snapshot("16.10") == P3
+
+
+def test_replacing_a_patch_rewrites_the_next_delta(tmp_path):
+    store = CanonicalStore(tmp_path)
+    store.add_snapshot("16.1", P1)
+    store.add_snapshot("16.2", P2)
+    store.add_snapshot("16.3", P3)
+    store.add_snapshot("16.2", P1)
+
+    reopened = CanonicalStore(tmp_path)
+    assert reopened.snapshot("16.2") == P1
+    assert reopened.snapshot("16.3") == P3
+
+
+def test_has_snapshot(tmp_path):
+    store = CanonicalStore(tmp_path)
+    summary = store.add_snapshot("16.1", P1)
+
+    assert CanonicalStore(tmp_path).has_snapshot("16.1", summary["snapshot"])
+    assert not store.has_snapshot("16.2", summary["snapshot"])
+    store.add_snapshot("16.1", P2)
+    assert not store.has_snapshot("16.1", summary["snapshot"])
+
+
+def test_changes(tmp_path):
+    store = CanonicalStore(tmp_path)
+    store.add_snapshot("16.2", P2)
+    store.add_snapshot("16.3", P3)
+
+    changes = store.changes("16.2", "16.3")
+    assert changes["added"] == {}
+    assert changes["removed"] == {"1": P2["1"]}
+    assert changes["changed"] == {"3": {"from": P2["3"], "to": P3["3"]}}
+
+
+def test_compact_drops_only_unreferenced_records(tmp_path):
+    store = CanonicalStore(tmp_path)
+    store.add_snapshot("16.1", P1)
+    store.add_snapshot("16.1", P2)
+
+    assert store.compact() == 1   # Olaf at dmg_dealt 1.05
+    reopened = CanonicalStore(tmp_path)
+    assert len(reopened.records) == 3
+    assert reopened.snapshot("16.1") == P2
+
+
+def test_torn_record_line_is_ignored(tmp_path):
+    store = CanonicalStore(tmp_path)
+    store.add_snapshot("16.1", P1)
+    with open(tmp_path / "records.jsonl", "a", encoding="utf-8") as f:
+        f.write('{"id": "dead')
+
+    assert CanonicalStore(tmp_path).snapshot("16.1") == P1
+
+
+def test_rebuild_index_from_deltas(tmp_path):
+    store = CanonicalStore(tmp_path)
+    store.add_snapshot("16.1", P1)
+    store.add_snapshot("16.2", P2)
+    (tmp_path / "index.json").unlink()
+
+    reopened = CanonicalStore(tmp_path)
+    assert reopened.patches() == ["16.1", "16.2"]
+    reopened.rebuild_index()
+    assert json.loads((tmp_path / "index.json").read_text(encoding="utf-8")) == {"patches": ["16.1", "16.2"]}
@@ -0,0 +1,69 @@
+"""
+Startup guard for the lazy-import command line (main.py).
+
+Each command runs `main.py <command> --help` in a fresh interpreter and checks which
+heavy modules got imported. argparse exits before the command does any work, so
+anything loaded is a top-level import of the command's module. A loose wall-clock
+budget over a bare interpreter catches slow imports that do not appear on the lists.
+scripts/bench_cli_startup.py gives the detailed per-import breakdown.
+"""
+import json
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+
+# Runs main.py as `python3 main.py <command> --help` would, then reports sys.modules.
+PROBE = """
+import json, runpy, sys
+sys.argv = ["main.py", *sys.argv[1:]]
+try:
+    runpy.run_path("main.py", run_name="__main__")
+except SystemExit:
+    pass
+sys.stderr.write("\\nMODULES " + json.dumps(sorted({name.split(".")[0] for name in sys.modules})) + "\\n")
+"""
+
+HEAVY = ("sklearn", "pandas", "lupa")
+STARTUP_BUDGET_S = 1.5   # on top of a bare interpreter; predict --help takes ~0.3 s
+
+
+def _run(args: list[str]) -> tuple[float, subprocess.CompletedProcess]:
+    t0 = time.perf_counter()
+    proc = subprocess.run([sys.executable, *args], cwd=PROJECT_ROOT, capture_output=True, text=True)
+    return time.perf_counter() - t0, proc
+
+
+def _loaded_modules(command: str) -> set[str]:
+    _, proc = _run(["-c", PROBE, command, "--help"])
+    assert proc.returncode == 0, proc.stderr
+    marker = [line for line in proc.stderr.splitlines() if line.startswith("MODULES ")]
+    assert marker, proc.stderr
+    return set(json.loads(marker[-1][len("MODULES "):]))
+
+
+@pytest.mark.parametrize(
+    "command, forbidden",
+    [
+        ("predict", HEAVY + ("psycopg",)),
+        ("queue-status", HEAVY),
+    ],
+)
+def test_help_skips_heavy_imports(command, forbidden):
+    loaded = _loaded_modules(command)
+    assert not loaded & set(forbidden), f"`main.py {command} --help` imported {sorted(loaded & set(forbidden))}"
+
+
+@pytest.mark.parametrize("command", ["predict", "queue-status"])
+def test_help_startup_budget(command):
+    bare = min(_run(["-c", "pass"])[0] for _ in range(3))
+    seconds = []
+    for _ in range(3):
+        elapsed, proc = _run(["main.py", command, "--help"])
+        assert proc.returncode == 0, proc.stderr
+        seconds.append(elapsed)
+    assert min(seconds) - bare < STARTUP_BUDGET_S, f"{command} --help took {min(seconds):.2f}s (bare {bare:.2f}s)"
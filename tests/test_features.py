@@ -0,0 +1,97 @@
+"""
+Hashed featurization of src/ml/features.py: stable columns within the space, signs,
+the optional interaction families, and batch vs single-team agreement.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.ml.features import HashSpace, featurize_df, featurize_team
+
+TEAMS = [
+    ([1, 2, 3, 4, 5], {"Tank": 2, "Mage": 3}),
+    ([10, 20, 30, 40, 50], {"Marksman": 1}),
+    ([5, 4, 3, 2, 1], {}),
+]
+
+
+def frame(teams=TEAMS) -> pd.DataFrame:
+    return pd.DataFrame({
+        "champs": [champs for champs, _ in teams],
+        "tag_counts": [tags for _, tags in teams],
+        "win": [1, 0, 1][: len(teams)],
+    })
+
+
+def test_deterministic_and_order_independent():
+    space = HashSpace(n_features=1 << 12)
+    X, y = featurize_df(frame(), space)
+    X_again, _ = featurize_df(frame(), space)
+
+    assert X.shape == (3, 1 << 12)
+    assert y.tolist() == [1, 0, 1]
+    assert (X != X_again).nnz == 0
+    # Row 2 lists the champions in reverse; the order within a team does not matter.
+    no_tags = featurize_team([1, 2, 3, 4, 5], {}, space)
+    assert (no_tags != X[2]).nnz == 0
+
+
+def test_single_team_matches_batch():
+    space = HashSpace(n_features=1 << 12)
+    X, _ = featurize_df(frame(), space)
+    for i, (champs, tags) in enumerate(TEAMS):
+        assert (featurize_team(champs, tags, space) != X[i]).nnz == 0
+
+
+def test_seed_changes_columns():
+    X_a, _ = featurize_df(frame(), HashSpace(n_features=1 << 16))
+    X_b, _ = featurize_df(frame(), HashSpace(n_features=1 << 16, seed=1))
+    assert set(X_a[0].indices) != set(X_b[0].indices)
+
+
+def test_signed_and_unsigned():
+    space = HashSpace(n_features=1 << 20, signed=False)
+    X, _ = featurize_df(frame(), space)
+    assert X.data.min() > 0
+
+    X_signed, _ = featurize_df(frame(), HashSpace(n_features=1 << 20))
+    assert (X_signed.data < 0).any()
+    assert np.array_equal(np.abs(X_signed.toarray()), X.toarray())
+
+
+@pytest.mark.parametrize(
+    "space, per_team",
+    [
+        # 5 champions + 10 pairs + 10 triples, plus per tag 1 tag + 5 champion x tag.
+        (HashSpace(n_features=1 << 24), 25),
+        (HashSpace(n_features=1 << 24, triples=False), 15),
+        (HashSpace(n_features=1 << 24, pairs=False, triples=False), 5),
+    ],
+)
+def test_feature_families(space, per_team):
+    X, _ = featurize_df(frame(), space)
+    assert X[1].nnz == per_team + 6      # one tag
+    assert X[2].nnz == per_team          # no tags
+
+
+def test_no_champ_tags():
+    X, _ = featurize_df(frame(), HashSpace(n_features=1 << 24, champ_tags=False))
+    assert X[0].nnz == 25 + 2
+
+
+def test_tag_count_is_the_value():
+    space = HashSpace(n_features=1 << 24, signed=False, pairs=False, triples=False, champ_tags=False)
+    X = featurize_team([1, 2, 3, 4, 5], {"Tank": 3}, space)
+    assert sorted(X.data.tolist()) == [1.0] * 5 + [3.0]
+
+
+def test_collisions_stay_in_bounds():
+    space = HashSpace(n_features=8)
+    X, _ = featurize_df(frame(), space)
+    assert X.shape == (3, 8)
+    assert X.indices.max() < 8
+
+
+def test_needs_five_champions():
+    with pytest.raises(ValueError, match="exactly 5"):
+        featurize_team([1, 2, 3], {}, HashSpace(n_features=1 << 12))
@@ -0,0 +1,68 @@
+"""
+KeyCache of src/db/keys.py: least-recently-used eviction, hit / miss counts and the
+disabled (size 0) cache.
+"""
+import threading
+
+from src.db.keys import KeyCache
+
+
+def test_get_and_put():
+    cache = KeyCache(max_size=10)
+    assert cache.get("NA1_1") is None
+    cache.put("NA1_1", 1)
+    assert cache.get("NA1_1") == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_evicts_least_recently_used():
+    cache = KeyCache(max_size=3)
+    for key, riot_id in enumerate(["a", "b", "c"]):
+        cache.put(riot_id, key)
+    cache.get("a")          # "b" is now the oldest
+    cache.put("d", 3)
+
+    assert len(cache) == 3
+    assert cache.get("b") is None
+    assert [cache.get(riot_id) for riot_id in ("a", "c", "d")] == [0, 2, 3]
+
+
+def test_put_refreshes_an_existing_id():
+    cache = KeyCache(max_size=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.put("a", 1)
+    cache.put("c", 3)
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+
+
+def test_size_zero_disables_the_cache():
+    cache = KeyCache(max_size=0)
+    cache.put("a", 1)
+    assert len(cache) == 0
+    assert cache.get("a") is None
+
+
+def test_clear():
+    cache = KeyCache(max_size=2)
+    cache.put("a", 1)
+    cache.clear()
+    assert len(cache) == 0
+
+
+def test_concurrent_puts_stay_bounded():
+    cache = KeyCache(max_size=100)
+
+    def fill(offset: int):
+        for i in range(1000):
+            cache.put(f"{offset}_{i}", i)
+            cache.get(f"{offset}_{i // 2}")
+
+    threads = [threading.Thread(target=fill, args=(t,)) for t in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(cache) == 100
+    assert cache.hits + cache.misses == 4000
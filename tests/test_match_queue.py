@@ -0,0 +1,51 @@
+"""
+Error classification of src/crawling/match_queue.py: which failures kill a row, which
+are retried on the backoff schedule and which stop the worker.
+"""
+import pytest
+import requests
+
+from src.crawling.match_queue import FATAL, PERMANENT, TRANSIENT, classify_error
+from src.crawling.regions import UnknownPlatformError, region_for_match_id
+
+
+def http_error(status: int) -> requests.HTTPError:
+    response = requests.Response()
+    response.status_code = status
+    return requests.HTTPError(f"{status} error", response=response)
+
+
+@pytest.mark.parametrize(
+    "status, kind",
+    [
+        (400, PERMANENT),
+        (404, PERMANENT),
+        (422, PERMANENT),
+        (401, FATAL),
+        (403, FATAL),
+        (429, TRANSIENT),
+        (500, TRANSIENT),
+        (503, TRANSIENT),
+    ],
+)
+def test_http_status(status, kind):
+    assert classify_error(http_error(status)) == kind
+
+
+def test_http_error_without_response_is_transient():
+    assert classify_error(requests.HTTPError("no response")) == TRANSIENT
+
+
+@pytest.mark.parametrize(
+    "exc",
+    [requests.Timeout(), requests.ConnectionError(), ValueError("bad payload"), KeyError("info")],
+)
+def test_other_errors_are_transient(exc):
+    assert classify_error(exc) == TRANSIENT
+
+
+@pytest.mark.parametrize("match_id", ["XX9_123", "EUW1123"])
+def test_unroutable_match_id_is_permanent(match_id):
+    with pytest.raises(UnknownPlatformError) as info:
+        region_for_match_id(match_id)
+    assert classify_error(info.value) == PERMANENT
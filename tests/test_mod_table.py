@@ -0,0 +1,62 @@
+"""
+ModTable of src/ml/features.py: modifier deviations per champion and patch, the
+unknown-champion row, the patch fallback, and the per-team sum / min / max.
+"""
+import numpy as np
+import pytest
+
+from src.merging.store import CanonicalStore
+from src.ml.features import ModTable
+
+
+def champ(cid: int, **mods) -> dict:
+    return {"id": cid, "key": f"C{cid}", "name": f"C{cid}", "aram_mods": mods}
+
+
+@pytest.fixture
+def mods(tmp_path) -> ModTable:
+    store = CanonicalStore(tmp_path)
+    store.add_snapshot("16.1", {"1": champ(1, dmg_dealt=1.05), "2": champ(2, dmg_taken=0.9)})
+    store.add_snapshot("16.3.1", {"1": champ(1, dmg_dealt=0.95, ability_haste=20), "2": champ(2)})
+    return ModTable.from_store(store, fields=("dmg_dealt", "dmg_taken", "ability_haste"))
+
+
+def team(*champs) -> np.ndarray:
+    return np.array([list(champs) + [0] * (5 - len(champs))], dtype=np.int64)
+
+
+def test_patches_are_major_minor(mods):
+    assert mods.patches == ("16.1", "16.3")
+    assert mods.latest_patch == "16.3"
+    assert mods.n_features == 9
+    assert mods.feature_names()[:3] == ["mod_sum_dmg_dealt", "mod_sum_dmg_taken", "mod_sum_ability_haste"]
+
+
+def test_deviation_from_neutral(mods):
+    sums = mods.team_features(team(1, 2), ["16.1"])[0, :3]
+    np.testing.assert_allclose(sums, [0.05, -0.1, 0.0], atol=1e-6)
+
+    # ability_haste is additive and scaled per 100.
+    sums = mods.team_features(team(1, 2), ["16.3"])[0, :3]
+    np.testing.assert_allclose(sums, [-0.05, 0.0, 0.2], atol=1e-6)
+
+
+def test_unknown_champions_are_neutral(mods):
+    features = mods.team_features(team(1, 999, 12345, -3), ["16.1"])
+    np.testing.assert_allclose(features[0, :3], [0.05, 0.0, 0.0], atol=1e-6)
+
+
+def test_min_and_max(mods):
+    features = mods.team_features(team(1, 2), ["16.1"])[0]
+    np.testing.assert_allclose(features[3:6], [0.0, -0.1, 0.0], atol=1e-6)
+    np.testing.assert_allclose(features[6:9], [0.05, 0.0, 0.0], atol=1e-6)
+
+
+def test_patch_fallback(mods):
+    features = mods.team_features(np.vstack([team(1)] * 4), ["16.2", "16.3.5", "16.9", "15.24"])
+    np.testing.assert_allclose(features[:, 0], [0.05, -0.05, -0.05, 0.05], atol=1e-6)
+
+
+def test_empty_store(tmp_path):
+    with pytest.raises(ValueError, match="no patches"):
+        ModTable.from_store(CanonicalStore(tmp_path))
@@ -0,0 +1,75 @@
+"""
+RateBudget of src/crawling/rate_limit.py: limit parsing, bucket capacity, blocking and
+stopping, 429 penalties, share-based ordering and the per-thread binding.
+"""
+import threading
+import time
+
+import pytest
+
+from src.crawling import rate_limit
+from src.crawling.rate_limit import CrawlStopped, RateBudget, parse_limits
+
+
+def test_parse_limits():
+    assert parse_limits("20:1,100:120") == [(20, 1), (100, 120)]
+    assert parse_limits(" 20:1 , ") == [(20, 1)]
+    assert parse_limits("") == []
+
+
+def test_capacity_and_sustained_rate():
+    budget = RateBudget.from_spec("20:1,100:120")
+    assert [b.capacity for b in budget.buckets] == pytest.approx([18, 90])
+    assert budget.sustained_rate == pytest.approx(90 / 120)
+    # A tiny limit still allows one request.
+    assert RateBudget.from_spec("1:10").buckets[0].capacity == 1.0
+
+
+def test_grants_capacity_then_blocks_until_stopped():
+    budget = RateBudget.from_spec("5:100", safety=1.0)
+    stop = threading.Event()
+    assert all(budget.acquire("ingestion", stop) for _ in range(5))
+
+    timer = threading.Timer(0.2, lambda: (stop.set(), budget.wake()))
+    timer.start()
+    t0 = time.monotonic()
+    assert budget.acquire("ingestion", stop) is False
+    assert 0.15 < time.monotonic() - t0 < 1.5
+    timer.join()
+
+
+def test_penalize_pauses_requests():
+    budget = RateBudget.from_spec("1000:1", safety=1.0)
+    budget.penalize(0.3)
+    t0 = time.monotonic()
+    assert budget.acquire("discovery")
+    assert time.monotonic() - t0 >= 0.25
+
+
+def test_role_furthest_below_its_share_goes_next():
+    budget = RateBudget.from_spec("1000:1")
+    budget.set_shares({"discovery": 1.0, "ingestion": 3.0})
+    budget.waiting.update({"discovery": 1, "ingestion": 1})
+
+    budget.usage.update({"discovery": 1.0, "ingestion": 2.0})
+    assert budget._next_role() == "ingestion"   # 2/3 of its share used vs 1/1
+    budget.usage.update({"discovery": 1.0, "ingestion": 6.0})
+    assert budget._next_role() == "discovery"
+    budget.waiting["discovery"] = 0
+    assert budget._next_role() == "ingestion"   # work-conserving
+
+
+def test_binding():
+    rate_limit.before_request()   # unbound: no limiting
+
+    budget = RateBudget.from_spec("1000:1")
+    stop = threading.Event()
+    with rate_limit.using(budget, "ingestion", stop):
+        rate_limit.before_request()
+        assert budget.usage["ingestion"] == 1
+        stop.set()
+        with pytest.raises(CrawlStopped):
+            rate_limit.before_request()
+        with pytest.raises(CrawlStopped):
+            rate_limit.sleep(5)
+    assert getattr(rate_limit._local, "binding", None) is None
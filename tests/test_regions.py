@@ -0,0 +1,53 @@
+"""
+Routing of src/crawling/regions.py: platforms and match ids to routing regions, and
+the --regions option.
+"""
+import pytest
+
+from src.crawling.regions import (
+    PLATFORM_REGIONS,
+    REGIONS,
+    UnknownPlatformError,
+    parse_regions,
+    region_for_match_id,
+    region_for_platform,
+)
+
+
+def test_every_platform_routes_to_a_region():
+    assert set(PLATFORM_REGIONS.values()) == set(REGIONS)
+
+
+def test_region_for_match_id():
+    assert region_for_match_id("EUW1_7123456789") == "europe"
+    assert region_for_match_id("na1_1") == "americas"
+    assert region_for_platform("KR") == "asia"
+    assert region_for_platform("vn2") == "sea"
+
+
+@pytest.mark.parametrize("match_id", ["XX9_1", "_1", "EUW17123456789", ""])
+def test_unroutable_match_ids(match_id):
+    # Still a ValueError for callers that only catch that.
+    with pytest.raises(ValueError):
+        region_for_match_id(match_id)
+    with pytest.raises(UnknownPlatformError):
+        region_for_match_id(match_id)
+
+
+@pytest.mark.parametrize(
+    "spec, expected",
+    [
+        ("americas", ["americas"]),
+        (" Europe , asia ", ["europe", "asia"]),
+        ("asia,asia,sea", ["asia", "sea"]),
+        ("all", list(REGIONS)),
+        ("ALL", list(REGIONS)),
+    ],
+)
+def test_parse_regions(spec, expected):
+    assert parse_regions(spec) == expected
+
+
+def test_parse_regions_rejects_unknown():
+    with pytest.raises(ValueError, match="moon"):
+        parse_regions("americas,moon")